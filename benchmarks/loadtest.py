@@ -0,0 +1,366 @@
+"""
+Load test: simulated users drive the bot's real Dispatcher, routers and middlewares
+with synthetic updates, and latency is reported per handler.
+
+    python -m benchmarks.loadtest --users 2000 --duration 60
+    python -m benchmarks.loadtest --db postgres --json results.json
+
+The Bot API is a fake aiohttp server in a child process, reached through the bot's own
+session (BOT_API_URL). The database is an in-memory stand-in (benchmarks/memory_db.py),
+or with --db postgres the database from .env; use a scratch database, simulated users
+(ids from 10**12) are seeded into it and left there.
+Other settings (FSM_STORAGE, cache sizes, HTTP_*) are read from the environment as usual.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing as mp
+import os
+import random
+import string
+import time
+from collections import defaultdict
+from typing import Any, Optional
+
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.types import Update
+from aiohttp import web
+
+from utils.callbacks import AnswerCallback, DictCallback, TestCallback, dict_id
+
+USER_ID_BASE = 10 ** 12
+BOT_ID = 42
+DICT_NAME = "🇬🇧 English - 🇷🇺 Russian"
+
+SCENARIOS = {"browse": 4, "search": 2, "add_words": 1, "test": 3}
+
+
+# ---------------------- FAKE BOT API ----------------------
+
+def _fake_message(message_id: int, form) -> dict:
+    return {
+        "message_id": message_id,
+        "date": int(time.time()),
+        "chat": {"id": int(form.get("chat_id", 0)), "type": "private"},
+        "from": {"id": BOT_ID, "is_bot": True, "first_name": "loadtest"},
+        "text": form.get("text", ""),
+    }
+
+
+def serve_fake_api(ready, latency: float):
+    """Answers every Bot API method with a plausible result after `latency` seconds"""
+    message_ids = itertools.count(1)
+
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        form = await request.post()
+        if latency:
+            await asyncio.sleep(latency)
+        if method == "getme":
+            result: Any = {"id": BOT_ID, "is_bot": True, "first_name": "loadtest", "username": "loadtest_bot"}
+        elif method.startswith("send") and method != "sendchataction" or method.startswith("edit"):
+            result = _fake_message(next(message_ids), form)
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    async def main():
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        ready.send(runner.addresses[0][1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+# ---------------------- SIMULATED USERS ----------------------
+
+def _random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+
+
+def make_words(rng: random.Random, count: int) -> list[tuple[str, str]]:
+    words = {}
+    while len(words) < count:
+        words[_random_word(rng)] = _random_word(rng)
+    return list(words.items())
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    def report(self, elapsed: float) -> dict:
+        handlers = {}
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            handlers[name] = {
+                "count": len(values),
+                "errors": self.errors.get(name, 0),
+                "rps": round(len(values) / elapsed, 1),
+                "p50_ms": _percentile(values, 0.5),
+                "p95_ms": _percentile(values, 0.95),
+                "p99_ms": _percentile(values, 0.99),
+                "max_ms": round(values[-1] * 1000, 2),
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            "elapsed": round(elapsed, 2),
+            "updates": total,
+            "errors": sum(self.errors.values()),
+            "rps": round(total / elapsed, 1),
+            "handlers": handlers,
+        }
+
+
+def _percentile(values: list[float], q: float) -> float:
+    return round(values[min(len(values) - 1, int(q * len(values)))] * 1000, 2)
+
+
+class SimulatedUser:
+    """One user clicking through the bot; every update goes through Dispatcher.feed_update"""
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, harness: "Harness", user_id: int, words: list[tuple[str, str]]):
+        self.harness = harness
+        self.user_id = user_id
+        self.words = words
+        self.rng = random.Random(user_id)
+        self.user = {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+        self.chat = {"id": user_id, "type": "private"}
+        self.message_id = 1
+
+    def _message(self, text: str, from_bot: bool = False) -> dict:
+        self.message_id += 1
+        return {
+            "message_id": self.message_id,
+            "date": int(time.time()),
+            "chat": self.chat,
+            "from": {"id": BOT_ID, "is_bot": True, "first_name": "loadtest"} if from_bot else self.user,
+            "text": text,
+        }
+
+    async def send(self, text: str):
+        await self.harness.feed(self, {"update_id": next(self._update_ids), "message": self._message(text)})
+
+    async def tap(self, data: str):
+        await self.harness.feed(self, {
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(self.message_id),
+                "from": self.user,
+                "chat_instance": str(self.user_id),
+                "message": self._message("❓", from_bot=True),
+                "data": data,
+            },
+        })
+
+    async def think(self):
+        if self.harness.think_time:
+            await asyncio.sleep(self.rng.uniform(0, 2 * self.harness.think_time))
+
+    async def open_dictionary(self):
+        await self.tap("view_dicts")
+        await self.think()
+        await self.tap(DictCallback.of("view", DICT_NAME))
+        await self.think()
+
+    async def browse(self):
+        await self.send("/start")
+        await self.think()
+        await self.open_dictionary()
+        for _ in range(self.rng.randint(1, 5)):
+            await self.tap("swipe_right")
+            await self.think()
+        await self.tap("swipe_left")
+        await self.think()
+        await self.tap("back_to_dictionaries")
+
+    async def search(self):
+        await self.open_dictionary()
+        await self.tap("search_words")
+        await self.think()
+        word, _ = self.rng.choice(self.words)
+        await self.send(word[:self.rng.randint(1, len(word))])
+        await self.think()
+        await self.tap("search_right")
+
+    async def add_words(self):
+        await self.open_dictionary()
+        await self.tap("add_words")
+        await self.think()
+        await self.send(_random_word(self.rng))
+        await self.think()
+        await self.send(_random_word(self.rng))
+
+    async def test(self):
+        await self.tap("view_tests")
+        await self.think()
+        await self.tap(DictCallback.of("test", DICT_NAME))
+        await self.think()
+        await self.tap(TestCallback(id=dict_id(DICT_NAME), reversed=self.rng.random() < 0.3).pack())
+        key = StorageKey(bot_id=BOT_ID, chat_id=self.user_id, user_id=self.user_id)
+        for _ in range(self.rng.randint(3, 10)):
+            await self.think()
+            # The user "knows" 80% of the answers
+            data = await self.harness.dp.storage.get_data(key)
+            if "words_to_answer" not in data:
+                break
+            options = data["words_to_answer"]
+            option = options.index(data["right_ans"]) if self.rng.random() < 0.8 \
+                else self.rng.randrange(len(options))
+            await self.tap(AnswerCallback(question=data["question"], option=option).pack())
+            await self.think()
+            await self.tap("next_question")
+        await self.think()
+        await self.tap("back_to_tests")
+
+    async def run(self, deadline: float):
+        names, weights = zip(*SCENARIOS.items())
+        while time.monotonic() < deadline:
+            scenario = self.rng.choices(names, weights)[0]
+            await getattr(self, scenario)()
+            await self.think()
+
+
+# ---------------------- HARNESS ----------------------
+
+class Harness:
+    def __init__(self, dp, bot, think_time: float):
+        self.dp = dp
+        self.bot = bot
+        self.think_time = think_time
+        self.stats = Stats()
+        dp.message.middleware(self._record_handler)
+        dp.callback_query.middleware(self._record_handler)
+
+    @staticmethod
+    async def _record_handler(handler, event, data):
+        step = data.get("loadtest_step")
+        if step is not None:
+            step["handler"] = data["handler"].callback.__name__
+        return await handler(event, data)
+
+    async def feed(self, user: SimulatedUser, raw: dict):
+        update = Update.model_validate(raw, context={"bot": self.bot})
+        step: dict[str, str] = {}
+        started = time.perf_counter()
+        failed = False
+        try:
+            await self.dp.feed_update(self.bot, update, loadtest_step=step)
+        except Exception:
+            failed = True
+        name = step.get("handler", "unhandled")
+        self.stats.latencies[name].append(time.perf_counter() - started)
+        if failed:
+            self.stats.errors[name] += 1
+
+
+def configure_env(args: argparse.Namespace, api_url: str):
+    os.environ["TOKEN"] = f"{BOT_ID}:LOADTEST"
+    os.environ["BOT_API_URL"] = api_url
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ.setdefault("CALLBACK_DEBOUNCE_MS", "0")
+    if not args.rate_limit:
+        for name in ("OUTGOING_GLOBAL_RATE", "OUTGOING_CHAT_RATE", "OUTGOING_GROUP_RATE_PER_MIN"):
+            os.environ[name] = "1000000"
+
+
+async def seed(database, users: dict[int, list[tuple[str, str]]], postgres: bool):
+    if postgres:
+        from db.async_db import bulk_add_users, bulk_import_words
+
+        await bulk_add_users(users, database)
+        await bulk_import_words(
+            ((user_id, DICT_NAME, word, translation) for user_id, words in users.items() for word, translation in words),
+            database,
+        )
+    else:
+        for user_id, words in users.items():
+            database.seed(user_id, DICT_NAME, words)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    import db.init_db as init_db
+
+    if args.db == "memory":
+        from benchmarks.memory_db import MemoryDatabase
+
+        real = init_db.db
+        init_db.db = MemoryDatabase(
+            latency=args.db_latency_ms / 1000,
+            cache=real.cache, search_indexes=real.search_indexes, pages=real.pages, known_users=real.known_users,
+        )
+        init_db.answer_recorder.database = init_db.db
+
+    # Imported only now, so that the handlers pick up the database chosen above
+    import bot as app
+
+    rng = random.Random(args.seed)
+    users = {USER_ID_BASE + i: make_words(rng, args.words) for i in range(args.users)}
+
+    bot, dp = app.create_app()
+    workflow_data = {"dispatcher": dp, **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        await seed(init_db.db, users, args.db == "postgres")
+        harness = Harness(dp, bot, args.think_ms / 1000)
+        simulated = [SimulatedUser(harness, user_id, words) for user_id, words in users.items()]
+
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(user.run(deadline) for user in simulated))
+        report = harness.stats.report(time.monotonic() - started)
+    finally:
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+    return report
+
+
+def print_report(report: dict):
+    print(f"{report['updates']} updates in {report['elapsed']} s: {report['rps']} updates/s, "
+          f"{report['errors']} errors")
+    print(f"{'handler':<32}{'count':>8}{'errors':>8}{'rps':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, row in report["handlers"].items():
+        print(f"{name:<32}{row['count']:>8}{row['errors']:>8}{row['rps']:>9}"
+              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}")
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Load test with simulated users")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--think-ms", type=float, default=1000, help="mean pause between a user's taps")
+    parser.add_argument("--words", type=int, default=200, help="words in each user's dictionary")
+    parser.add_argument("--db", choices=("memory", "postgres"), default="memory")
+    parser.add_argument("--db-latency-ms", type=float, default=0, help="simulated query latency (memory db)")
+    parser.add_argument("--api-latency-ms", type=float, default=0, help="simulated Bot API latency")
+    parser.add_argument("--rate-limit", action="store_true", help="keep the outgoing rate limits")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    receiver, sender = mp.Pipe(duplex=False)
+    api = mp.Process(target=serve_fake_api, args=(sender, args.api_latency_ms / 1000), daemon=True)
+    api.start()
+    try:
+        configure_env(args, f"http://127.0.0.1:{receiver.recv()}")
+        report = asyncio.run(run(args))
+    finally:
+        api.terminate()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
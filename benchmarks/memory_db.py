@@ -0,0 +1,235 @@
+import asyncio
+import itertools
+import random
+from datetime import datetime, timezone
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from db.models import Database
+from utils.metrics import metrics, timed
+
+
+class _Dictionary:
+    __slots__ = ("id", "name", "words")
+
+    def __init__(self, id: int, name: str):
+        self.id = id
+        self.name = name
+        # word -> [word_pair_id, translation], in insertion (id) order
+        self.words: dict[str, list] = {}
+
+
+class MemoryDatabase(Database):
+    """
+    In-memory stand-in for Database in load tests.
+    Only the named queries are reimplemented, so the caches, the search index, the page
+    cache and the rest of Database run exactly as in production. `latency` adds a simulated
+    round trip to every query.
+    """
+
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__({}, **kwargs)
+        self.latency = latency
+        self.users: set[int] = set()
+        self.dictionaries: dict[tuple[int, str], _Dictionary] = {}
+        # (word_pair_id, reversed) -> (easiness, interval_days, repetitions, due_at)
+        self.reviews: dict[tuple[int, bool], tuple] = {}
+        self._ids = itertools.count(1)
+        self._queries: dict[str, Callable] = {
+            "get_user": self._get_user,
+            "ensure_user": self._ensure_user,
+            "get_user_dictionaries": self._user_dictionaries,
+            "export_words": self._user_dictionaries,
+            "count_words": self._count_words,
+            "words_page": self._words_page,
+            "words_page_after": self._words_page_after,
+            "words_page_before": self._words_page_before,
+            "add_dictionary": self._add_dictionary,
+            "delete_dictionary": self._delete_dictionary,
+            "add_word": self._add_word,
+            "delete_word": self._delete_word,
+            "edit_word": self._edit_word,
+            "due_words": self._due_words,
+            "sample_answers": self._sample_answers,
+        }
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def _run(self, query: str, *args):
+        with timed(metrics.observe_db, query):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            return self._queries[query](*args)
+
+    async def fetch(self, query: str, *args) -> list:
+        return await self._run(query, *args)
+
+    async def fetchrow(self, query: str, *args):
+        return await self._run(query, *args)
+
+    async def fetchval(self, query: str, *args):
+        return await self._run(query, *args)
+
+    # ---------------------- SEEDING ----------------------
+
+    def seed(self, telegram_id: int, dict_name: str, pairs: list[tuple[str, str]]):
+        self.users.add(telegram_id)
+        for word, translation in pairs:
+            self._add_word(telegram_id, dict_name, word, translation)
+
+    # ---------------------- QUERIES ----------------------
+
+    def _get_user(self, telegram_id: int) -> Optional[dict]:
+        return {"telegram_id": telegram_id} if telegram_id in self.users else None
+
+    def _ensure_user(self, telegram_id: int) -> Optional[int]:
+        if telegram_id in self.users:
+            return None
+        self.users.add(telegram_id)
+        return telegram_id
+
+    def _user_dictionaries(self, telegram_id: int, dict_name: Optional[str] = None) -> list[dict]:
+        rows = []
+        for (owner, name), dictionary in self.dictionaries.items():
+            if owner != telegram_id or dict_name is not None and name != dict_name:
+                continue
+            if not dictionary.words:
+                rows.append({"name": name, "word": None, "translation": None})
+            for word, (_, translation) in dictionary.words.items():
+                rows.append({"name": name, "word": word, "translation": translation})
+        return rows
+
+    def _count_words(self, telegram_id: int, dict_name: str) -> Optional[int]:
+        dictionary = self.dictionaries.get((telegram_id, dict_name))
+        return len(dictionary.words) if dictionary else None
+
+    def _pairs(self, telegram_id: int, dict_name: str) -> list[dict]:
+        dictionary = self.dictionaries.get((telegram_id, dict_name))
+        if dictionary is None:
+            return []
+        return [
+            {"id": id, "word": word, "translation": translation}
+            for word, (id, translation) in dictionary.words.items()
+        ]
+
+    def _words_page(self, telegram_id: int, dict_name: str, limit: int, offset: int) -> list[dict]:
+        return self._pairs(telegram_id, dict_name)[offset:offset + limit]
+
+    def _words_page_after(self, telegram_id: int, dict_name: str, after_id: int, limit: int) -> list[dict]:
+        return [row for row in self._pairs(telegram_id, dict_name) if row["id"] > after_id][:limit]
+
+    def _words_page_before(self, telegram_id: int, dict_name: str, before_id: int, limit: int) -> list[dict]:
+        return [row for row in self._pairs(telegram_id, dict_name) if row["id"] < before_id][::-1][:limit]
+
+    def _add_dictionary(self, telegram_id: int, dict_name: str) -> list:
+        if (telegram_id, dict_name) not in self.dictionaries:
+            self.dictionaries[(telegram_id, dict_name)] = _Dictionary(next(self._ids), dict_name)
+        return []
+
+    def _delete_dictionary(self, telegram_id: int, dict_name: str) -> Optional[int]:
+        dictionary = self.dictionaries.pop((telegram_id, dict_name), None)
+        if dictionary is None:
+            return None
+        for id, _ in dictionary.words.values():
+            self.reviews.pop((id, False), None)
+            self.reviews.pop((id, True), None)
+        return dictionary.id
+
+    def _add_word(self, telegram_id: int, dict_name: str, word: str, translation: str) -> int:
+        self._add_dictionary(telegram_id, dict_name)
+        words = self.dictionaries[(telegram_id, dict_name)].words
+        if word in words:
+            words[word][1] = translation
+        else:
+            words[word] = [next(self._ids), translation]
+        return len(words)
+
+    def _delete_word(self, telegram_id: int, dict_name: str, word: str) -> Optional[dict]:
+        dictionary = self.dictionaries.get((telegram_id, dict_name))
+        if dictionary is None:
+            return None
+        changed = dictionary.words.pop(word, None) is not None
+        return {"word_count": len(dictionary.words), "changed": int(changed)}
+
+    def _edit_word(self, telegram_id: int, dict_name: str, word: str, new_word: str) -> Optional[dict]:
+        dictionary = self.dictionaries.get((telegram_id, dict_name))
+        if dictionary is None:
+            return None
+        words = dictionary.words
+        if word in words:
+            id, translation = words.pop(word)
+            if new_word in words:
+                words[new_word][1] = translation
+            else:
+                # Keeps the pair at its place in id order
+                words[new_word] = [id, translation]
+                dictionary.words = dict(sorted(words.items(), key=lambda item: item[1][0]))
+            return {"word_count": len(dictionary.words), "changed": 1}
+        for pair in words.values():
+            if pair[1] == word:
+                pair[1] = new_word
+                return {"word_count": len(words), "changed": 1}
+        return {"word_count": len(words), "changed": 0}
+
+    def _due_words(self, telegram_id: int, dict_name: str, is_reversed: bool, limit: int,
+                   exclude: list[int]) -> list[dict]:
+        dictionary = self.dictionaries.get((telegram_id, dict_name))
+        if dictionary is None:
+            return []
+        now = datetime.now(timezone.utc)
+        due, new = [], []
+        for word, (id, translation) in dictionary.words.items():
+            if id in exclude:
+                continue
+            review = self.reviews.get((id, is_reversed))
+            row = {"id": id, "word": word, "translation": translation,
+                   "easiness": None, "interval_days": None, "repetitions": None}
+            if review is None:
+                new.append(row)
+            elif review[3] <= now:
+                row.update(easiness=review[0], interval_days=review[1], repetitions=review[2])
+                due.append((review[3], row))
+        due.sort(key=lambda item: item[0])
+        return ([row for _, row in due[:limit]] + new[:limit])[:limit]
+
+    def _sample_answers(self, telegram_id: int, dict_name: str, is_reversed: bool, limit: int) -> list[dict]:
+        dictionary = self.dictionaries.get((telegram_id, dict_name))
+        if dictionary is None:
+            return []
+        rows = [{"answer": word if is_reversed else translation}
+                for word, (_, translation) in dictionary.words.items()]
+        random.shuffle(rows)
+        return rows[:limit]
+
+    # ---------------------- BULK ----------------------
+
+    async def iter_words(self, telegram_id: int, dict_name: Optional[str] = None,
+                         prefetch: int = 500) -> AsyncIterator[tuple[str, Optional[str], Optional[str]]]:
+        for row in await self._run("export_words", telegram_id, dict_name):
+            yield row["name"], row["word"], row["translation"]
+
+    async def import_words(self, telegram_id: int, dict_name: str,
+                           batches: AsyncIterator[list[tuple[str, str]]],
+                           on_progress: Optional[Callable[[int], Awaitable[None]]] = None) -> int:
+        copied = 0
+        word_count = 0
+        async for batch in batches:
+            for word, translation in batch:
+                word_count = self._add_word(telegram_id, dict_name, word, translation)
+            copied += len(batch)
+            if on_progress:
+                await on_progress(copied)
+        self.cache.invalidate(telegram_id)
+        self.search_indexes.invalidate(telegram_id, dict_name)
+        self.pages.bump(telegram_id, dict_name)
+        return word_count or self._count_words(telegram_id, dict_name) or 0
+
+    async def record_answers(self, answers: list[tuple]):
+        with timed(metrics.observe_db, "record_answers"):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            for _, _, word_pair_id, is_reversed, _, _, easiness, interval_days, repetitions, due_at in answers:
+                self.reviews[(word_pair_id, is_reversed)] = (easiness, interval_days, repetitions, due_at)
@@ -0,0 +1,219 @@
+"""
+Micro-benchmarks of the CPU-bound helpers that run on every interaction,
+parameterized by dictionary size.
+
+    python -m benchmarks.micro                                 # run and print
+    python -m benchmarks.micro --save benchmarks/baseline.json # store a baseline
+    python -m benchmarks.micro --compare benchmarks/baseline.json
+
+--compare prints the change against the baseline and exits with 1 if any case got slower
+than --threshold. Each case reports the median of --repeat runs, so a single noisy run
+does not fail the comparison. Baselines are machine-specific: compare runs made on the same host.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import string
+import sys
+import time
+import timeit
+from typing import Callable, Coroutine, Optional
+
+from handlers.dictionaries_router import WORDS_PER_PAGE, format_dict_page, get_btns_menu_dict
+from handlers.tests_router import reverse_dict
+from kbds.inline import calc_dict_btns, get_callback_btns
+from utils.callbacks import AnswerCallback, DictCallback
+from utils.distractors import DistractorSampler
+from utils.paginator import AsyncPaginator, SequenceSource
+from utils.search_index import DictionarySearchIndex
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+DICT_NAME = "🇬🇧 English - 🇷🇺 Russian"
+
+
+def run_sync(coro: Coroutine):
+    """Runs a coroutine that never suspends (in-memory sources) without an event loop"""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("the coroutine suspended")
+
+
+def make_dictionary(size: int, seed: int = 1) -> dict[str, str]:
+    rng = random.Random(seed)
+    words = {}
+    while len(words) < size:
+        word = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+        words[word] = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10)))
+    return words
+
+
+# Each case takes a dictionary (None for size-independent cases) and returns the function to time
+
+def case_paginator(words: dict[str, str]) -> Callable:
+    """A swipe from the middle page: the paginator is restored from FSM state and loads the next page"""
+    source = SequenceSource(list(words.items()))
+    total = len(words)
+    page = max(1, (total + WORDS_PER_PAGE - 1) // WORDS_PER_PAGE // 2)
+    state = {
+        "page": page,
+        "first_key": (page - 1) * WORDS_PER_PAGE,
+        "last_key": min(page * WORDS_PER_PAGE, total) - 1,
+        "total": total,
+    }
+
+    async def swipe():
+        pg = AsyncPaginator(source, per_page=WORDS_PER_PAGE, **state)
+        if await pg.has_next():
+            return await pg.get_next()
+        return await pg.get_page()
+
+    return lambda: run_sync(swipe())
+
+
+def case_dict_page_text(words: dict[str, str]) -> Callable:
+    page_items = list(enumerate(list(words.items())[:WORDS_PER_PAGE]))
+    return lambda: format_dict_page(DICT_NAME, 1, page_items)
+
+
+def case_reverse_dict(words: dict[str, str]) -> Callable:
+    return lambda: reverse_dict(words)
+
+
+def case_sampler_build(words: dict[str, str]) -> Callable:
+    answers = list(words.values())
+    return lambda: DistractorSampler(answers)
+
+
+def case_question_options(words: dict[str, str]) -> Callable:
+    """The option building of send_question: sample, shuffle, pack callbacks, build the keyboard"""
+    sampler = DistractorSampler(words.values())
+    answers = list(words.values())
+    rng = random.Random(1)
+
+    def run():
+        right = rng.choice(answers)
+        options = [right] + sampler.sample(right, k=4)
+        random.shuffle(options)
+        btns = {answer: AnswerCallback(question=1, option=option).pack() for option, answer in enumerate(options)}
+        btns["🔙 Back"] = "back_to_tests"
+        get_callback_btns(btns=btns, sizes=(3, 2, 1))
+
+    return run
+
+
+def case_search(words: dict[str, str]) -> Callable:
+    index = DictionarySearchIndex(words.items())
+    queries = [word[:4] for word in list(words)[:100]]
+    rng = random.Random(1)
+    return lambda: index.search(rng.choice(queries))
+
+
+def case_dict_menu(_) -> Callable:
+    return lambda: get_callback_btns(btns=get_btns_menu_dict(DICT_NAME), sizes=(2, 3, 3, 1))
+
+
+def case_dict_list(_) -> Callable:
+    names = [f"Dictionary {i}" for i in range(10)]
+
+    def run():
+        btns = {str(i): DictCallback.of("view", name) for i, name in enumerate(names)}
+        btns.update({"➕ Add Dictionary": "add_dict", "🗑️ Delete Dictionary": "delete_dict", "🔙 Back": "back"})
+        get_callback_btns(btns=btns, sizes=calc_dict_btns(names))
+
+    return run
+
+
+SIZED_CASES = {
+    "paginator": case_paginator,
+    "dict_page_text": case_dict_page_text,
+    "reverse_dict": case_reverse_dict,
+    "sampler_build": case_sampler_build,
+    "question_options": case_question_options,
+    "search": case_search,
+}
+CASES = {
+    "dict_menu_keyboard": case_dict_menu,
+    "dict_list_keyboard": case_dict_list,
+}
+
+
+def measure(func: Callable, repeat: int, min_time: float) -> float:
+    """Median time of one call in microseconds"""
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    # autorange stops at 0.2 s; scale up to min_time per repeat
+    number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    return statistics.median(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def run_cases(sizes: tuple[int, ...], pattern: Optional[str], repeat: int, min_time: float) -> dict[str, float]:
+    results = {}
+    for name, case in CASES.items():
+        if not pattern or pattern in name:
+            results[name] = measure(case(None), repeat, min_time)
+            print(f"{name:<36}{results[name]:>14.2f} us", flush=True)
+    for size in sizes:
+        words = make_dictionary(size)
+        for name, case in SIZED_CASES.items():
+            key = f"{name}[{size}]"
+            if not pattern or pattern in key:
+                results[key] = measure(case(words), repeat, min_time)
+                print(f"{key:<36}{results[key]:>14.2f} us", flush=True)
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float) -> bool:
+    """Prints the change per case; True if nothing got slower than threshold"""
+    ok = True
+    print(f"\n{'case':<36}{'baseline us':>14}{'now us':>14}{'change':>10}")
+    for key, value in results.items():
+        if key not in baseline:
+            print(f"{key:<36}{'-':>14}{value:>14.2f}{'new':>10}")
+            continue
+        change = value / baseline[key] - 1
+        mark = ""
+        if change > threshold:
+            mark = "  SLOWER"
+            ok = False
+        elif change < -threshold:
+            mark = "  faster"
+        print(f"{key:<36}{baseline[key]:>14.2f}{value:>14.2f}{change:>+10.1%}{mark}")
+    return ok
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of hot-path helpers")
+    parser.add_argument("--sizes", type=lambda value: tuple(int(size) for size in value.split(",")), default=SIZES,
+                        help="comma-separated dictionary sizes")
+    parser.add_argument("-k", "--filter", help="only cases whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--compare", help="compare with this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.3, help="allowed slowdown, 0.3 = 30%%")
+    args = parser.parse_args(argv)
+
+    results = run_cases(args.sizes, args.filter, args.repeat, args.min_time)
+
+    ok = True
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            ok = compare(results, json.load(file)["results"], args.threshold)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "unit": "us per call",
+                "results": {key: round(value, 3) for key, value in results.items()},
+            }, file, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
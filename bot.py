@@ -1,5 +1,6 @@
 import asyncio
 import os
+from typing import Optional
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
@@ -9,31 +10,168 @@ from dotenv import find_dotenv, load_dotenv
 
 from handlers.main_router import main_router
 
-from db.init_db import db
+from db.init_db import answer_recorder, db
+from middlewares.debounce import CallbackDebounce
+from middlewares.edits import SkipUnchangedEdits
+from middlewares.log_context import LogContext
+from middlewares.metrics import ApiMetrics, HandlerMetrics, UpdateMetrics
+from middlewares.rate_limit import OutgoingRateLimiter
+from utils.bot_session import create_session
+from utils.fsm_storage import TimedStorage, create_storage
+from utils.log import setup_logging
+from utils.metrics import SamplingProfiler, metrics, start_metrics_server
+from utils.sharding import ShardedRunner
+from utils.webhook import run_webhook
 
 load_dotenv(find_dotenv())
 
 
-bot = Bot(token=os.getenv('TOKEN'),
-          default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+def create_app() -> tuple[Bot, Dispatcher]:
+    """
+    Builds the bot and the dispatcher with their middlewares and routers.
+    Called once per process: the router can be attached to only one dispatcher,
+    so sharded workers call this instead of importing ready-made objects.
+    """
+    bot = Bot(token=os.getenv('TOKEN'),
+              session=create_session(),
+              default=DefaultBotProperties(parse_mode=ParseMode.HTML))
 
-dp = Dispatcher()
+    rate_limiter = OutgoingRateLimiter.from_env()
+
+    # Unchanged edits are dropped before they take a rate limit token
+    bot.session.middleware(SkipUnchangedEdits())
+    bot.session.middleware(rate_limiter)
+    bot.session.middleware(ApiMetrics())
+
+    # PROFILE_SAMPLE_RATE > 0 profiles that share of updates into PROFILE_PATH
+    profiler = None
+    if float(os.getenv("PROFILE_SAMPLE_RATE", 0)) > 0:
+        profiler = SamplingProfiler(
+            float(os.environ["PROFILE_SAMPLE_RATE"]),
+            os.getenv("PROFILE_PATH", f"profile-{os.getenv('WORKER_INDEX', 0)}.pstats"),
+        )
+
+    # FSM middleware is registered by hand so that update metrics wrap it and see its storage calls
+    dp = Dispatcher(storage=TimedStorage(create_storage()), disable_fsm=True, profiler=profiler,
+                    rate_limiter=rate_limiter)
+    dp.update.outer_middleware(UpdateMetrics(profiler))
+    dp.update.outer_middleware(LogContext(slow_update=float(os.getenv("SLOW_UPDATE_MS", 1000)) / 1000))
+    dp.update.outer_middleware(dp.fsm)
+    dp.message.middleware(HandlerMetrics())
+    dp.message.middleware(LogContext())
+    dp.callback_query.middleware(HandlerMetrics())
+    dp.callback_query.middleware(LogContext())
+    dp.callback_query.outer_middleware(CallbackDebounce(window=float(os.getenv("CALLBACK_DEBOUNCE_MS", 500)) / 1000))
+
+    dp.include_router(main_router)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    metrics.collector("bot_db_pool", db.get_pool_stats)
+    metrics.collector("bot_dictionary_cache", db.cache.stats)
+    metrics.collector("bot_page_cache", db.pages.stats)
+    metrics.collector("bot_known_users", db.known_users.stats)
+    metrics.collector("bot_rate_limiter", rate_limiter.stats)
+    metrics.collector("bot_answer_buffer", lambda: {"pending": len(answer_recorder)})
+    return bot, dp
+
+
+metrics_runner = None
 
-dp.include_router(main_router)
 
 async def on_startup():
+    global metrics_runner
+    setup_logging()
     await db.connect()
+    answer_recorder.start()
+    if os.getenv("METRICS_PORT"):
+        metrics_runner = await start_metrics_server(
+            os.getenv("METRICS_HOST", "0.0.0.0"),
+            int(os.environ["METRICS_PORT"]) + int(os.getenv("WORKER_INDEX", 0)),
+        )
     
-async def on_shutdown():
+# The dispatcher closes the FSM storage itself (Dispatcher registers fsm.close on shutdown)
+async def on_shutdown(profiler: Optional[SamplingProfiler] = None,
+                      rate_limiter: Optional[OutgoingRateLimiter] = None):
+    await answer_recorder.close()
     await db.close()
+    if rate_limiter:
+        await rate_limiter.close()
+    if metrics_runner:
+        await metrics_runner.cleanup()
+    if profiler:
+        profiler.dump()
 
 
-async def main():
+def env_flag(name: str, default: bool = False) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes")
 
-    dp.startup.register(on_startup)
-    dp.shutdown.register(on_shutdown)
 
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+DROP_PENDING_UPDATES = env_flag("DROP_PENDING_UPDATES", True)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", 100))
+
+
+async def start_polling(bot: Bot, dp: Dispatcher):
+    await bot.delete_webhook(drop_pending_updates=DROP_PENDING_UPDATES)
+    await dp.start_polling(
+        bot,
+        allowed_updates=dp.resolve_used_update_types(),
+        tasks_concurrency_limit=MAX_CONCURRENT_UPDATES,
+    )
+
+
+def run_sharded(bot: Bot, dp: Dispatcher, workers: int):
+    """Supervisor process: receives updates and shards them across worker processes by user"""
+    runner = ShardedRunner(
+        workers,
+        create_app,
+        queue_size=int(os.getenv("WORKER_QUEUE_SIZE", 1000)),
+        max_concurrency=MAX_CONCURRENT_UPDATES,
+    )
+
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        runner.run_webhook(
+            bot,
+            base_url=os.getenv("WEBHOOK_BASE_URL"),
+            path=os.getenv("WEBHOOK_PATH", "/webhook"),
+            host=os.getenv("WEBAPP_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBAPP_PORT", 8080)),
+            secret=os.getenv("WEBHOOK_SECRET"),
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=DROP_PENDING_UPDATES,
+        )
+    else:
+        asyncio.run(runner.run_polling(
+            bot,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=DROP_PENDING_UPDATES,
+        ))
+
+
+def main():
+    setup_logging()
+    bot, dp = create_app()
+    workers = int(os.getenv("BOT_WORKERS", 1))
+    if workers > 1:
+        run_sharded(bot, dp, workers)
+        return
+
+    if os.getenv("BOT_MODE", "polling") == "webhook":
+        run_webhook(
+            dp, bot,
+            base_url=os.getenv("WEBHOOK_BASE_URL"),
+            path=os.getenv("WEBHOOK_PATH", "/webhook"),
+            host=os.getenv("WEBAPP_HOST", "0.0.0.0"),
+            port=int(os.getenv("WEBAPP_PORT", 8080)),
+            secret=os.getenv("WEBHOOK_SECRET"),
+            drop_pending_updates=DROP_PENDING_UPDATES,
+            max_concurrency=MAX_CONCURRENT_UPDATES,
+            drain_timeout=float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", 30)),
+        )
+    else:
+        asyncio.run(start_polling(bot, dp))
+
 
-asyncio.run(main())
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,178 @@
-import asyncpg
-import json
-import asyncio
-from db.init_db import get_connection
-
+"""
+Пакетные операции для админских скриптов.
 
-async def get_user_data(user_id):
-    conn = await get_connection()
-    user = await conn.fetchrow("SELECT * FROM users WHERE telegram_id = $1", user_id)
-    await conn.close()
-    return dict(user) if user else None
+Все функции работают через общий пул Database из db/init_db.py
+(или через переданный экземпляр) и не открывают соединения на каждый вызов.
 
+Кэши сбрасываются только в процессе, который выполнил операцию. Запущенные боты
+увидят изменения после истечения DICT_CACHE_TTL, PAGE_CACHE_TTL и SEARCH_INDEX_TTL
+(или после перезапуска).
 
-async def add_user(telegram_id):
-    conn = await get_connection()
-    try:
-        await conn.execute(
-            "INSERT INTO users (telegram_id, registration_date) VALUES ($1, NOW())",
-            telegram_id
-        )
-        print(f"User with ID {telegram_id} added successfully.")
-    except Exception as e:
-        print(f"Error adding user: {e}")
-    await conn.close()
-
-
-async def get_user_dictionaries(telegram_id):
-    user_data = await get_user_data(telegram_id)
-    if user_data and user_data.get("dictionaries"):
-        if isinstance(user_data["dictionaries"], str):
-            return json.loads(user_data["dictionaries"])
-        return user_data["dictionaries"]
-    return None
-
-
-async def add_user_dictionaries(telegram_id, dict_name):
-    dictionaries = await get_user_dictionaries(telegram_id)
-    if dictionaries is not None:
-        dictionaries[dict_name] = {}
-        conn = await get_connection()
-        await conn.execute(
-            "UPDATE users SET dictionaries = $1 WHERE telegram_id = $2",
-            json.dumps(dictionaries), telegram_id
-        )
-        await conn.close()
-
-
-async def add_word_to_dict(telegram_id, dictionary_name, word):
-    dictionaries = await get_user_dictionaries(telegram_id)
-    if dictionaries is not None:
-        if dictionary_name not in dictionaries or not isinstance(dictionaries[dictionary_name], dict):
-            dictionaries[dictionary_name] = {}
-
-        try:
-            word1, word2 = word.split(":")
-            dictionaries[dictionary_name][word1] = word2
-        except ValueError:
-            print("Word must be in 'word1:word2' format")
-            return
-
-        conn = await get_connection()
-        await conn.execute(
-            "UPDATE users SET dictionaries = $1 WHERE telegram_id = $2",
-            json.dumps(dictionaries), telegram_id
-        )
-        await conn.close()
-
-
-async def delete_word_from_dict(telegram_id, dictionary_name, word):
-    dictionaries = await get_user_dictionaries(telegram_id)
-    if dictionaries is not None:
-        if dictionary_name in dictionaries and word in dictionaries[dictionary_name]:
-            dictionaries[dictionary_name].pop(word)
-            conn = await get_connection()
-            await conn.execute(
-                "UPDATE users SET dictionaries = $1 WHERE telegram_id = $2",
-                json.dumps(dictionaries), telegram_id
-            )
-            await conn.close()
-        else:
-            print(f"Word '{word}' not found in dictionary '{dictionary_name}' for user {telegram_id}.")
-
-
-async def delete_dictionary(telegram_id, dictionary_name):
-    dictionaries = await get_user_dictionaries(telegram_id)
-    if dictionaries is not None:
-        if dictionary_name in dictionaries:
-            dictionaries.pop(dictionary_name)
-            conn = await get_connection()
-            await conn.execute(
-                "UPDATE users SET dictionaries = $1 WHERE telegram_id = $2",
-                json.dumps(dictionaries), telegram_id
+    python -m db.async_db import-users users.txt
+    python -m db.async_db import-words words.csv
+    python -m db.async_db export dictionaries.csv [telegram_id ...]
+"""
+import argparse
+import asyncio
+import csv
+from typing import AsyncIterator, Iterable, Optional
+
+from db.init_db import db
+from db.models import Database
+from utils.metrics import metrics, timed
+
+
+async def get_user_data(user_id: int, database: Database = db) -> Optional[dict]:
+    return await database.get_user_data(user_id)
+
+
+async def bulk_add_users(telegram_ids: Iterable[int], database: Database = db) -> int:
+    """Добавляет пользователей через COPY, существующие пропускает. Возвращает число новых"""
+    with timed(metrics.observe_db, "bulk_add_users"):
+        async with database.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "CREATE TEMP TABLE tmp_users (telegram_id BIGINT) ON COMMIT DROP"
+                )
+                await conn.copy_records_to_table(
+                    "tmp_users", records=((telegram_id,) for telegram_id in telegram_ids)
+                )
+                status = await conn.execute(
+                    """
+                    INSERT INTO users (telegram_id, registration_date)
+                    SELECT DISTINCT telegram_id, NOW() FROM tmp_users
+                    ON CONFLICT (telegram_id) DO NOTHING
+                    """
+                )
+    return int(status.split()[-1])
+
+
+async def bulk_import_words(rows: Iterable[tuple[int, str, str, str]], database: Database = db) -> int:
+    """
+    Загружает пары (telegram_id, dict_name, word, translation) через COPY.
+    Недостающие словари создаются, существующие слова получают новый перевод.
+    Возвращает число вставленных или обновлённых пар.
+    """
+    with timed(metrics.observe_db, "bulk_import_words"):
+        async with database.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE tmp_words (
+                        telegram_id BIGINT, name TEXT, word TEXT, translation TEXT
+                    ) ON COMMIT DROP
+                    """
+                )
+                await conn.copy_records_to_table(
+                    "tmp_words",
+                    records=(
+                        (telegram_id, dict_name, word.lower().strip(), translation.lower().strip())
+                        for telegram_id, dict_name, word, translation in rows
+                    ),
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO dictionaries (telegram_id, name)
+                    SELECT DISTINCT telegram_id, name FROM tmp_words
+                    ON CONFLICT (telegram_id, name) DO NOTHING
+                    """
+                )
+                status = await conn.execute(
+                    """
+                    INSERT INTO word_pairs (dictionary_id, word, translation)
+                    SELECT DISTINCT ON (d.id, t.word) d.id, t.word, t.translation
+                    FROM tmp_words t
+                    JOIN dictionaries d ON d.telegram_id = t.telegram_id AND d.name = t.name
+                    WHERE t.word <> '' AND t.translation <> ''
+                    ORDER BY d.id, t.word
+                    ON CONFLICT (dictionary_id, word) DO UPDATE SET translation = EXCLUDED.translation
+                    """
+                )
+                touched = await conn.fetch("SELECT DISTINCT telegram_id, name FROM tmp_words")
+
+    # Сбрасывает кэши только этого процесса, см. описание модуля
+    for row in touched:
+        database.cache.invalidate(row["telegram_id"])
+        database.search_indexes.invalidate(row["telegram_id"], row["name"])
+        database.pages.bump(row["telegram_id"], row["name"])
+    return int(status.split()[-1])
+
+
+async def iter_dictionaries(telegram_ids: Optional[list[int]] = None, database: Database = db,
+                            prefetch: int = 1000) -> AsyncIterator[tuple[int, str, str, str]]:
+    """Серверный курсор по всем парам (telegram_id, dict_name, word, translation)"""
+    async with database.acquire() as conn:
+        async with conn.transaction():
+            async for row in conn.cursor(
+                """
+                SELECT d.telegram_id, d.name, w.word, w.translation
+                FROM dictionaries d
+                JOIN word_pairs w ON w.dictionary_id = d.id
+                WHERE $1::BIGINT[] IS NULL OR d.telegram_id = ANY($1::BIGINT[])
+                ORDER BY d.telegram_id, d.id, w.id
+                """,
+                telegram_ids,
+                prefetch=prefetch,
+            ):
+                yield row["telegram_id"], row["name"], row["word"], row["translation"]
+
+
+async def export_dictionaries(path: str, telegram_ids: Optional[list[int]] = None, database: Database = db):
+    """Выгружает словари в CSV-файл через COPY TO, не собирая их в памяти"""
+    with timed(metrics.observe_db, "export_dictionaries"):
+        async with database.acquire() as conn:
+            await conn.copy_from_query(
+                """
+                SELECT d.telegram_id, d.name AS dictionary, w.word, w.translation
+                FROM dictionaries d
+                JOIN word_pairs w ON w.dictionary_id = d.id
+                WHERE $1::BIGINT[] IS NULL OR d.telegram_id = ANY($1::BIGINT[])
+                ORDER BY d.telegram_id, d.id, w.id
+                """,
+                telegram_ids,
+                output=path,
+                format="csv",
+                header=True,
             )
-            await conn.close()
-        else:
-            print(f"Dictionary '{dictionary_name}' not found for user {telegram_id}.")
+
+
+def _read_words(path: str):
+    with open(path, newline="", encoding="utf-8") as file:
+        for telegram_id, dict_name, word, translation in csv.reader(file):
+            yield int(telegram_id), dict_name, word, translation
 
 
 async def main():
-    # await add_user_dictionaries(123123, "rus")
-    # await add_word_to_dict(123123, "rus", "value1:value2")
-    # await delete_word_from_dict(123123, "rus", "value1")
-    await delete_dictionary(123123, "rus")
-    dicts = await get_user_dictionaries(123123)
-    print(dicts)
-
-asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description="Bulk maintenance for dict_bot",
+        epilog="Running bots keep serving their cached dictionaries, pages and search indexes until "
+               "DICT_CACHE_TTL, PAGE_CACHE_TTL and SEARCH_INDEX_TTL expire; restart them to see imports at once.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_users = commands.add_parser("import-users", help="file with one telegram_id per line")
+    import_users.add_argument("path")
+    import_words = commands.add_parser("import-words", help="CSV: telegram_id,dictionary,word,translation")
+    import_words.add_argument("path")
+    export = commands.add_parser("export", help="export word pairs to CSV")
+    export.add_argument("path")
+    export.add_argument("telegram_ids", nargs="*", type=int)
+    args = parser.parse_args()
+
+    await db.connect()
+    try:
+        if args.command == "import-users":
+            with open(args.path, encoding="utf-8") as file:
+                added = await bulk_add_users(int(line) for line in file if line.strip())
+            print(f"✅ {added} users added.")
+        elif args.command == "import-words":
+            imported = await bulk_import_words(_read_words(args.path))
+            print(f"✅ {imported} word pairs imported.")
+        elif args.command == "export":
+            await export_dictionaries(args.path, args.telegram_ids or None)
+            print(f"✅ Dictionaries exported to {args.path}.")
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,184 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def _dictionary_size(dict_name: str, words: dict) -> int:
+    size = sys.getsizeof(dict_name) + sys.getsizeof(words)
+    for word, translation in words.items():
+        size += sys.getsizeof(word) + sys.getsizeof(translation)
+    return size
+
+
+def estimate_size(dictionaries: dict) -> int:
+    """Приблизительный размер словарей пользователя в байтах"""
+    size = sys.getsizeof(dictionaries)
+    for dict_name, words in dictionaries.items():
+        size += _dictionary_size(dict_name, words)
+    return size
+
+
+class DictionaryCache:
+    """LRU-кэш словарей пользователей с TTL и ограничением по памяти.
+
+    Значения отдаются без копирования, поэтому их нельзя изменять на месте.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # telegram_id -> (expires_at, size, dictionaries)
+        self._entries: OrderedDict[int, tuple[float, int, dict]] = OrderedDict()
+        self._epoch = 0
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def epoch(self) -> int:
+        """Меняется при каждой инвалидации; передаётся в set() перед чтением из БД"""
+        return self._epoch
+
+    def get(self, telegram_id: int) -> Optional[dict]:
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, _, dictionaries = entry
+        if expires_at <= time.monotonic():
+            self._drop(telegram_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(telegram_id)
+        self.hits += 1
+        return dictionaries
+
+    def set(self, telegram_id: int, dictionaries: dict, epoch: Optional[int] = None):
+        # Пока данные читались из БД, их могли изменить - такие данные не кэшируем
+        if epoch is not None and epoch != self._epoch:
+            return
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+
+        self._drop(telegram_id)
+        size = estimate_size(dictionaries)
+        if size > self.max_bytes:
+            return
+
+        self._entries[telegram_id] = (time.monotonic() + self.ttl, size, dictionaries)
+        self.total_bytes += size
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            evicted_id = next(iter(self._entries))
+            self._drop(evicted_id)
+            self.evictions += 1
+
+    def update_word(self, telegram_id: int, dict_name: str, word: str, translation: Optional[str] = None):
+        """Write-through: добавляет (translation) или удаляет (None) слово в закэшированных словарях"""
+        self._epoch += 1
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return
+
+        expires_at, size, dictionaries = entry
+        words = dictionaries.get(dict_name)
+        if words is None:
+            if translation is None:
+                return
+            words = dictionaries[dict_name] = {}
+            size += sys.getsizeof(dict_name) + sys.getsizeof(words)
+
+        old_translation = words.pop(word, None) if translation is None else words.get(word)
+        if old_translation is not None:
+            size -= sys.getsizeof(old_translation)
+            if translation is None:
+                size -= sys.getsizeof(word)
+        if translation is not None:
+            words[word] = translation
+            size += sys.getsizeof(translation)
+            if old_translation is None:
+                size += sys.getsizeof(word)
+
+        self._entries[telegram_id] = (expires_at, size, dictionaries)
+        self.total_bytes += size - entry[1]
+
+    def update_dictionary(self, telegram_id: int, dict_name: str, remove: bool = False):
+        """Write-through: создаёт пустой или удаляет словарь в закэшированных словарях"""
+        self._epoch += 1
+        entry = self._entries.get(telegram_id)
+        if entry is None:
+            return
+
+        expires_at, size, dictionaries = entry
+        if remove:
+            if dict_name not in dictionaries:
+                return
+            size -= _dictionary_size(dict_name, dictionaries.pop(dict_name))
+        elif dict_name not in dictionaries:
+            dictionaries[dict_name] = {}
+            size += sys.getsizeof(dict_name) + sys.getsizeof(dictionaries[dict_name])
+        else:
+            return
+
+        self._entries[telegram_id] = (expires_at, size, dictionaries)
+        self.total_bytes += size - entry[1]
+
+    def invalidate(self, telegram_id: int):
+        self._epoch += 1
+        self._drop(telegram_id)
+
+    def clear(self):
+        self._epoch += 1
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _drop(self, telegram_id: int):
+        entry = self._entries.pop(telegram_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[1]
+
+
+class KnownUsers:
+    """LRU-множество пользователей, уже записанных в БД.
+
+    Повторные /start известных пользователей не ходят в БД. Пользователи
+    не удаляются, поэтому вытеснение стоит лишь одного лишнего upsert.
+    """
+
+    def __init__(self, max_entries: int = 100_000):
+        self.max_entries = max_entries
+        self._ids: OrderedDict[int, None] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, telegram_id: int) -> bool:
+        if telegram_id in self._ids:
+            self._ids.move_to_end(telegram_id)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, telegram_id: int):
+        if self.max_entries <= 0:
+            return
+        self._ids[telegram_id] = None
+        self._ids.move_to_end(telegram_id)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._ids), "hits": self.hits, "misses": self.misses}
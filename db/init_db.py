@@ -1,6 +1,11 @@
 import asyncio
 import os
+from db.cache import DictionaryCache, KnownUsers
 from db.models import Database
+from db.pool import PoolStats
+from db.recorder import AnswerRecorder
+from utils.page_cache import PageCache
+from utils.search_index import SearchIndexCache
 
 from dotenv import load_dotenv, find_dotenv
 
@@ -13,7 +18,40 @@ db_config = {
     "port": os.getenv("PGPORT")
 }
 
+dictionary_cache = DictionaryCache(
+    max_entries=int(os.getenv("DICT_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("DICT_CACHE_TTL", 300)),
+    max_bytes=int(os.getenv("DICT_CACHE_MAX_MB", 64)) * 1024 * 1024,
+)
 
-db = Database(db_config)
+pool_config = {
+    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+    "max_inactive_connection_lifetime": float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300)),
+    "command_timeout": float(os.getenv("DB_COMMAND_TIMEOUT", 10)),
+}
+
+search_indexes = SearchIndexCache(
+    max_entries=int(os.getenv("SEARCH_INDEX_CACHE_SIZE", 256)),
+    ttl=float(os.getenv("SEARCH_INDEX_TTL", os.getenv("DICT_CACHE_TTL", 300))),
+)
 
+db = Database(
+    db_config,
+    cache=dictionary_cache,
+    search_indexes=search_indexes,
+    pages=PageCache(
+        max_entries=int(os.getenv("PAGE_CACHE_SIZE", 1024)),
+        ttl=float(os.getenv("PAGE_CACHE_TTL", os.getenv("DICT_CACHE_TTL", 300))),
+    ),
+    pool_config=pool_config,
+    pool_stats=PoolStats(slow_acquire=float(os.getenv("DB_POOL_SLOW_ACQUIRE_MS", 100)) / 1000),
+    report_interval=float(os.getenv("DB_POOL_REPORT_INTERVAL", 0)),
+    known_users=KnownUsers(max_entries=int(os.getenv("KNOWN_USERS_SIZE", 100_000))),
+)
 
+answer_recorder = AnswerRecorder(
+    db,
+    batch_size=int(os.getenv("ANSWER_BATCH_SIZE", 200)),
+    flush_interval=float(os.getenv("ANSWER_FLUSH_MS", 1000)) / 1000,
+)
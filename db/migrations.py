@@ -0,0 +1,202 @@
+import json
+import logging
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+async def _base_schema(conn: asyncpg.Connection):
+    """Таблица пользователей (существовала до миграций)"""
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            telegram_id BIGINT PRIMARY KEY,
+            registration_date TIMESTAMP NOT NULL DEFAULT NOW(),
+            dictionaries JSONB
+        )
+        """
+    )
+
+
+async def _normalized_dictionaries(conn: asyncpg.Connection):
+    """Словари и пары слов в отдельных таблицах"""
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS dictionaries (
+            id BIGSERIAL PRIMARY KEY,
+            telegram_id BIGINT NOT NULL,
+            name TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            UNIQUE (telegram_id, name)
+        );
+
+        CREATE TABLE IF NOT EXISTS word_pairs (
+            id BIGSERIAL PRIMARY KEY,
+            dictionary_id BIGINT NOT NULL REFERENCES dictionaries (id) ON DELETE CASCADE,
+            word TEXT NOT NULL,
+            translation TEXT NOT NULL,
+            UNIQUE (dictionary_id, word)
+        );
+
+        CREATE INDEX IF NOT EXISTS word_pairs_translation_idx
+            ON word_pairs (dictionary_id, translation);
+        """
+    )
+
+
+async def _move_json_dictionaries(conn: asyncpg.Connection):
+    """Переносит JSON из users.dictionaries в новые таблицы"""
+    rows = await conn.fetch(
+        "SELECT telegram_id, dictionaries FROM users WHERE dictionaries IS NOT NULL"
+    )
+    for row in rows:
+        dictionaries = row["dictionaries"]
+        if isinstance(dictionaries, str):
+            dictionaries = json.loads(dictionaries)
+        if not isinstance(dictionaries, dict):
+            continue
+
+        for dict_name, words in dictionaries.items():
+            dict_id = await conn.fetchval(
+                """
+                INSERT INTO dictionaries (telegram_id, name) VALUES ($1, $2)
+                ON CONFLICT (telegram_id, name) DO UPDATE SET name = EXCLUDED.name
+                RETURNING id
+                """,
+                row["telegram_id"], dict_name,
+            )
+            if not isinstance(words, dict) or not words:
+                continue
+            await conn.executemany(
+                """
+                INSERT INTO word_pairs (dictionary_id, word, translation) VALUES ($1, $2, $3)
+                ON CONFLICT (dictionary_id, word) DO NOTHING
+                """,
+                [(dict_id, word, str(translation)) for word, translation in words.items()],
+            )
+
+
+async def _word_count(conn: asyncpg.Connection):
+    """Счётчик слов в dictionaries, который поддерживают триггеры word_pairs"""
+    await conn.execute(
+        """
+        ALTER TABLE dictionaries ADD COLUMN IF NOT EXISTS word_count INTEGER NOT NULL DEFAULT 0;
+
+        CREATE OR REPLACE FUNCTION word_pairs_count_insert() RETURNS trigger AS $$
+        BEGIN
+            UPDATE dictionaries d SET word_count = d.word_count + n.cnt
+            FROM (SELECT dictionary_id, COUNT(*) AS cnt FROM new_rows GROUP BY dictionary_id) n
+            WHERE d.id = n.dictionary_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        CREATE OR REPLACE FUNCTION word_pairs_count_delete() RETURNS trigger AS $$
+        BEGIN
+            UPDATE dictionaries d SET word_count = d.word_count - o.cnt
+            FROM (SELECT dictionary_id, COUNT(*) AS cnt FROM old_rows GROUP BY dictionary_id) o
+            WHERE d.id = o.dictionary_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        DROP TRIGGER IF EXISTS word_pairs_count_insert ON word_pairs;
+        CREATE TRIGGER word_pairs_count_insert AFTER INSERT ON word_pairs
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION word_pairs_count_insert();
+
+        DROP TRIGGER IF EXISTS word_pairs_count_delete ON word_pairs;
+        CREATE TRIGGER word_pairs_count_delete AFTER DELETE ON word_pairs
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION word_pairs_count_delete();
+
+        UPDATE dictionaries d
+        SET word_count = (SELECT COUNT(*) FROM word_pairs w WHERE w.dictionary_id = d.id);
+        """
+    )
+
+
+async def _keyset_index(conn: asyncpg.Connection):
+    """Индекс для постраничного чтения словаря по id"""
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS word_pairs_dictionary_id_idx ON word_pairs (dictionary_id, id)"
+    )
+
+
+async def _word_reviews(conn: asyncpg.Connection):
+    """Состояние интервальных повторений: отдельно для прямого и обратного теста"""
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS word_reviews (
+            word_pair_id BIGINT NOT NULL REFERENCES word_pairs (id) ON DELETE CASCADE,
+            reversed BOOLEAN NOT NULL,
+            dictionary_id BIGINT NOT NULL REFERENCES dictionaries (id) ON DELETE CASCADE,
+            easiness REAL NOT NULL,
+            interval_days REAL NOT NULL,
+            repetitions INTEGER NOT NULL,
+            due_at TIMESTAMPTZ NOT NULL,
+            reviewed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (word_pair_id, reversed)
+        );
+
+        CREATE INDEX IF NOT EXISTS word_reviews_due_idx
+            ON word_reviews (dictionary_id, reversed, due_at);
+        """
+    )
+
+
+async def _answer_history(conn: asyncpg.Connection):
+    """История ответов в тестах и накопленная статистика по каждому слову"""
+    await conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS test_answers (
+            id BIGSERIAL PRIMARY KEY,
+            session_id UUID NOT NULL,
+            telegram_id BIGINT NOT NULL,
+            word_pair_id BIGINT NOT NULL REFERENCES word_pairs (id) ON DELETE CASCADE,
+            reversed BOOLEAN NOT NULL,
+            is_correct BOOLEAN NOT NULL,
+            answered_at TIMESTAMPTZ NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS test_answers_session_idx ON test_answers (telegram_id, session_id);
+
+        CREATE TABLE IF NOT EXISTS word_stats (
+            word_pair_id BIGINT NOT NULL REFERENCES word_pairs (id) ON DELETE CASCADE,
+            reversed BOOLEAN NOT NULL,
+            correct INTEGER NOT NULL DEFAULT 0,
+            wrong INTEGER NOT NULL DEFAULT 0,
+            last_answered_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (word_pair_id, reversed)
+        );
+        """
+    )
+
+
+# Порядок важен: новая миграция добавляется только в конец списка
+MIGRATIONS = [
+    _base_schema,
+    _normalized_dictionaries,
+    _move_json_dictionaries,
+    _word_count,
+    _keyset_index,
+    _word_reviews,
+    _answer_history,
+]
+
+
+async def migrate(conn: asyncpg.Connection):
+    """Применяет миграции, которых ещё нет в schema_version"""
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+    )
+    async with conn.transaction():
+        # Блокировка не даёт двум процессам бота мигрировать одновременно
+        await conn.execute("LOCK TABLE schema_version IN EXCLUSIVE MODE")
+        version = await conn.fetchval("SELECT MAX(version) FROM schema_version") or 0
+
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            await migration(conn)
+            await conn.execute("INSERT INTO schema_version (version) VALUES ($1)", number)
+            logger.info("Migration %s (%s) applied.", number, migration.__name__)
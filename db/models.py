@@ -1,121 +1,377 @@
 import asyncio
+import logging
 import os
 
 import asyncpg
-import json
-from typing import Optional
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
 
 from dotenv import load_dotenv, find_dotenv
 
+from db.cache import DictionaryCache, KnownUsers
+from db.migrations import migrate
+from db.pool import PoolStats, PreparedConnection, prepare_statements
+from utils.page_cache import PageCache
+from utils.search_index import DictionarySearchIndex, SearchIndexCache
+from utils.metrics import metrics, timed
+from utils.srs import ReviewState
+
+logger = logging.getLogger(__name__)
+
 load_dotenv(find_dotenv())
 
 
 class Database:
-    def __init__(self, db_config: dict):
+    def __init__(self, db_config: dict, cache: Optional[DictionaryCache] = None,
+                 search_indexes: Optional[SearchIndexCache] = None, pages: Optional[PageCache] = None,
+                 pool_config: Optional[dict] = None, pool_stats: Optional[PoolStats] = None,
+                 report_interval: float = 0, known_users: Optional[KnownUsers] = None):
         self.db_config = db_config
+        self.pool_config = pool_config or {}
         self.pool: Optional[asyncpg.Pool] = None
+        self.pool_stats = pool_stats or PoolStats()
+        self.report_interval = report_interval
+        self._report_task: Optional[asyncio.Task] = None
+        self.cache = cache or DictionaryCache()
+        self.search_indexes = search_indexes or SearchIndexCache()
+        self.pages = pages or PageCache()
+        self.known_users = known_users or KnownUsers()
 
     async def connect(self):
         """Инициализирует пул соединений"""
-        self.pool = await asyncpg.create_pool(**self.db_config)
-        print("✅ Database connected.")
+        # Миграции идут до пула: соединения пула готовят запросы к уже новой схеме
+        conn = await asyncpg.connect(**self.db_config)
+        try:
+            await migrate(conn)
+        finally:
+            await conn.close()
+
+        self.pool = await asyncpg.create_pool(
+            **self.db_config,
+            **self.pool_config,
+            connection_class=PreparedConnection,
+            init=prepare_statements,
+        )
+        if self.report_interval > 0:
+            self._report_task = asyncio.create_task(self.__report_pool_stats())
+        logger.info("Database connected.")
 
     async def close(self):
         """Закрывает пул соединений"""
+        if self._report_task:
+            self._report_task.cancel()
         if self.pool:
             await self.pool.close()
-            print("✅ Database disconnected.")
+            logger.info("Database disconnected.")
+
+    # ---------------------- POOL ----------------------
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[PreparedConnection]:
+        """Соединение из пула с учётом времени ожидания"""
+        started = self.pool_stats.start_wait()
+        try:
+            conn = await self.pool.acquire()
+        finally:
+            self.pool_stats.end_wait(started)
+        try:
+            yield conn
+        finally:
+            await self.pool.release(conn)
+
+    # Время запросов учитывает и ожидание соединения: это то, что видит обработчик
+    async def fetch(self, query: str, *args) -> list:
+        with timed(metrics.observe_db, query):
+            async with self.acquire() as conn:
+                return await conn.statements[query].fetch(*args)
+
+    async def fetchrow(self, query: str, *args) -> Optional[asyncpg.Record]:
+        with timed(metrics.observe_db, query):
+            async with self.acquire() as conn:
+                return await conn.statements[query].fetchrow(*args)
+
+    async def fetchval(self, query: str, *args):
+        with timed(metrics.observe_db, query):
+            async with self.acquire() as conn:
+                return await conn.statements[query].fetchval(*args)
+
+    def get_pool_stats(self) -> dict:
+        return self.pool_stats.snapshot(self.pool)
+
+    async def __report_pool_stats(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info("DB pool stats.", extra={"pool": self.get_pool_stats()})
 
     # ---------------------- USERS ----------------------
 
     async def get_user_data(self, telegram_id: int) -> Optional[dict]:
-        async with self.pool.acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM users WHERE telegram_id = $1", telegram_id
-            )
-            return dict(row) if row else None
+        row = await self.fetchrow("get_user", telegram_id)
+        return dict(row) if row else None
 
-    async def add_user(self, telegram_id: int):
-        async with self.pool.acquire() as conn:
-            async with conn.transaction():
-                try:
-                    await conn.execute(
-                        "INSERT INTO users (telegram_id, registration_date) VALUES ($1, NOW())",
-                        telegram_id,
-                    )
-                    print(f"✅ User {telegram_id} added.")
-                except Exception as e:
-                    print(f"❌ Error adding user: {e}")
+    async def ensure_user(self, telegram_id: int) -> bool:
+        """Регистрирует пользователя за один запрос; True, если он новый"""
+        if telegram_id in self.known_users:
+            return False
+        created = await self.fetchval("ensure_user", telegram_id) is not None
+        self.known_users.add(telegram_id)
+        if created:
+            logger.info("User added.", extra={"user_id": telegram_id})
+        return created
 
     async def get_user_dictionaries(self, telegram_id: int) -> Optional[dict]:
-        user = await self.get_user_data(telegram_id)
-        if user and user.get("dictionaries"):
-            dictionaries = user["dictionaries"]
-            if isinstance(dictionaries, str):
-                return json.loads(dictionaries)
-            return dictionaries
-        return {}
-
-    async def __update_dictionaries(self, telegram_id: int, dictionaries: dict):
-        async with self.pool.acquire() as conn:
+        """Словари пользователя; результат кэшируется и не должен изменяться"""
+        cached = self.cache.get(telegram_id)
+        if cached is not None:
+            return cached
+
+        epoch = self.cache.epoch
+        rows = await self.fetch("get_user_dictionaries", telegram_id)
+
+        dictionaries = {}
+        for row in rows:
+            words = dictionaries.setdefault(row["name"], {})
+            if row["word"] is not None:
+                words[row["word"]] = row["translation"]
+
+        self.cache.set(telegram_id, dictionaries, epoch)
+        return dictionaries
+
+    async def iter_words(self, telegram_id: int, dict_name: Optional[str] = None,
+                         prefetch: int = 500) -> AsyncIterator[tuple[str, Optional[str], Optional[str]]]:
+        """Серверный курсор по парам (dict_name, word, translation) одного или всех словарей.
+
+        Пустой словарь даёт одну строку с word = None. Соединение занято, пока курсор не дочитан.
+        """
+        async with self.acquire() as conn:
             async with conn.transaction():
-                await conn.execute(
-                    "UPDATE users SET dictionaries = $1 WHERE telegram_id = $2",
-                    json.dumps(dictionaries), telegram_id
-                )
+                cursor = conn.statements["export_words"].cursor(telegram_id, dict_name, prefetch=prefetch)
+                async for row in cursor:
+                    yield row["name"], row["word"], row["translation"]
 
-    async def add_user_dictionaries(self, telegram_id: int, dict_name: str):
-        dictionaries = await self.get_user_dictionaries(telegram_id)
-        dictionaries[dict_name] = {}
-        await self.__update_dictionaries(telegram_id, dictionaries)
+    async def get_search_index(self, telegram_id: int, dict_name: str) -> DictionarySearchIndex:
+        """Поисковый индекс словаря; строится один раз и дальше обновляется мутациями"""
+        index = self.search_indexes.get(telegram_id, dict_name)
+        if index is None:
+            # Версия страниц меняется при каждой мутации словаря
+            version = self.pages.version(telegram_id, dict_name)
+            dictionaries = await self.get_user_dictionaries(telegram_id)
+            index = DictionarySearchIndex(dictionaries.get(dict_name, {}).items())
+            self.search_indexes.set(telegram_id, dict_name, index,
+                                    version, self.pages.version(telegram_id, dict_name))
+        return index
+
+    async def count_words(self, telegram_id: int, dict_name: str) -> int:
+        return await self.fetchval("count_words", telegram_id, dict_name) or 0
+
+    async def get_words_page(self, telegram_id: int, dict_name: str, limit: int, offset: int = 0,
+                             after_id: Optional[int] = None, before_id: Optional[int] = None) -> list:
+        """Одна страница пар (id, word, translation) по порядку добавления.
 
-    async def add_word_to_dict(self, telegram_id: int, dict_name: str, word: str):
-        dictionaries = await self.get_user_dictionaries(telegram_id)
+        after_id/before_id включают keyset-пагинацию, иначе используется offset.
+        """
+        if after_id is not None:
+            return await self.fetch("words_page_after", telegram_id, dict_name, after_id, limit)
+        if before_id is not None:
+            rows = await self.fetch("words_page_before", telegram_id, dict_name, before_id, limit)
+            return rows[::-1]
+        return await self.fetch("words_page", telegram_id, dict_name, limit, offset)
 
-        if dict_name not in dictionaries or not isinstance(dictionaries[dict_name], dict):
-            dictionaries[dict_name] = {}
+    # ---------------------- DICTIONARIES ----------------------
+    # Каждая мутация - один SQL-запрос: строка словаря блокируется внутри запроса,
+    # поэтому параллельные изменения не затирают друг друга, а word_count точен.
 
+    async def add_user_dictionaries(self, telegram_id: int, dict_name: str):
+        await self.fetch("add_dictionary", telegram_id, dict_name)
+        self.cache.update_dictionary(telegram_id, dict_name)
+        self.pages.bump(telegram_id, dict_name)
+
+    async def add_word_to_dict(self, telegram_id: int, dict_name: str, word: str) -> Optional[int]:
+        """Добавляет или обновляет пару слов, возвращает число слов в словаре"""
         try:
             word1, word2 = word.split(":")
-            word1 = word1.lower()
-            word2 = word2.lower()
-            dictionaries[dict_name][word1.strip()] = word2.strip()
+            word1 = word1.lower().strip()
+            word2 = word2.lower().strip()
         except ValueError:
-            print("❌ Invalid word format. Use 'word:translation'.")
-            return
+            logger.warning("Invalid word format, expected 'word:translation'.", extra={"dictionary": dict_name})
+            return None
 
-        await self.__update_dictionaries(telegram_id, dictionaries)
-
-    async def delete_word_from_dict(self, telegram_id: int, dict_name: str, word: str):
-        dictionaries = await self.get_user_dictionaries(telegram_id)
-
-        if dict_name in dictionaries and word in dictionaries[dict_name]:
-            dictionaries[dict_name].pop(word)
-            await self.__update_dictionaries(telegram_id, dictionaries)
-        else:
-            print(f"❌ Word '{word}' not found in dictionary '{dict_name}'.")
-
-    async def edit_word_in_dict(self, telegram_id: int, dict_name: str, word: str, new_translation: str):
-        dictionaries = await self.get_user_dictionaries(telegram_id)
-        current_dict = dictionaries[dict_name]
-
-        if dict_name in dictionaries and word in current_dict:
-            current_dict[new_translation] = current_dict.pop(word)
-            await self.__update_dictionaries(telegram_id, dictionaries)
-        elif dict_name in dictionaries and word in current_dict.values():
-            for key in current_dict:
-                if current_dict[key] == word:
-                    current_dict[key] = new_translation
-                    break
-            await self.__update_dictionaries(telegram_id, dictionaries)
-        else:
-            print(f"❌ Word '{word}' not found in dictionary '{dict_name}'.")
+        word_count = await self.fetchval("add_word", telegram_id, dict_name, word1, word2)
+        self.cache.update_word(telegram_id, dict_name, word1, word2)
+        self.pages.bump(telegram_id, dict_name)
+        index = self.search_indexes.get(telegram_id, dict_name)
+        if index is not None:
+            index.add(word1, word2)
+        return word_count
+
+    async def import_words(self, telegram_id: int, dict_name: str,
+                           batches: AsyncIterator[list[tuple[str, str]]],
+                           on_progress: Optional[Callable[[int], Awaitable[None]]] = None) -> int:
+        """Загружает пары (word, translation) пачками через COPY в одной транзакции.
+
+        Существующие слова получают новый перевод. Возвращает число слов в словаре.
+        """
+        with timed(metrics.observe_db, "import_words"):
+            async with self.acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(
+                        "CREATE TEMP TABLE tmp_import (word TEXT, translation TEXT) ON COMMIT DROP"
+                    )
+                    copied = 0
+                    async for batch in batches:
+                        await conn.copy_records_to_table("tmp_import", records=batch)
+                        copied += len(batch)
+                        if on_progress:
+                            await on_progress(copied)
+                    word_count = await conn.fetchval(
+                        """
+                        WITH d AS (
+                            INSERT INTO dictionaries (telegram_id, name) VALUES ($1, $2)
+                            ON CONFLICT (telegram_id, name) DO UPDATE SET name = EXCLUDED.name
+                            RETURNING id, word_count
+                        ), w AS (
+                            INSERT INTO word_pairs (dictionary_id, word, translation)
+                            SELECT DISTINCT ON (t.word) d.id, t.word, t.translation FROM d, tmp_import t
+                            ORDER BY t.word
+                            ON CONFLICT (dictionary_id, word) DO UPDATE SET translation = EXCLUDED.translation
+                            RETURNING xmax = 0 AS inserted
+                        )
+                        SELECT d.word_count + (SELECT COUNT(*) FROM w WHERE w.inserted) FROM d
+                        """,
+                        telegram_id, dict_name,
+                    )
+
+        self.cache.invalidate(telegram_id)
+        self.search_indexes.invalidate(telegram_id, dict_name)
+        self.pages.bump(telegram_id, dict_name)
+        return word_count
+
+    async def delete_word_from_dict(self, telegram_id: int, dict_name: str, word: str) -> Optional[int]:
+        """Удаляет пару по ключу, возвращает число слов или None, если слово не найдено"""
+        row = await self.fetchrow("delete_word", telegram_id, dict_name, word)
+
+        if not row or not row["changed"]:
+            logger.warning("Word not found.", extra={"word": word, "dictionary": dict_name})
+            return None
+
+        self.cache.update_word(telegram_id, dict_name, word)
+        self.pages.bump(telegram_id, dict_name)
+        index = self.search_indexes.get(telegram_id, dict_name)
+        if index is not None:
+            index.remove(word)
+        return row["word_count"]
+
+    async def edit_word_in_dict(self, telegram_id: int, dict_name: str, word: str,
+                                new_translation: str) -> Optional[int]:
+        """Меняет ключ или перевод пары, возвращает число слов или None, если слово не найдено"""
+        row = await self.fetchrow("edit_word", telegram_id, dict_name, word, new_translation)
+
+        if not row or not row["changed"]:
+            logger.warning("Word not found.", extra={"word": word, "dictionary": dict_name})
+            return None
+
+        # Переименование ключа в кэше пришлось бы делать с перестройкой словаря - проще перечитать
+        self.cache.invalidate(telegram_id)
+        self.pages.bump(telegram_id, dict_name)
+        index = self.search_indexes.get(telegram_id, dict_name)
+        if index is not None and not index.edit(word, new_translation):
+            # Изменён перевод: какую из пар с ним выбрала БД, индекс не знает
+            self.search_indexes.invalidate(telegram_id, dict_name)
+        return row["word_count"]
 
     async def delete_dictionary(self, telegram_id: int, dict_name: str):
-        dictionaries = await self.get_user_dictionaries(telegram_id)
+        if await self.fetchval("delete_dictionary", telegram_id, dict_name) is None:
+            logger.warning("Dictionary not found.", extra={"user_id": telegram_id, "dictionary": dict_name})
+            return
+        self.cache.update_dictionary(telegram_id, dict_name, remove=True)
+        self.pages.bump(telegram_id, dict_name)
+        self.search_indexes.invalidate(telegram_id, dict_name)
+
+    # ---------------------- REVIEWS ----------------------
+
+    async def get_due_words(self, telegram_id: int, dict_name: str, is_reversed: bool,
+                            limit: int, exclude: Iterable[int] = ()) -> list[tuple[int, str, str, ReviewState]]:
+        """Слова, которые пора повторить, без загрузки всего словаря.
 
-        if dict_name in dictionaries:
-            dictionaries.pop(dict_name)
-            await self.__update_dictionaries(telegram_id, dictionaries)
-        else:
-            print(f"❌ Dictionary '{dict_name}' not found for user {telegram_id}.")
+        exclude - id слов, ответы на которые ещё не записаны в базу
+        """
+        rows = await self.fetch("due_words", telegram_id, dict_name, is_reversed, limit, list(exclude))
+        due = []
+        for row in rows:
+            state = ReviewState() if row["easiness"] is None else ReviewState(
+                row["easiness"], row["interval_days"], row["repetitions"]
+            )
+            if is_reversed:
+                due.append((row["id"], row["translation"], row["word"], state))
+            else:
+                due.append((row["id"], row["word"], row["translation"], state))
+        return due
+
+    async def sample_answers(self, telegram_id: int, dict_name: str, is_reversed: bool, limit: int) -> list[str]:
+        """Не больше limit случайных ответов словаря (переводов, а для обратного теста - слов)"""
+        rows = await self.fetch("sample_answers", telegram_id, dict_name, is_reversed, limit)
+        return [row["answer"] for row in rows]
+
+    async def record_answers(self, answers: list[tuple]):
+        """Пачка ответов из AnswerRecorder: история, статистика и состояние повторений.
+
+        Строки: (session_id, telegram_id, word_pair_id, reversed, is_correct, answered_at,
+        easiness, interval_days, repetitions, due_at). Ответы по удалённым словам пропускаются.
+        """
+        with timed(metrics.observe_db, "record_answers"):
+            await self.__record_answers(answers)
+
+    async def __record_answers(self, answers: list[tuple]):
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    """
+                    CREATE TEMP TABLE tmp_answers (
+                        session_id UUID, telegram_id BIGINT, word_pair_id BIGINT, reversed BOOLEAN,
+                        is_correct BOOLEAN, answered_at TIMESTAMPTZ, easiness REAL, interval_days REAL,
+                        repetitions INTEGER, due_at TIMESTAMPTZ
+                    ) ON COMMIT DROP
+                    """
+                )
+                await conn.copy_records_to_table("tmp_answers", records=answers)
+                await conn.execute(
+                    """
+                    INSERT INTO test_answers
+                        (session_id, telegram_id, word_pair_id, reversed, is_correct, answered_at)
+                    SELECT t.session_id, t.telegram_id, t.word_pair_id, t.reversed, t.is_correct, t.answered_at
+                    FROM tmp_answers t JOIN word_pairs w ON w.id = t.word_pair_id
+                    ORDER BY t.answered_at
+                    """
+                )
+                await conn.execute(
+                    """
+                    INSERT INTO word_stats AS s (word_pair_id, reversed, correct, wrong, last_answered_at)
+                    SELECT t.word_pair_id, t.reversed,
+                           COUNT(*) FILTER (WHERE t.is_correct), COUNT(*) FILTER (WHERE NOT t.is_correct),
+                           MAX(t.answered_at)
+                    FROM tmp_answers t JOIN word_pairs w ON w.id = t.word_pair_id
+                    GROUP BY t.word_pair_id, t.reversed
+                    ON CONFLICT (word_pair_id, reversed) DO UPDATE SET
+                        correct = s.correct + EXCLUDED.correct,
+                        wrong = s.wrong + EXCLUDED.wrong,
+                        last_answered_at = GREATEST(s.last_answered_at, EXCLUDED.last_answered_at)
+                    """
+                )
+                # У слова остаётся состояние после последнего ответа в пачке
+                await conn.execute(
+                    """
+                    INSERT INTO word_reviews
+                        (word_pair_id, reversed, dictionary_id, easiness, interval_days, repetitions, due_at)
+                    SELECT DISTINCT ON (t.word_pair_id, t.reversed)
+                           t.word_pair_id, t.reversed, w.dictionary_id,
+                           t.easiness, t.interval_days, t.repetitions, t.due_at
+                    FROM tmp_answers t JOIN word_pairs w ON w.id = t.word_pair_id
+                    ORDER BY t.word_pair_id, t.reversed, t.answered_at DESC
+                    ON CONFLICT (word_pair_id, reversed) DO UPDATE SET
+                        easiness = EXCLUDED.easiness,
+                        interval_days = EXCLUDED.interval_days,
+                        repetitions = EXCLUDED.repetitions,
+                        due_at = EXCLUDED.due_at,
+                        reviewed_at = NOW()
+                    """
+                )
@@ -0,0 +1,31 @@
+
+from db.models import Database
+from utils.paginator import PageSource
+
+
+class DictionaryPageSource(PageSource):
+    """Страницы словаря прямо из word_pairs; количество слов берётся из dictionaries.word_count"""
+
+    def __init__(self, db: Database, telegram_id: int, dict_name: str):
+        self.db = db
+        self.telegram_id = telegram_id
+        self.dict_name = dict_name
+
+    @staticmethod
+    def _pairs(rows) -> list:
+        return [(row["id"], (row["word"], row["translation"])) for row in rows]
+
+    async def count(self) -> int:
+        return await self.db.count_words(self.telegram_id, self.dict_name)
+
+    async def slice(self, offset: int, limit: int) -> list:
+        rows = await self.db.get_words_page(self.telegram_id, self.dict_name, limit, offset=offset)
+        return self._pairs(rows)
+
+    async def after(self, key: int, limit: int) -> list:
+        rows = await self.db.get_words_page(self.telegram_id, self.dict_name, limit, after_id=key)
+        return self._pairs(rows)
+
+    async def before(self, key: int, limit: int) -> list:
+        rows = await self.db.get_words_page(self.telegram_id, self.dict_name, limit, before_id=key)
+        return self._pairs(rows)
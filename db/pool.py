@@ -0,0 +1,62 @@
+import time
+from typing import Optional
+
+import asyncpg
+
+from db.queries import QUERIES
+
+
+class PreparedConnection(asyncpg.Connection):
+    """Соединение пула с заранее подготовленными запросами из реестра"""
+
+    statements: dict[str, asyncpg.prepared_stmt.PreparedStatement]
+
+
+async def prepare_statements(conn: PreparedConnection):
+    """init-колбэк пула: готовит все запросы реестра на новом соединении"""
+    conn.statements = {name: await conn.prepare(query) for name, query in QUERIES.items()}
+
+
+class PoolStats:
+    """Насыщение пула: сколько корутин ждут соединение и как долго"""
+
+    def __init__(self, slow_acquire: float = 0.1):
+        self.slow_acquire = slow_acquire
+        self.waiting = 0
+        self.max_waiting = 0
+        self.acquires = 0
+        self.slow_acquires = 0
+        self.total_acquire_time = 0.0
+        self.max_acquire_time = 0.0
+
+    def start_wait(self) -> float:
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        return time.perf_counter()
+
+    def end_wait(self, started: float):
+        elapsed = time.perf_counter() - started
+        self.waiting -= 1
+        self.acquires += 1
+        self.total_acquire_time += elapsed
+        self.max_acquire_time = max(self.max_acquire_time, elapsed)
+        if elapsed >= self.slow_acquire:
+            self.slow_acquires += 1
+
+    def snapshot(self, pool: Optional[asyncpg.Pool] = None) -> dict:
+        stats = {
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "acquires": self.acquires,
+            "slow_acquires": self.slow_acquires,
+            "avg_acquire_ms": round(1000 * self.total_acquire_time / self.acquires, 3) if self.acquires else 0.0,
+            "max_acquire_ms": round(1000 * self.max_acquire_time, 3),
+        }
+        if pool is not None:
+            stats.update(
+                size=pool.get_size(),
+                idle=pool.get_idle_size(),
+                min_size=pool.get_min_size(),
+                max_size=pool.get_max_size(),
+            )
+        return stats
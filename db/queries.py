@@ -0,0 +1,168 @@
+"""
+Реестр именованных запросов.
+
+Каждое соединение пула готовит их один раз при создании (см. db/pool.py),
+дальше Database вызывает их по имени без повторного разбора на сервере.
+"""
+
+_WORDS_PAGE = """
+    SELECT w.id, w.word, w.translation
+    FROM word_pairs w
+    JOIN dictionaries d ON d.id = w.dictionary_id
+    WHERE d.telegram_id = $1 AND d.name = $2
+"""
+
+QUERIES = {
+    # ---------------------- USERS ----------------------
+    "get_user": "SELECT * FROM users WHERE telegram_id = $1",
+
+    "ensure_user": """
+        INSERT INTO users (telegram_id, registration_date) VALUES ($1, NOW())
+        ON CONFLICT (telegram_id) DO NOTHING
+        RETURNING telegram_id
+    """,
+
+    "get_user_dictionaries": """
+        SELECT d.name, w.word, w.translation
+        FROM dictionaries d
+        LEFT JOIN word_pairs w ON w.dictionary_id = d.id
+        WHERE d.telegram_id = $1
+        ORDER BY d.id, w.id
+    """,
+
+    "export_words": """
+        SELECT d.name, w.word, w.translation
+        FROM dictionaries d
+        LEFT JOIN word_pairs w ON w.dictionary_id = d.id
+        WHERE d.telegram_id = $1 AND ($2::TEXT IS NULL OR d.name = $2)
+        ORDER BY d.id, w.id
+    """,
+
+    # ---------------------- PAGES ----------------------
+    "count_words": "SELECT word_count FROM dictionaries WHERE telegram_id = $1 AND name = $2",
+
+    "words_page": _WORDS_PAGE + " ORDER BY w.id LIMIT $3 OFFSET $4",
+
+    "words_page_after": _WORDS_PAGE + " AND w.id > $3 ORDER BY w.id LIMIT $4",
+
+    "words_page_before": _WORDS_PAGE + " AND w.id < $3 ORDER BY w.id DESC LIMIT $4",
+
+    # ---------------------- DICTIONARIES ----------------------
+    "add_dictionary": """
+        INSERT INTO dictionaries (telegram_id, name) VALUES ($1, $2)
+        ON CONFLICT (telegram_id, name) DO NOTHING
+    """,
+
+    "delete_dictionary": """
+        DELETE FROM dictionaries WHERE telegram_id = $1 AND name = $2
+        RETURNING id
+    """,
+
+    "add_word": """
+        WITH d AS (
+            INSERT INTO dictionaries (telegram_id, name) VALUES ($1, $2)
+            ON CONFLICT (telegram_id, name) DO UPDATE SET name = EXCLUDED.name
+            RETURNING id, word_count
+        ), w AS (
+            INSERT INTO word_pairs (dictionary_id, word, translation)
+            SELECT id, $3, $4 FROM d
+            ON CONFLICT (dictionary_id, word) DO UPDATE SET translation = EXCLUDED.translation
+            RETURNING xmax = 0 AS inserted
+        )
+        SELECT d.word_count + (SELECT COUNT(*) FROM w WHERE w.inserted) FROM d
+    """,
+
+    "delete_word": """
+        WITH d AS (
+            SELECT id, word_count FROM dictionaries
+            WHERE telegram_id = $1 AND name = $2
+            FOR UPDATE
+        ), del AS (
+            DELETE FROM word_pairs w USING d
+            WHERE w.dictionary_id = d.id AND w.word = $3
+            RETURNING w.id
+        )
+        SELECT d.word_count - (SELECT COUNT(*) FROM del) AS word_count,
+               (SELECT COUNT(*) FROM del) AS changed
+        FROM d
+    """,
+
+    "edit_word": """
+        WITH d AS (
+            SELECT id, word_count FROM dictionaries
+            WHERE telegram_id = $1 AND name = $2
+            FOR UPDATE
+        ), target AS (
+            -- ключ важнее перевода, среди переводов берётся самая старая пара
+            SELECT w.id, w.word = $3 AS is_key, w.translation
+            FROM word_pairs w JOIN d ON w.dictionary_id = d.id
+            WHERE w.word = $3 OR w.translation = $3
+            ORDER BY w.word = $3 DESC, w.id
+            LIMIT 1
+        ), existing AS (
+            SELECT w.id
+            FROM word_pairs w JOIN d ON w.dictionary_id = d.id, target t
+            WHERE t.is_key AND w.word = $4 AND w.id <> t.id
+        ), merged AS (
+            -- новый ключ уже есть: он получает перевод, старая пара удаляется
+            UPDATE word_pairs w SET translation = t.translation
+            FROM existing e, target t
+            WHERE w.id = e.id
+            RETURNING w.id
+        ), removed AS (
+            DELETE FROM word_pairs w USING existing e, target t
+            WHERE w.id = t.id
+            RETURNING w.id
+        ), updated AS (
+            UPDATE word_pairs w SET
+                word = CASE WHEN t.is_key THEN $4 ELSE w.word END,
+                translation = CASE WHEN t.is_key THEN w.translation ELSE $4 END
+            FROM target t
+            WHERE w.id = t.id AND NOT EXISTS (SELECT 1 FROM existing)
+            RETURNING w.id
+        )
+        SELECT d.word_count - (SELECT COUNT(*) FROM removed) AS word_count,
+               (SELECT COUNT(*) FROM target) AS changed
+        FROM d
+    """,
+
+    # ---------------------- REVIEWS ----------------------
+    # Сначала повторения, срок которых подошёл, затем ещё не изученные слова.
+    # Каждая ветка читается по своему индексу и останавливается на LIMIT.
+    "due_words": """
+        WITH d AS (
+            SELECT id FROM dictionaries WHERE telegram_id = $1 AND name = $2
+        )
+        (
+            SELECT w.id, w.word, w.translation, r.easiness, r.interval_days, r.repetitions
+            FROM d
+            JOIN word_reviews r ON r.dictionary_id = d.id AND r.reversed = $3 AND r.due_at <= NOW()
+            JOIN word_pairs w ON w.id = r.word_pair_id
+            WHERE w.id <> ALL($5::bigint[])
+            ORDER BY r.due_at
+            LIMIT $4
+        )
+        UNION ALL
+        (
+            SELECT w.id, w.word, w.translation, NULL, NULL, NULL
+            FROM d
+            JOIN word_pairs w ON w.dictionary_id = d.id
+            WHERE NOT EXISTS (
+                SELECT 1 FROM word_reviews r WHERE r.word_pair_id = w.id AND r.reversed = $3
+            ) AND w.id <> ALL($5::bigint[])
+            ORDER BY w.id
+            LIMIT $4
+        )
+        LIMIT $4
+    """,
+
+    # Случайная выборка ответов для неправильных вариантов, не больше $4
+    "sample_answers": """
+        SELECT CASE WHEN $3 THEN w.word ELSE w.translation END AS answer
+        FROM word_pairs w
+        JOIN dictionaries d ON d.id = w.dictionary_id
+        WHERE d.telegram_id = $1 AND d.name = $2
+        ORDER BY random()
+        LIMIT $4
+    """,
+}
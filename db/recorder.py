@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from db.models import Database
+from utils.srs import ReviewState
+
+logger = logging.getLogger(__name__)
+
+
+class AnswerRecorder:
+    """Буфер ответов в тестах.
+
+    Ответ только добавляется в список, запись в базу идёт пачкой: когда набралось
+    batch_size событий или прошло flush_interval секунд. flush() сбрасывает буфер явно.
+    Слова с ещё не записанными ответами отдаёт pending().
+    """
+
+    def __init__(self, database: Database, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_pending: int = 10000):
+        self.database = database
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # Если база недоступна, старые события отбрасываются сверх этого предела
+        self.max_pending = max_pending
+        self._buffer: list[tuple] = []
+        # Пачка, которая пишется в базу прямо сейчас
+        self._flushing: list[tuple] = []
+        self._lock = asyncio.Lock()
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def pending(self, telegram_id: int, is_reversed: bool) -> set[int]:
+        """id слов пользователя, ответы на которые ещё не в базе"""
+        return {
+            answer[2] for answer in (*self._flushing, *self._buffer)
+            if answer[1] == telegram_id and answer[3] == is_reversed
+        }
+
+    def start(self):
+        self._task = asyncio.create_task(self.__run())
+
+    async def close(self):
+        """Останавливает фоновую запись и сбрасывает остаток буфера"""
+        if self._task:
+            # Фоновая задача дописывает начатую пачку и выходит сама
+            self._closing = True
+            self._full.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def record(self, session_id: str, telegram_id: int, word_id: int, is_reversed: bool, is_correct: bool,
+               state: ReviewState, due_at: float):
+        """Ответ и новое состояние повторения слова; в базу попадут со следующей пачкой"""
+        self._buffer.append((
+            uuid.UUID(session_id),
+            telegram_id,
+            word_id,
+            is_reversed,
+            is_correct,
+            datetime.now(timezone.utc),
+            state.easiness,
+            state.interval,
+            state.repetitions,
+            datetime.fromtimestamp(due_at, timezone.utc),
+        ))
+        if len(self._buffer) >= self.batch_size:
+            self._full.set()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            self._flushing = batch
+            try:
+                await self.database.record_answers(batch)
+            except asyncio.CancelledError:
+                # Пачка уже вынута из буфера; без возврата она бы потерялась
+                self._buffer = batch + self._buffer
+                raise
+            except Exception as e:
+                logger.error("Error saving %s answers: %s", len(batch), e)
+                self._buffer = (batch + self._buffer)[-self.max_pending:]
+            finally:
+                self._flushing = []
+
+    async def __run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._full.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            await self.flush()
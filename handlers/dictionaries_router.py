@@ -1,10 +1,11 @@
 import os
+import time
 
 from aiogram import F, Router, types
 from aiogram.filters import CommandStart
 from aiogram.fsm import state
 from aiogram.types import KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardRemove
-from aiogram.filters import Command, StateFilter, or_f
+from aiogram.filters import Command, CommandObject, StateFilter, or_f
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import CallbackQuery
@@ -14,7 +15,12 @@ from filters.chat_types import ChatTypeFilter
 from kbds.inline import get_callback_btns, calc_dict_btns
 
 from db.init_db import db
-from utils.paginator import Paginator
+from db.pagination import DictionaryPageSource
+from middlewares.rate_limit import bulk_sends
+from utils.callbacks import DictCallback, LanguageCallback, find_dict_name
+from utils.paginator import AsyncPaginator, Paginator
+from utils.word_export import FORMATS, ExportFile
+from utils.word_import import PairParser, iter_pair_chunks, stream_file
 
 dictionaries_router = Router()
 dictionaries_router.message.filter(ChatTypeFilter(chat_types=["private"]))
@@ -64,26 +70,179 @@ class dict(StatesGroup):
     dict_is_open = State()
 
 
+WORDS_PER_PAGE = 25
+
+# Cloud Bot API does not let bots download files over 20 MB
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_MB", 20)) * 1024 * 1024
+IMPORT_PROGRESS_INTERVAL = 1.0
+
+
+async def get_dict_name(user_id, id):
+    """Resolves the dictionary id from callback data; None if the dictionary is gone"""
+    user_dicts = await db.get_user_dictionaries(user_id)
+    return find_dict_name(user_dicts, id)
+
+
+def get_language_btns(exclude=None):
+    return {
+        f"🌐 {lang}": LanguageCallback(index=index).pack()
+        for index, (lang, code) in enumerate(languages.items()) if code != exclude
+    }
+
+
+def format_dict_page(dict_name, page, page_items):
+    if not page_items:
+        return f"📖 <b>{dict_name}</b>\n\nNo words in this dictionary yet."
+    return (
+            f"📖 <b>{dict_name}</b>\n"
+            "=========================\n" +
+            f"Current page: {page}\n" +
+            "\n".join(f"{i + 1}) <b>{pair[0]}</b> - <b>{pair[1]}</b>" for i, pair in page_items)
+    )
+
+
+SEARCH_RESULTS_PER_PAGE = 10
+
+
+def format_search_page(query, pg: Paginator):
+    return (
+            f"🔎 <b>Similar words for</b> <code>{query}</code> (page {pg.page}/{pg.pages}):\n"
+            "=========================\n" +
+            "\n".join(f"{i + 1}) <b>{pair[0]}</b> - <b>{pair[1]}</b>" for i, pair in pg.get_page())
+    )
+
+
+def get_search_btns(dict_name):
+    return {
+        "⬅️": "search_left",
+        "➡️": "search_right",
+        "🔙 Back": DictCallback.of("view", dict_name)
+    }
+
+
+async def get_search_results(user_id, dict_name, query):
+    """Exact match (or None) and the other matching pairs: prefix matches first, then similar words"""
+    index = await db.get_search_index(user_id, dict_name)
+    found = index.lookup(query)
+    results = [pair for pair in index.search(query) if pair != found]
+    return found, results
+
+
+def get_dict_paginator(user_id, data):
+    """Restores the paginator of the open dictionary from FSM data"""
+    return AsyncPaginator(
+        DictionaryPageSource(db, user_id, data.get("dict_name")),
+        data.get("page", 1),
+        WORDS_PER_PAGE,
+        first_key=data.get("first_key"),
+        last_key=data.get("last_key"),
+        total=data.get("total"),
+    )
+
+
+async def get_dict_page(user_id, dict_name, page, load):
+    """
+    (text, keyboard, paginator state) of a dictionary page, served from the page cache.
+    On a miss load() returns the paginator moved to the page and its items,
+    or None if there is no such page.
+    """
+    rendered = db.pages.get(user_id, dict_name, page)
+    if rendered is None:
+        version = db.pages.version(user_id, dict_name)
+        loaded = await load()
+        if loaded is None:
+            return None
+        pg, page_items = loaded
+        rendered = (format_dict_page(dict_name, pg.page, page_items), get_dict_menu(dict_name), pg.state())
+        db.pages.set(user_id, dict_name, pg.page, version, rendered)
+    return rendered
+
+
+async def open_first_page(user_id, state: FSMContext, dict_name, total=None):
+    """Returns the first page of the dictionary (text, keyboard) and remembers it in FSM data"""
+    async def load():
+        pg = AsyncPaginator(DictionaryPageSource(db, user_id, dict_name), 1, WORDS_PER_PAGE, total=total)
+        return pg, await pg.get_page()
+
+    text, markup, pg_state = await get_dict_page(user_id, dict_name, 1, load)
+    await state.update_data(dict_name=dict_name, **pg_state)
+    return text, markup
+
+
+async def get_search_page(user_id, dict_name, query, page, results=None):
+    """(text, keyboard) of a search results page from the page cache, or None if there is no such page"""
+    rendered = db.pages.get(user_id, dict_name, ("search", query, page))
+    if rendered is None:
+        version = db.pages.version(user_id, dict_name)
+        if results is None:
+            _, results = await get_search_results(user_id, dict_name, query)
+        pg = Paginator(list(enumerate(results)), page, SEARCH_RESULTS_PER_PAGE)
+        if not 1 <= page <= pg.pages:
+            return None
+        rendered = (
+            format_search_page(query, pg),
+            get_callback_btns(btns=get_search_btns(dict_name), sizes=(2, 1)),
+        )
+        db.pages.set(user_id, dict_name, ("search", query, page), version, rendered)
+    return rendered
+
+
 def get_btns_menu_dict(dict_name):
     return {
         "⬅️": "swipe_left",
         "➡️": "swipe_right",
-        "🔢 Select Page": f"go_to_page.{dict_name}",
-        "🔎 Search Words": f"search_words.{dict_name}",
-        "➕ Add Words": f"add_words.{dict_name}",
-        "🗑️ Delete Words": f"delete_words.{dict_name}",
-        "✏️ Edit Words": f"edit_words.{dict_name}",
+        "🔢 Select Page": "go_to_page",
+        "🔎 Search Words": "search_words",
+        "➕ Add Words": "add_words",
+        "🗑️ Delete Words": "delete_words",
+        "✏️ Edit Words": "edit_words",
+        "📤 Export": "export_words",
         "🔙 Back": "back_to_dictionaries"
     }
 
 
+def get_dict_menu(dict_name):
+    return get_callback_btns(btns=get_btns_menu_dict(dict_name), sizes=(2, 3, 3, 1))
+
+
+async def send_export(message: types.Message, user_id, dict_name=None, format="csv", compress=False):
+    """Streams one dictionary (or all of them) to the chat as a document"""
+    with bulk_sends():
+        await message.bot.send_chat_action(message.chat.id, "upload_document")
+        await message.answer_document(ExportFile(
+            lambda: db.iter_words(user_id, dict_name),
+            filename=dict_name or "dictionaries",
+            format=format,
+            compress=compress,
+        ))
+
+
+@dictionaries_router.message(Command("export"))
+async def cmd_export(message: types.Message, command: CommandObject):
+    """/export [csv|json] [gz] - all dictionaries of the user in one file"""
+    options = (command.args or "").lower().split()
+    format = next((option for option in options if option in FORMATS), "csv")
+    if not await db.get_user_dictionaries(message.from_user.id):
+        await message.answer("❌ You don't have any dictionaries to export yet.")
+        return
+    await send_export(message, message.from_user.id, format=format, compress="gz" in options)
+
+
+@dictionaries_router.callback_query(F.data == "export_words")
+async def export_words(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    dict_name = data.get("dict_name")
+    await callback.answer("📤 Exporting...")
+    await send_export(callback.message, callback.from_user.id, dict_name)
+
+
 @dictionaries_router.callback_query(F.data == "view_dicts")
 async def view_dicts(callback: CallbackQuery):
     user_dictionaries = await db.get_user_dictionaries(callback.from_user.id)
 
     # Display the user's dictionaries with emojis
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {emoji_nums[num]: f"view_dict_{dict_name}" for num, dict_name in dictionaries}
+    btns = {emoji_nums[num]: DictCallback.of("view", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "➕ Add Dictionary": "add_dict",
         "🗑️ Delete Dictionary": "delete_dict",
@@ -110,7 +269,7 @@ async def add_dict(callback: CallbackQuery, state: FSMContext):
         await callback.answer("❌ You can't create more than 🔟 dictionaries.", show_alert=True)
         return
     await state.set_state(dict.first_language)
-    btns = {f"🌐 {lang}": f"lang_{code}" for lang, code in languages.items()}
+    btns = get_language_btns()
     btns.update({
         "❌ Cancel": "back_to_dictionaries"
     })
@@ -130,7 +289,7 @@ async def delete_dict(callback: CallbackQuery):
 
     # Display the user's dictionaries with emojis
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {emoji_nums[num]: f"confirm_delete_{dict_name}" for num, dict_name in dictionaries}
+    btns = {emoji_nums[num]: DictCallback.of("confirm_delete", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "🛑 Cancel": "back_to_dictionaries"
     })
@@ -148,12 +307,12 @@ async def delete_dict(callback: CallbackQuery):
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("lang_"), dict.first_language)
-async def process_dict_name(callback: CallbackQuery, state: FSMContext):
-    first_lang_code = callback.data.split("_")[1]
+@dictionaries_router.callback_query(LanguageCallback.filter(), dict.first_language)
+async def process_dict_name(callback: CallbackQuery, callback_data: LanguageCallback, state: FSMContext):
+    first_lang_code = list(languages.values())[callback_data.index]
     await state.update_data(first_language=first_lang_code)
     await state.set_state(dict.second_language)
-    btns = {f"🌐 {lang}": f"lang_{code}" for lang, code in languages.items() if code != first_lang_code}
+    btns = get_language_btns(exclude=first_lang_code)
     btns.update({
         "❌ Cancel": "back_to_dictionaries"
     })
@@ -167,14 +326,17 @@ async def process_dict_name(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("confirm_delete_"))
-async def confirm_deleting(callback: CallbackQuery):
-    dict_name = callback.data.split("_")[2]
+@dictionaries_router.callback_query(DictCallback.filter(F.action == "confirm_delete"))
+async def confirm_deleting(callback: CallbackQuery, callback_data: DictCallback):
+    dict_name = await get_dict_name(callback.from_user.id, callback_data.id)
+    if dict_name is None:
+        await callback.answer("❗ Dictionary not found.", show_alert=True)
+        return
     await callback.message.edit_text(
         f"🗑️ <b>Confirm Deletion</b>\n\nAre you sure you want to delete the dictionary <b>{dict_name}</b>?",
         reply_markup=get_callback_btns(
             btns={
-                "✅ Confirm": f"delete_dict_{dict_name}",
+                "✅ Confirm": DictCallback.of("delete", dict_name),
                 "🔙 Back": "back_to_dictionaries"
             },
             sizes=(1, 1)
@@ -183,16 +345,19 @@ async def confirm_deleting(callback: CallbackQuery):
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("delete_dict_"))
-async def confirm_delete_dict(callback: CallbackQuery):
-    dict_name = callback.data.split("_")[2]
+@dictionaries_router.callback_query(DictCallback.filter(F.action == "delete"))
+async def confirm_delete_dict(callback: CallbackQuery, callback_data: DictCallback):
+    dict_name = await get_dict_name(callback.from_user.id, callback_data.id)
+    if dict_name is None:
+        await callback.answer("❗ Dictionary not found.", show_alert=True)
+        return
     await db.delete_dictionary(callback.from_user.id, dict_name)
     await callback.answer(f"🗑️ Dictionary <b>{dict_name}</b> deleted successfully!", show_alert=True)
     user_dictionaries = await db.get_user_dictionaries(callback.from_user.id)
 
     # Display the user's dictionaries with emojis
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {emoji_nums[num]: f"view_dict_{dict_name}" for num, dict_name in dictionaries}
+    btns = {emoji_nums[num]: DictCallback.of("view", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "➕ Add Dictionary": "add_dict",
         "🗑️ Delete Dictionary": "delete_dict",
@@ -219,7 +384,7 @@ async def back_to_dictionaries(callback: CallbackQuery, state: FSMContext):
 
     # Display the user's dictionaries with emojis
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {emoji_nums[num]: f"view_dict_{dict_name}" for num, dict_name in dictionaries}
+    btns = {emoji_nums[num]: DictCallback.of("view", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "➕ Add Dictionary": "add_dict",
         "🗑️ Delete Dictionary": "delete_dict",
@@ -239,11 +404,11 @@ async def back_to_dictionaries(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("lang_"), dict.second_language)
-async def process_second_lang_name(callback: CallbackQuery, state: FSMContext):
+@dictionaries_router.callback_query(LanguageCallback.filter(), dict.second_language)
+async def process_second_lang_name(callback: CallbackQuery, callback_data: LanguageCallback, state: FSMContext):
     data = await state.get_data()
     first_language = data.get("first_language")
-    second_language = callback.data.split("_")[1]
+    second_language = list(languages.values())[callback_data.index]
     dict_name = f"{first_language} ➡️ {second_language}"
     await db.add_user_dictionaries(callback.from_user.id, dict_name)
     await state.clear()
@@ -251,7 +416,7 @@ async def process_second_lang_name(callback: CallbackQuery, state: FSMContext):
 
     # Display the user's dictionaries
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {emoji_nums[num]: f"view_dict_{dict_name}" for num, dict_name in dictionaries}
+    btns = {emoji_nums[num]: DictCallback.of("view", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "➕ Add Dictionary": "add_dict",
         "🗑️ Delete Dictionary": "delete_dict",
@@ -270,33 +435,18 @@ async def process_second_lang_name(callback: CallbackQuery, state: FSMContext):
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("view_dict_"))
-async def open_dict(callback: CallbackQuery, state: FSMContext):
+@dictionaries_router.callback_query(DictCallback.filter(F.action == "view"))
+async def open_dict(callback: CallbackQuery, callback_data: DictCallback, state: FSMContext):
+    dict_name = await get_dict_name(callback.from_user.id, callback_data.id)
+    if dict_name is None:
+        await callback.answer("❗ Dictionary not found.", show_alert=True)
+        return
     await state.set_state(dict.dict_is_open)
-    dict_name = callback.data.split("_")[2]
-    await state.update_data(dict_name=dict_name)
-    dictionaries = await db.get_user_dictionaries(callback.from_user.id)
-    current_dict = list(enumerate(dictionaries.get(dict_name, {}).items()))
-    await state.update_data(page=1)
-    pg = Paginator(current_dict, 1, 25)
-    btns = get_btns_menu_dict(dict_name)
-
-    if current_dict:
-        dict_text = (
-                f"📖 <b>{dict_name}</b>\n"
-                "=========================\n" +
-                f"Current page: {pg.page}\n" +
-                "\n".join(f"{i + 1}) <b>{pair[0]}</b> - <b>{pair[1]}</b>" for i, pair in pg.get_page())
-        )
-    else:
-        dict_text = f"📖 <b>{dict_name}</b>\n\nNo words in this dictionary yet."
+    dict_text, markup = await open_first_page(callback.from_user.id, state, dict_name)
 
     await callback.message.edit_text(
         dict_text,
-        reply_markup=get_callback_btns(
-            btns=btns,
-            sizes=(2, 3, 2, 1, 1)
-        ),
+        reply_markup=markup,
         parse_mode="HTML"
     )
 
@@ -305,27 +455,19 @@ async def open_dict(callback: CallbackQuery, state: FSMContext):
 async def swipe_left(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     dict_name = data.get("dict_name")
-    page = data.get("page", 1)
-    dictionaries = await db.get_user_dictionaries(callback.from_user.id)
-    current_dict = list(enumerate(dictionaries.get(dict_name, {}).items()))
-    pg = Paginator(current_dict, page, 25)
-
-    if pg.has_previous():
-        page_items = pg.get_previous()
-        await state.update_data(page=pg.page)
-        btns = get_btns_menu_dict(dict_name)
-        dict_text = (
-                f"📖 <b>{dict_name}</b>\n"
-                "=========================\n" +
-                f"Current page: {pg.page}\n" +
-                "\n".join(f"{i + 1}) <b>{pair[0]}</b> - <b>{pair[1]}</b>" for i, pair in page_items)
-        )
+    pg = get_dict_paginator(callback.from_user.id, data)
+
+    async def load():
+        if await pg.has_previous():
+            return pg, await pg.get_previous()
+
+    rendered = await get_dict_page(callback.from_user.id, dict_name, pg.page - 1, load)
+    if rendered:
+        text, markup, pg_state = rendered
+        await state.update_data(**pg_state)
         await callback.message.edit_text(
-            dict_text,
-            reply_markup=get_callback_btns(
-                btns=btns,
-                sizes=(2, 3, 2, 1, 1)
-            ),
+            text,
+            reply_markup=markup,
             parse_mode="HTML"
         )
     else:
@@ -336,34 +478,26 @@ async def swipe_left(callback: CallbackQuery, state: FSMContext):
 async def swipe_right(callback: CallbackQuery, state: FSMContext):
     data = await state.get_data()
     dict_name = data.get("dict_name")
-    page = data.get("page", 1)
-    dictionaries = await db.get_user_dictionaries(callback.from_user.id)
-    current_dict = list(enumerate(dictionaries.get(dict_name, {}).items()))
-    pg = Paginator(current_dict, page, 25)
-
-    if pg.has_next():
-        page_items = pg.get_next()
-        await state.update_data(page=pg.page)
-        btns = get_btns_menu_dict(dict_name)
-        dict_text = (
-                f"📖 <b>{dict_name}</b>\n"
-                "=========================\n" +
-                f"Current page: {pg.page}\n" +
-                "\n".join(f"{i + 1}) <b>{pair[0]}</b> - <b>{pair[1]}</b>" for i, pair in page_items)
-        )
+    pg = get_dict_paginator(callback.from_user.id, data)
+
+    async def load():
+        if await pg.has_next():
+            return pg, await pg.get_next()
+
+    rendered = await get_dict_page(callback.from_user.id, dict_name, pg.page + 1, load)
+    if rendered:
+        text, markup, pg_state = rendered
+        await state.update_data(**pg_state)
         await callback.message.edit_text(
-            dict_text,
-            reply_markup=get_callback_btns(
-                btns=btns,
-                sizes=(2, 3, 2, 1, 1)
-            ),
+            text,
+            reply_markup=markup,
             parse_mode="HTML"
         )
     else:
         await callback.answer("❌ This is the last page.", show_alert=True)
 
 
-@dictionaries_router.callback_query(F.data.startswith("edit_words."))
+@dictionaries_router.callback_query(F.data == "edit_words")
 async def edit_words(callback: CallbackQuery, state: FSMContext):
     await state.set_state(dict.editing_word)
     data = await state.get_data()
@@ -371,7 +505,7 @@ async def edit_words(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
         "✏️ <b>Edit Words</b>\n\nPlease enter the word you want to edit.",
         reply_markup=get_callback_btns(
-            btns={"🔙 Back": f"view_dict_{dict_name}"}
+            btns={"🔙 Back": DictCallback.of("view", dict_name)}
         ),
         parse_mode="HTML"
     )
@@ -383,20 +517,19 @@ async def request_word_for_edit(message: types.Message, state: FSMContext):
     word = word.lower()
     data = await state.get_data()
     dict_name = data.get("dict_name")
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = dictionaries.get(dict_name, {})
-    if word in current_dict or word in current_dict.values():
+    index = await db.get_search_index(message.from_user.id, dict_name)
+    if index.lookup(word) is not None:
         await state.update_data(word=word)
         await message.answer("✏️ Please enter the new translation:",
                              reply_markup=get_callback_btns(
-                                 btns={"🔙 Back": f"view_dict_{dict_name}"}
+                                 btns={"🔙 Back": DictCallback.of("view", dict_name)}
                              ), parse_mode="HTML"
                              )
         await state.set_state(dict.requesting_new_word)
     else:
         await message.answer("❌ There is no such word in this dictionary.",
                              reply_markup=get_callback_btns(
-                                 btns={"🔙 Back": f"view_dict_{dict_name}"}
+                                 btns={"🔙 Back": DictCallback.of("view", dict_name)}
                              ), parse_mode="HTML"
                              )
         return
@@ -409,29 +542,21 @@ async def request_new_word_for_edit(message: types.Message, state: FSMContext):
     data = await state.get_data()
     dict_name = data.get("dict_name")
     word = data.get("word")
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = dictionaries.get(dict_name, {})
-    if word in current_dict or word in current_dict.values():
-        await db.edit_word_in_dict(message.from_user.id, dict_name, word, new_translation)
+    word_count = await db.edit_word_in_dict(message.from_user.id, dict_name, word, new_translation)
+    if word_count is not None:
         await message.answer("✅ Word updated successfully!")
     else:
         await message.answer("❌ There was an error updating the word.")
     await state.set_state(dict.dict_is_open)
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = list(enumerate(dictionaries[dict_name].items()))
-    btns = get_btns_menu_dict(dict_name)
+    dict_text, markup = await open_first_page(message.from_user.id, state, dict_name, total=word_count)
 
     await message.answer(
-        f"{dict_name}\n=========================\n" +
-        "\n".join(f"{i + 1}) {pair[0]} - {pair[1]}" for i, pair in current_dict),
-        reply_markup=get_callback_btns(
-            btns=btns,
-            sizes=(2, 3, 2, 1, 1)
-        )
+        dict_text,
+        reply_markup=markup
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("search_words"))
+@dictionaries_router.callback_query(F.data == "search_words")
 async def search_words(callback: CallbackQuery, state: FSMContext):
     await state.set_state(dict.searching_word)
     data = await state.get_data()
@@ -439,7 +564,7 @@ async def search_words(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
         "🔎 <b>Search Words</b>\n\nPlease enter any word from the pair you want to search.",
         reply_markup=get_callback_btns(
-            btns={"🔙 Back": f"view_dict_{dict_name}"}
+            btns={"🔙 Back": DictCallback.of("view", dict_name)}
         ),
         parse_mode="HTML"
     )
@@ -451,40 +576,54 @@ async def request_search(message: types.Message, state: FSMContext):
     word = word.lower()
     data = await state.get_data()
     dict_name = data.get("dict_name")
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = dictionaries.get(dict_name, {})
-    translation = None
+    found, results = await get_search_results(message.from_user.id, dict_name, word)
 
-    if word in current_dict:
-        translation = current_dict[word]
-        await message.answer(f"🔎 Translation of <b>{word}</b>: <b>{translation}</b>", parse_mode="HTML")
-    elif word in current_dict.values():
-        translation = next((k for k, v in current_dict.items() if v == word), None)
+    if found:
+        translation = found[1] if found[0] == word else found[0]
         await message.answer(f"🔎 Translation of <b>{word}</b>: <b>{translation}</b>", parse_mode="HTML")
     else:
         await message.answer("❌ There is no such word in this dictionary.", parse_mode="HTML")
 
-    btns = get_btns_menu_dict(dict_name)
-    dict_items = list(enumerate(current_dict.items()))
-    if dict_items:
-        dict_text = (
-                f"📖 <b>{dict_name}</b>\n"
-                "=========================\n" +
-                "\n".join(f"{i + 1}) {pair[0]} - {pair[1]}" for i, pair in dict_items)
+    await state.update_data(search_query=word, search_page=1)
+    if results:
+        text, markup = await get_search_page(message.from_user.id, dict_name, word, 1, results)
+        await message.answer(
+            text,
+            reply_markup=markup,
+            parse_mode="HTML"
         )
     else:
-        dict_text = f"📖 <b>{dict_name}</b>\n\nNo words in this dictionary yet."
-    await message.answer(
-        dict_text,
-        reply_markup=get_callback_btns(
-            btns=btns,
-            sizes=(2, 3, 2, 1)
-        ),
+        await message.answer(
+            "🔎 Enter another word to search.",
+            reply_markup=get_callback_btns(
+                btns={"🔙 Back": DictCallback.of("view", dict_name)}
+            ),
+            parse_mode="HTML"
+        )
+
+
+@dictionaries_router.callback_query(F.data.in_({"search_left", "search_right"}), dict.searching_word)
+async def swipe_search(callback: CallbackQuery, state: FSMContext):
+    data = await state.get_data()
+    dict_name = data.get("dict_name")
+    query = data.get("search_query")
+    page = data.get("search_page", 1) + (-1 if callback.data == "search_left" else 1)
+    rendered = await get_search_page(callback.from_user.id, dict_name, query, page) if page >= 1 else None
+
+    if rendered is None:
+        await callback.answer("❌ There are no more results.", show_alert=True)
+        return
+
+    text, markup = rendered
+    await state.update_data(search_page=page)
+    await callback.message.edit_text(
+        text,
+        reply_markup=markup,
         parse_mode="HTML"
     )
 
 
-@dictionaries_router.callback_query(F.data.startswith("delete_words"))
+@dictionaries_router.callback_query(F.data == "delete_words")
 async def delete_words(callback: CallbackQuery, state: FSMContext):
     await state.set_state(dict.deleting_word)
     data = await state.get_data()
@@ -492,7 +631,7 @@ async def delete_words(callback: CallbackQuery, state: FSMContext):
     await callback.message.edit_text(
         "🗑️ <b>Delete Words</b>\n\nPlease enter any word from the pair you want to delete.",
         reply_markup=get_callback_btns(
-            btns={"🔙 Back": f"view_dict_{dict_name}"}
+            btns={"🔙 Back": DictCallback.of("view", dict_name)}
         ),
         parse_mode="HTML"
     )
@@ -504,53 +643,94 @@ async def request_word_for_delete(message: types.Message, state: FSMContext):
     word = word.lower()
     data = await state.get_data()
     dict_name = data.get("dict_name")
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = dictionaries.get(dict_name, {})
-    word_to_delete = None
+    index = await db.get_search_index(message.from_user.id, dict_name)
 
     # Find the word to delete (either key or value)
-    if word in current_dict:
-        word_to_delete = word
-    elif word in current_dict.values():
-        word_to_delete = next((k for k, v in current_dict.items() if v == word), None)
+    found = index.lookup(word)
+    word_to_delete = found[0] if found else None
 
+    word_count = None
     if not word_to_delete:
         await message.answer("❌ There is no such word in this dictionary.")
     else:
-        await db.delete_word_from_dict(message.from_user.id, dict_name, word_to_delete)
-        await message.answer(f"🗑️ Word pair with '{word}' deleted successfully!")
+        word_count = await db.delete_word_from_dict(message.from_user.id, dict_name, word_to_delete)
+        if word_count is None:
+            await message.answer("❌ There is no such word in this dictionary.")
+        else:
+            await message.answer(f"🗑️ Word pair with '{word}' deleted successfully!")
 
     await state.set_state(dict.dict_is_open)
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = list(enumerate(dictionaries.get(dict_name, {}).items()))
-    btns = get_btns_menu_dict(dict_name)
+    dict_text, markup = await open_first_page(message.from_user.id, state, dict_name, total=word_count)
 
     await message.answer(
-        f"📖 <b>{dict_name}</b>\n=========================\n" +
-        "\n".join(f"{i + 1}) {pair[0]} - {pair[1]}" for i, pair in
-                  current_dict) if current_dict else f"📖 <b>{dict_name}</b>\n\nNo words in this dictionary yet.",
-        reply_markup=get_callback_btns(
-            btns=btns,
-            sizes=(2, 3, 2, 1)
-        ),
+        dict_text,
+        reply_markup=markup,
         parse_mode="HTML"
     )
 
 
-@dictionaries_router.callback_query(F.data.contains("add_words"))
+@dictionaries_router.callback_query(F.data == "add_words")
 async def add_words(callback: CallbackQuery, state: FSMContext):
     await state.set_state(dict.first_word)
     data = await state.get_data()
     dict_name = data.get("dict_name")
     await callback.message.edit_text(
-        "📝 <b>Add Words</b>\n\nPlease enter the <b>first word</b> for your pair.",
+        "📝 <b>Add Words</b>\n\nPlease enter the <b>first word</b> for your pair.\n\n"
+        "📥 Or send a CSV/TSV file or an Anki \"Notes in Plain Text\" export "
+        "with the word in the first column and the translation in the second.",
         reply_markup=get_callback_btns(
-            btns={"🔙 Back": f"view_dict_{dict_name}"}
+            btns={"🔙 Back": DictCallback.of("view", dict_name)}
         ),
         parse_mode="HTML"
     )
 
 
+@dictionaries_router.message(dict.first_word, F.document)
+async def import_words_file(message: types.Message, state: FSMContext):
+    data = await state.get_data()
+    dict_name = data.get("dict_name")
+    document = message.document
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await message.answer(f"❌ The file is too large. The limit is {IMPORT_MAX_BYTES // (1024 * 1024)} MB.")
+        return
+
+    status = await message.answer("📥 Importing words...")
+    last_update = time.monotonic()
+
+    async def on_progress(rows):
+        nonlocal last_update
+        if time.monotonic() - last_update >= IMPORT_PROGRESS_INTERVAL:
+            last_update = time.monotonic()
+            with bulk_sends():
+                await status.edit_text(f"📥 Importing words... {rows} rows read.")
+
+    file = await message.bot.get_file(document.file_id)
+    parser = PairParser()
+    try:
+        word_count = await db.import_words(
+            message.from_user.id, dict_name,
+            iter_pair_chunks(stream_file(message.bot, file.file_path), parser),
+            on_progress,
+        )
+    except Exception:
+        await status.edit_text("❌ Could not import the file. Please check that it is a UTF-8 CSV/TSV file.")
+        raise
+
+    await status.edit_text(
+        f"✅ Imported <b>{parser.imported}</b> word pairs."
+        + (f"\n⚠️ Skipped {parser.invalid} invalid rows." if parser.invalid else "")
+        + (f"\n♻️ Skipped {parser.duplicates} duplicate words." if parser.duplicates else ""),
+        parse_mode="HTML"
+    )
+    await state.set_state(dict.dict_is_open)
+    dict_text, markup = await open_first_page(message.from_user.id, state, dict_name, total=word_count)
+    await message.answer(
+        dict_text,
+        reply_markup=markup,
+        parse_mode="HTML"
+    )
+
+
 @dictionaries_router.message(dict.first_word)
 async def request_word1(message: types.Message, state: FSMContext):
     word1 = message.text.strip()
@@ -561,7 +741,7 @@ async def request_word1(message: types.Message, state: FSMContext):
     await message.answer(
         f"📝 First word saved: <b>{word1}</b>\n\n🔤 Please enter the second word for the pair.",
         reply_markup=get_callback_btns(
-            btns={"🔙 Back": f"view_dict_{dict_name}"}
+            btns={"🔙 Back": DictCallback.of("view", dict_name)}
         ),
         parse_mode="HTML"
     )
@@ -580,20 +760,13 @@ async def request_word2(message: types.Message, state: FSMContext):
         await message.answer("Both words must be provided.")
         return
 
-    await db.add_word_to_dict(message.from_user.id, dict_name, f"{word1}:{word2}")
+    word_count = await db.add_word_to_dict(message.from_user.id, dict_name, f"{word1}:{word2}")
     await state.set_state(dict.dict_is_open)
-    dictionaries = await db.get_user_dictionaries(message.from_user.id)
-    current_dict = list(enumerate(dictionaries[dict_name].items()))
-    btns = get_btns_menu_dict(dict_name)
-    pg = Paginator(current_dict, 1, 25)
+    dict_text, markup = await open_first_page(message.from_user.id, state, dict_name, total=word_count)
 
     await message.answer(
-        f"{dict_name}\n=========================\n" +
-        "\n".join(f"{i + 1}) {pair[0]} - {pair[1]}" for i, pair in pg.get_page()),
-        reply_markup=get_callback_btns(
-            btns=btns,
-            sizes=(2, 3, 2, 1, 1)
-        )
+        dict_text,
+        reply_markup=markup
     )
 
 
@@ -29,9 +29,7 @@ main_router.include_router(dictionaries_router)
 main_router.include_router(tests_router)
 
 async def check_user(user_id: int) -> bool:
-    user_data_local = await db.get_user_data(user_id)
-    if not user_data_local:
-        await db.add_user(user_id)
+    await db.ensure_user(user_id)
     return True
 
 @main_router.message(CommandStart())
@@ -1,6 +1,8 @@
 import os
 import random
-from typing import Any
+import time
+import uuid
+from typing import Any, Dict, Optional
 
 from aiogram import F, Router, types
 from aiogram.filters import CommandStart
@@ -15,13 +17,23 @@ from filters.chat_types import ChatTypeFilter
 
 from kbds.inline import get_callback_btns, calc_dict_btns
 
-from db.init_db import db
+from db.init_db import answer_recorder, db
 
-from handlers.dictionaries_router import dict, emoji_nums
+from handlers.dictionaries_router import dict, emoji_nums, get_dict_name
+from utils.callbacks import AnswerCallback, DictCallback, TestCallback
+from utils.distractors import DistractorCache, DistractorSampler
+from utils.srs import ReviewQueue, ReviewState, next_due, review
 
 tests_router = Router()
 tests_router.message.filter(ChatTypeFilter(chat_types=["private"]))
 
+# How many due words are loaded from the database at once
+DUE_WORDS_PER_SESSION = 20
+# Wrong options are drawn from a random sample of this many answers, not the whole dictionary
+DISTRACTOR_POOL_SIZE = int(os.getenv("DISTRACTOR_POOL_SIZE", 500))
+
+distractor_samplers = DistractorCache(max_entries=int(os.getenv("DISTRACTOR_CACHE_SIZE", 256)))
+
 
 def reverse_dict(dictionary):
     """
@@ -31,12 +43,30 @@ def reverse_dict(dictionary):
     reversed_dict = {v: k for k, v in dictionary.items()}
     return reversed_dict
 
+
+async def get_distractor_sampler(user_id: int, dict_name: str, is_reversed: bool) -> DistractorSampler:
+    """
+    Returns the wrong-answer sampler of a test session.
+    It is built once per dictionary from a bounded random sample of answers and rebuilt
+    when the dictionary changes: every local mutation bumps its page version; changes made
+    by other processes show up in the stored word count.
+    """
+    # Read before the words, so a mutation racing with the build makes the next call rebuild
+    version = db.pages.version(user_id, dict_name)
+    size = await db.count_words(user_id, dict_name)
+    sampler = distractor_samplers.get(user_id, dict_name, is_reversed)
+    if sampler is None or sampler.version != version or sampler.size != size:
+        answers = await db.sample_answers(user_id, dict_name, is_reversed, DISTRACTOR_POOL_SIZE)
+        sampler = DistractorSampler(answers, size=size, version=version)
+        distractor_samplers.set(user_id, dict_name, is_reversed, sampler)
+    return sampler
+
 @tests_router.callback_query(F.data == "view_tests")
 async def view_tests(callback: CallbackQuery, state: FSMContext):
     await state.set_state(dict.on_test)
     user_dictionaries = await db.get_user_dictionaries(callback.from_user.id)
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {f"{emoji_nums[num]}": f"choosetest_{dict_name}" for num, dict_name in dictionaries}
+    btns = {f"{emoji_nums[num]}": DictCallback.of("test", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "🔙 Back": "back_to_functions"
     })
@@ -52,41 +82,79 @@ async def view_tests(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML"
     )
     
+async def next_card(user_id: int, data: Dict[str, Any]) -> Optional[str]:
+    """
+    Pops the next due word of the session queue.
+    When the loaded slice is used up, the next due words are loaded from the database.
+    Words answered wrong wait in the queue and are shown ahead of time if nothing else is left.
+    The session holds at most DUE_WORDS_PER_SESSION cards: wrong words keep their place
+    until learned and only free places are refilled, so the FSM data stays the same size.
+    """
+    queue = ReviewQueue(data["queue"])
+    cards = data["cards"]
+    card_id = queue.pop(time.time())
+
+    if card_id is None and len(cards) < DUE_WORDS_PER_SESSION:
+        # Words whose answers are still buffered would come back as due: their reviews are not saved yet
+        due_words = await db.get_due_words(
+            user_id, data["selected_dict"], data["is_reversed"], DUE_WORDS_PER_SESSION,
+            exclude=answer_recorder.pending(user_id, data["is_reversed"]),
+        )
+        for word_id, word, answer, review_state in due_words:
+            if len(cards) >= DUE_WORDS_PER_SESSION:
+                break
+            if str(word_id) not in cards:
+                cards[str(word_id)] = [word, answer, *review_state]
+                queue.push(word_id)
+        card_id = queue.pop(time.time())
+    if card_id is None:
+        card_id = queue.pop()
+
+    return None if card_id is None else str(card_id)
+
+
 async def send_question(callback: CallbackQuery, state: FSMContext):
     """
     Sends the next question to the user.
-    Uses FSMContext for words and index.
-    If all words are shown, reshuffles and starts again.
+    Words are asked in the order of their spaced-repetition schedule.
     """
     data = await state.get_data()
-    dict_name = data["selected_dict"]
-    words_list = data["words_list"]
-    current_index = data["current_index"]
+    card_id = await next_card(callback.from_user.id, data)
+
+    if card_id is None:
+        await callback.message.edit_text(
+            "🎉 <b>All words are reviewed!</b>\nCome back later for the next repetition.",
+            reply_markup=get_callback_btns(btns={"🔙 Back": "back_to_tests"}),
+            parse_mode="HTML"
+        )
+        return
 
-    # If all words shown, reshuffle and restart
-    if current_index >= len(words_list):
-        random.shuffle(words_list)
-        current_index = 0
-        await state.update_data(words_list=words_list, current_index=current_index)
+    sampler = await get_distractor_sampler(callback.from_user.id, data["selected_dict"], data["is_reversed"])
+    if not sampler:
+        await callback.answer("❗ Dictionary not found.", show_alert=True)
+        return
 
     # Current word and correct answer
-    word, right_ans = words_list[current_index]
+    word, right_ans = data["cards"][card_id][:2]
 
-    # Prepare answer options: correct + up to 4 random wrong ones
-    all_translations = [t for _, t in words_list if t != right_ans]
-    wrong_answers = random.sample(all_translations, min(4, len(all_translations)))
-    words_to_answer = [right_ans] + wrong_answers
+    # Prepare answer options: correct + up to 4 wrong ones, similar answers first
+    words_to_answer = [right_ans] + sampler.sample(right_ans, k=4)
     random.shuffle(words_to_answer)
 
     # Emojis for answer options
+    question = data.get("question", 0) + 1
     btns = {}
-    for ans in words_to_answer:
-        btns[f"{ans}"] = f"answer_{ans}_{right_ans}"
+    for option, ans in enumerate(words_to_answer):
+        btns[f"{ans}"] = AnswerCallback(question=question, option=option).pack()
 
     btns.update({"🔙 Back": "back_to_tests"})
 
     # Save progress
     await state.update_data(
+        cards=data["cards"],
+        queue=data["queue"],
+        current_card=card_id,
+        question=question,
         words_to_answer=words_to_answer,
         right_ans=right_ans,
         question_word=word
@@ -98,9 +166,12 @@ async def send_question(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML"
     )
 
-@tests_router.callback_query(F.data.startswith("choosetest_"))
-async def process_test_selection(callback: CallbackQuery, state: FSMContext):
-    dict_name = callback.data.split("_", 1)[1]
+@tests_router.callback_query(DictCallback.filter(F.action == "test"))
+async def process_test_selection(callback: CallbackQuery, callback_data: DictCallback, state: FSMContext):
+    dict_name = await get_dict_name(callback.from_user.id, callback_data.id)
+    if dict_name is None:
+        await callback.answer("❗ Dictionary not found.", show_alert=True)
+        return
     splited_dict_name = dict_name.split(" -> ")
     if len(splited_dict_name) == 2:
         reversed_dict_name = " -> ".join([splited_dict_name[1], splited_dict_name[0]])
@@ -111,9 +182,7 @@ async def process_test_selection(callback: CallbackQuery, state: FSMContext):
         display_dict_name = f"➡️ {dict_name}"
         display_reversed_name = f"🔄 {dict_name}"
 
-    words_from_dicts = await db.get_user_dictionaries(callback.from_user.id)
-
-    if dict_name not in words_from_dicts or len(words_from_dicts[dict_name]) < 5:
+    if await db.count_words(callback.from_user.id, dict_name) < 5:
         await callback.answer(
             f"❗ Dictionary '{dict_name}' has less than 5 words. Please add more words to start a test.",
             show_alert=True
@@ -121,8 +190,8 @@ async def process_test_selection(callback: CallbackQuery, state: FSMContext):
         return
 
     btns = {
-        display_dict_name: f"choose_test_{dict_name}",
-        display_reversed_name: f"choose_test_reversed_{dict_name}",
+        display_dict_name: TestCallback(id=callback_data.id, reversed=False).pack(),
+        display_reversed_name: TestCallback(id=callback_data.id, reversed=True).pack(),
         "🔙 Back": "back_to_tests"
     }
     await callback.message.edit_text(
@@ -134,31 +203,28 @@ async def process_test_selection(callback: CallbackQuery, state: FSMContext):
         parse_mode="HTML"
     )
 # старт теста
-@tests_router.callback_query(F.data.startswith("choose_test_"))
-async def start_test(callback: CallbackQuery, state: FSMContext):
-    data_parts = callback.data.split("_")
-    is_reversed = "reversed" in callback.data
-    dict_name = data_parts[3] if is_reversed else data_parts[2]
-    user_dicts = await db.get_user_dictionaries(callback.from_user.id)
-
-    if dict_name not in user_dicts:
+@tests_router.callback_query(TestCallback.filter())
+async def start_test(callback: CallbackQuery, callback_data: TestCallback, state: FSMContext):
+    is_reversed = callback_data.reversed
+    dict_name = await get_dict_name(callback.from_user.id, callback_data.id)
+
+    if dict_name is None:
         await callback.answer("❗ Dictionary not found.", show_alert=True)
         return
 
-    # Prepare dictionary (reverse if needed)
-    words_dict = reverse_dict(user_dicts[dict_name]) if is_reversed else user_dicts[dict_name]
-    words_list = list(words_dict.items())
-    random.shuffle(words_list)
-
     # Emoji for test direction
     emoji = "🔄" if is_reversed else "➡️"
 
+    await get_distractor_sampler(callback.from_user.id, dict_name, is_reversed)
+
+    # The session keeps only the loaded slice of due words and their queue
     await state.set_state(dict.on_test)
     await state.update_data(
         selected_dict=dict_name,
-        words_list=words_list,
-        current_index=0,
-        is_reversed=is_reversed
+        is_reversed=is_reversed,
+        session_id=str(uuid.uuid4()),
+        cards={},
+        queue=[]
     )
 
     await callback.message.edit_text(
@@ -169,12 +235,15 @@ async def start_test(callback: CallbackQuery, state: FSMContext):
 
 
 # обработка ответа
-@tests_router.callback_query(F.data.startswith("answer_"), StateFilter(dict.on_test))
-async def process_answer(callback: CallbackQuery, state: FSMContext):
+@tests_router.callback_query(AnswerCallback.filter(), StateFilter(dict.on_test))
+async def process_answer(callback: CallbackQuery, callback_data: AnswerCallback, state: FSMContext):
     data = await state.get_data()
-    current_ans = callback.data.split("_")[1]
+    if callback_data.question != data.get("question"):
+        await callback.answer("❗ This question is outdated.", show_alert=True)
+        return
     right_ans = data["right_ans"]
     words_to_answer = data["words_to_answer"]
+    current_ans = words_to_answer[callback_data.option]
 
     # Add emoji for correct/incorrect answers
     marked_answers = []
@@ -200,6 +269,11 @@ async def process_answer(callback: CallbackQuery, state: FSMContext):
     else:
         prefix = f"😔 <b>Incorrect!</b>\n<b>Correct answer:</b> {right_ans}\n"
 
+    await schedule_card(callback.from_user.id, data, state, is_correct=current_ans == right_ans)
+    if current_ans != right_ans:
+        sampler = await get_distractor_sampler(callback.from_user.id, data["selected_dict"], data["is_reversed"])
+        sampler.confuse(right_ans, current_ans)
+
     await callback.message.edit_text(
         prefix + callback.message.text,
         reply_markup=get_callback_btns(btns=btns, sizes=(3, 2, 1, 1)),
@@ -209,17 +283,35 @@ async def process_answer(callback: CallbackQuery, state: FSMContext):
     await state.set_state(dict.answered)
 
 
+async def schedule_card(user_id: int, data: Dict[str, Any], state: FSMContext, is_correct: bool):
+    """
+    Moves the answered word along its SM-2 schedule.
+    The answer and the new state are saved in the background by answer_recorder.
+    A learned word leaves the session, a forgotten one goes back into the queue.
+    """
+    card_id = data["current_card"]
+    card = data["cards"][card_id]
+    review_state = review(ReviewState(*card[2:]), 4 if is_correct else 1)
+    due_at = next_due(review_state)
+    answer_recorder.record(
+        data["session_id"], user_id, int(card_id), data["is_reversed"], is_correct, review_state, due_at
+    )
+
+    if review_state.interval:
+        del data["cards"][card_id]
+    else:
+        card[2:] = review_state
+        ReviewQueue(data["queue"]).push(int(card_id), due_at)
+    await state.update_data(cards=data["cards"], queue=data["queue"])
+
+
 # следующий вопрос
 @tests_router.callback_query(F.data == "next_question", StateFilter(dict.answered))
 async def next_question(callback: CallbackQuery, state: FSMContext):
-    data = await state.get_data()
-    current_index = data["current_index"] + 1
-
-    await state.update_data(current_index=current_index)
     await state.set_state(dict.on_test)
     await send_question(callback, state)
 
-@tests_router.callback_query(F.data.startswith("answer_"), dict.answered)
+@tests_router.callback_query(AnswerCallback.filter(), dict.answered)
 async def process_answer_after_answered(callback: CallbackQuery):
     await callback.answer("❗ Please press 'Next question' to continue.", show_alert=True)
 
@@ -227,7 +319,7 @@ async def process_answer_after_answered(callback: CallbackQuery):
 async def back_to_tests(callback: CallbackQuery, state: FSMContext):
     user_dictionaries = await db.get_user_dictionaries(callback.from_user.id)
     dictionaries = list(enumerate(user_dictionaries.keys(), start=1))
-    btns = {f"{emoji_nums[num]}": f"choosetest_{dict_name}" for num, dict_name in dictionaries}
+    btns = {f"{emoji_nums[num]}": DictCallback.of("test", dict_name) for num, dict_name in dictionaries}
     btns.update({
         "🔙 Back": "back_to_functions"
     })
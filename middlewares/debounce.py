@@ -0,0 +1,41 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+
+class CallbackDebounce(BaseMiddleware):
+    """
+    Outer callback_query middleware: drops a tap that repeats the previous one
+    (same user, message and button) while it is still being handled
+    or less than `window` seconds after it finished.
+    The dropped tap is answered, so the client stops its spinner.
+    """
+
+    def __init__(self, window: float = 0.5, max_keys: int = 10000):
+        self.window = window
+        self.max_keys = max_keys
+        self._in_flight: set[tuple] = set()
+        self._finished: OrderedDict[tuple, float] = OrderedDict()
+        self.dropped = 0
+
+    async def __call__(self, handler: Callable[[CallbackQuery, dict[str, Any]], Awaitable[Any]],
+                       event: CallbackQuery, data: dict[str, Any]) -> Optional[Any]:
+        key = (event.from_user.id, event.message.message_id if event.message else None, event.data)
+        finished = self._finished.get(key)
+        if key in self._in_flight or (finished is not None and time.monotonic() - finished < self.window):
+            self.dropped += 1
+            await event.answer()
+            return None
+
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+            self._finished[key] = time.monotonic()
+            self._finished.move_to_end(key)
+            while len(self._finished) > self.max_keys:
+                self._finished.popitem(last=False)
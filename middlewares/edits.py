@@ -0,0 +1,80 @@
+from collections import OrderedDict
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import (
+    DeleteMessage,
+    EditMessageCaption,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    Response,
+    SendMessage,
+    TelegramMethod,
+)
+from aiogram.methods.base import TelegramType
+from aiogram.types import Message
+
+MessageKey = Union[tuple[Union[int, str], int], str]
+
+
+def _fingerprint(method: Union[SendMessage, EditMessageText]) -> int:
+    markup = method.reply_markup.model_dump_json() if method.reply_markup is not None else None
+    return hash((method.text, str(method.parse_mode), markup))
+
+
+class SkipUnchangedEdits(BaseRequestMiddleware):
+    """
+    Outgoing request middleware: remembers what each bot message shows
+    and drops edit_text calls that would not change it.
+    Telegram answers such edits with "message is not modified", so they cost quota for nothing.
+    """
+
+    def __init__(self, max_messages: int = 10000):
+        self.max_messages = max_messages
+        self._shown: OrderedDict[MessageKey, int] = OrderedDict()
+        self.skipped = 0
+
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]) -> Response[TelegramType]:
+        if isinstance(method, EditMessageText):
+            key = self._key(method.chat_id, method.message_id, method.inline_message_id)
+            fingerprint = _fingerprint(method)
+            if key is not None and self._shown.get(key) == fingerprint:
+                self.skipped += 1
+                return True
+            try:
+                response = await make_request(bot, method)
+            except TelegramBadRequest as e:
+                if "message is not modified" not in e.message:
+                    raise
+                self.skipped += 1
+                response = True
+            self._remember(key, fingerprint)
+            return response
+
+        # Despite the annotation, the session chain passes the method result, not the Response wrapper
+        response = await make_request(bot, method)
+        if isinstance(method, SendMessage) and isinstance(response, Message):
+            self._remember(self._key(response.chat.id, response.message_id), _fingerprint(method))
+        elif isinstance(method, (EditMessageReplyMarkup, EditMessageCaption, DeleteMessage)):
+            key = self._key(method.chat_id, method.message_id, getattr(method, "inline_message_id", None))
+            self._shown.pop(key, None)
+        return response
+
+    @staticmethod
+    def _key(chat_id, message_id, inline_message_id: Optional[str] = None) -> Optional[MessageKey]:
+        if inline_message_id is not None:
+            return inline_message_id
+        if chat_id is None or message_id is None:
+            return None
+        return chat_id, message_id
+
+    def _remember(self, key: Optional[MessageKey], fingerprint: int):
+        if key is None:
+            return
+        self._shown[key] = fingerprint
+        self._shown.move_to_end(key)
+        while len(self._shown) > self.max_messages:
+            self._shown.popitem(last=False)
@@ -0,0 +1,51 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from utils.log import log_context
+
+logger = logging.getLogger(__name__)
+
+
+class LogContext(BaseMiddleware):
+    """
+    Puts the fields of the current update into log_context, so every record made
+    while handling it carries them. As an outer update middleware it sets
+    update_id and user_id and logs the update duration (a warning for slow updates);
+    as an inner middleware it adds the handler name.
+    """
+
+    def __init__(self, slow_update: float = 1.0):
+        self.slow_update = slow_update
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: dict[str, Any]) -> Any:
+        fields = dict(log_context.get())
+        handler_object = data.get("handler")
+        if handler_object is not None:
+            fields["handler"] = handler_object.callback.__name__
+            token = log_context.set(fields)
+            try:
+                return await handler(event, data)
+            finally:
+                log_context.reset(token)
+
+        if isinstance(event, Update):
+            fields["update_id"] = event.update_id
+        user = data.get("event_from_user")
+        if user is not None:
+            fields["user_id"] = user.id
+        token = log_context.set(fields)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.slow_update:
+                logger.warning("Slow update.", extra={"duration_ms": round(duration * 1000, 1)})
+            else:
+                logger.debug("Update handled.", extra={"duration_ms": round(duration * 1000, 1)})
+            log_context.reset(token)
@@ -0,0 +1,59 @@
+import time
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import SamplingProfiler, UpdateStats, current_update, metrics
+
+
+class UpdateMetrics(BaseMiddleware):
+    """
+    Outer update middleware: total time of every update and, through current_update,
+    how many DB queries it made and how long it spent in the DB, the Bot API and FSM storage.
+    """
+
+    def __init__(self, profiler: Optional[SamplingProfiler] = None):
+        self.profiler = profiler
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: Update, data: dict[str, Any]) -> Any:
+        stats = UpdateStats()
+        token = current_update.set(stats)
+        started = time.perf_counter()
+        try:
+            with self.profiler.sample() if self.profiler else nullcontext():
+                return await handler(event, data)
+        finally:
+            metrics.observe_update(event.event_type, time.perf_counter() - started, stats)
+            current_update.reset(token)
+
+
+class HandlerMetrics(BaseMiddleware):
+    """Inner middleware: latency of the matched handler, labelled with its function name"""
+
+    async def __call__(self, handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+                       event: TelegramObject, data: dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            metrics.handler_seconds.observe(time.perf_counter() - started, name)
+
+
+class ApiMetrics(BaseRequestMiddleware):
+    """Outgoing request middleware: time of every Bot API call, labelled with the method"""
+
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]) -> Response[TelegramType]:
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            metrics.observe_api(method.__api_method__, time.perf_counter() - started)
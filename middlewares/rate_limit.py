@@ -0,0 +1,176 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import Response, TelegramMethod
+from aiogram.methods.base import TelegramType
+
+INTERACTIVE = 0
+BULK = 1
+
+_priority: ContextVar[int] = ContextVar("outgoing_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def bulk_sends():
+    """Requests made inside the block wait behind interactive replies"""
+    token = _priority.set(BULK)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def reserve(self, now: float) -> float:
+        """Takes a token, going into debt if needed; returns how long to wait for it"""
+        self._refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class OutgoingRateLimiter(BaseRequestMiddleware):
+    """
+    Outgoing request middleware that keeps the bot under Telegram flood limits.
+    Every request addressed to a chat takes a token from its chat bucket
+    (private chats and groups have separate limits) and then waits for its turn
+    in the global bucket. The global queue serves interactive requests before bulk ones
+    (see bulk_sends). Requests without a chat (answerCallbackQuery, getUpdates, ...)
+    are not limited. A 429 pauses the whole queue for retry_after and the request is retried.
+    """
+
+    @classmethod
+    def from_env(cls) -> "OutgoingRateLimiter":
+        """Every worker process gets its share of the global limit"""
+        return cls(
+            global_rate=float(os.getenv("OUTGOING_GLOBAL_RATE", 30)) / max(1, int(os.getenv("BOT_WORKERS", 1))),
+            private_rate=float(os.getenv("OUTGOING_CHAT_RATE", 1)),
+            group_rate=float(os.getenv("OUTGOING_GROUP_RATE_PER_MIN", 20)) / 60,
+        )
+
+    def __init__(self, global_rate: float = 30, private_rate: float = 1, group_rate: float = 20 / 60,
+                 burst: float = 3, max_retries: int = 3, max_chats: int = 10000):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.private_rate = private_rate
+        self.group_rate = group_rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.max_chats = max_chats
+        self._chats: OrderedDict[Union[int, str], TokenBucket] = OrderedDict()
+        self._queue: list[tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+
+        self.requests = 0
+        self.retries = 0
+        self.max_queue_depth = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def __call__(self, make_request: NextRequestMiddlewareType[TelegramType], bot: Bot,
+                       method: TelegramMethod[TelegramType]) -> Response[TelegramType]:
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is None:
+            return await make_request(bot, method)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.monotonic()
+            await asyncio.sleep(self._chat_bucket(chat_id).reserve(started))
+            await self._global_turn(_priority.get())
+            self._record_wait(time.monotonic() - started)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                self.retries += 1
+                self._paused_until = max(self._paused_until, time.monotonic() + e.retry_after)
+                if attempt == self.max_retries:
+                    raise
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Groups and channels have negative ids or @usernames
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_rate if is_group else self.private_rate, self.burst)
+            self._chats[chat_id] = bucket
+            while len(self._chats) > self.max_chats:
+                self._chats.popitem(last=False)
+        self._chats.move_to_end(chat_id)
+        return bucket
+
+    async def _global_turn(self, priority: int):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        turn = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._order), turn))
+        self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+        self._wakeup.set()
+        await turn
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue:
+                now = time.monotonic()
+                delay = max(self._paused_until - now, self.global_bucket.delay(now))
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                _, _, turn = heapq.heappop(self._queue)
+                if not turn.done():
+                    self.global_bucket.reserve(now)
+                    turn.set_result(None)
+
+    async def close(self):
+        """Stops the global queue; requests still waiting for their turn are cancelled"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for _, _, turn in self._queue:
+            turn.cancel()
+        self._queue.clear()
+
+    def _record_wait(self, waited: float):
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "retries": self.retries,
+            "avg_wait_ms": round(1000 * self.total_wait / self.requests, 3) if self.requests else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait, 3),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 3),
+        }
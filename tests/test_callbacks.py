@@ -0,0 +1,56 @@
+import asyncio
+
+import handlers.dictionaries_router as dictionaries_router
+from benchmarks.memory_db import MemoryDatabase
+from db.cache import DictionaryCache
+from utils import callbacks
+from utils.callbacks import AnswerCallback, DictCallback, dict_id, find_dict_name
+from utils.page_cache import PageCache
+from utils.search_index import SearchIndexCache
+
+USER = 1
+
+
+def test_callbacks_round_trip_and_fit_telegram_limit():
+    name = "очень длинное название словаря" * 4
+    packed = DictCallback.of("confirm_delete", name)
+    assert len(packed.encode()) <= 64
+    assert DictCallback.unpack(packed) == DictCallback(action="confirm_delete", id=dict_id(name))
+
+    # Imported through the module: pytest would try to collect a Test* class
+    test = callbacks.TestCallback(id=dict_id(name), reversed=True)
+    assert callbacks.TestCallback.unpack(test.pack()) == test
+    answer = AnswerCallback(question=7, option=3)
+    assert AnswerCallback.unpack(answer.pack()) == answer
+
+
+def test_names_with_equal_crc32_get_different_ids():
+    # crc32("plumless") == crc32("buckeroo")
+    names = ["plumless", "buckeroo"]
+    assert dict_id("plumless") != dict_id("buckeroo")
+    assert find_dict_name(names, dict_id("plumless")) == "plumless"
+    assert find_dict_name(names, dict_id("buckeroo")) == "buckeroo"
+
+
+def test_colliding_ids_open_no_dictionary(monkeypatch):
+    monkeypatch.setattr(callbacks, "dict_id", lambda name: 1)
+    assert find_dict_name(["a", "b"], 1) is None
+    assert find_dict_name(["a"], 1) == "a"
+
+
+def test_stale_button_of_a_deleted_or_renamed_dictionary_opens_nothing(monkeypatch):
+    database = MemoryDatabase(cache=DictionaryCache(), search_indexes=SearchIndexCache(), pages=PageCache())
+    database.seed(USER, "animals", [("cat", "кот")])
+    database.seed(USER, "plants", [("oak", "дуб")])
+    monkeypatch.setattr(dictionaries_router, "db", database)
+    button = DictCallback.unpack(DictCallback.of("view", "animals"))
+
+    async def scenario():
+        before = await dictionaries_router.get_dict_name(USER, button.id)
+        await database.delete_dictionary(USER, "animals")
+        after_delete = await dictionaries_router.get_dict_name(USER, button.id)
+        database.seed(USER, "Animals", [("cat", "кот")])
+        after_rename = await dictionaries_router.get_dict_name(USER, button.id)
+        return before, after_delete, after_rename
+
+    assert asyncio.run(scenario()) == ("animals", None, None)
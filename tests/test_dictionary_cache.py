@@ -0,0 +1,77 @@
+import time
+
+from db.cache import DictionaryCache, estimate_size
+
+
+def dictionaries() -> dict:
+    return {"animals": {"cat": "кот", "dog": "пёс"}, "empty": {}}
+
+
+def test_get_returns_what_was_set():
+    cache = DictionaryCache()
+    value = dictionaries()
+    cache.set(1, value)
+    assert cache.get(1) is value
+    assert cache.get(2) is None
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["bytes"] == estimate_size(value)
+
+
+def test_set_after_invalidation_is_dropped():
+    cache = DictionaryCache()
+    epoch = cache.epoch
+    cache.invalidate(1)
+    cache.set(1, dictionaries(), epoch)
+    assert cache.get(1) is None
+    cache.set(1, dictionaries(), cache.epoch)
+    assert cache.get(1) is not None
+
+
+def test_write_through_updates():
+    cache = DictionaryCache()
+    cache.set(1, dictionaries())
+    cache.update_word(1, "animals", "cow", "корова")
+    cache.update_word(1, "animals", "cat")
+    cache.update_dictionary(1, "new")
+    cache.update_dictionary(1, "empty", remove=True)
+    value = cache.get(1)
+    assert value == {"animals": {"dog": "пёс", "cow": "корова"}, "new": {}}
+    assert cache.stats()["bytes"] == estimate_size(value)
+
+
+def test_updates_change_the_epoch_even_when_not_cached():
+    cache = DictionaryCache()
+    epoch = cache.epoch
+    cache.update_word(1, "animals", "cat", "кот")
+    assert cache.epoch != epoch
+
+
+def test_entries_expire():
+    cache = DictionaryCache(ttl=0.01)
+    cache.set(1, dictionaries())
+    time.sleep(0.02)
+    assert cache.get(1) is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_eviction_by_count_and_bytes():
+    cache = DictionaryCache(max_entries=2)
+    for telegram_id in (1, 2, 3):
+        cache.set(telegram_id, dictionaries())
+    assert cache.get(1) is None
+    assert cache.stats()["evictions"] == 1
+
+    size = estimate_size(dictionaries())
+    cache = DictionaryCache(max_bytes=int(size * 1.5))
+    cache.set(1, dictionaries())
+    cache.set(2, dictionaries())
+    assert cache.get(1) is None
+    assert cache.get(2) is not None
+    assert cache.stats()["bytes"] <= size * 1.5
+
+
+def test_oversized_value_is_not_cached():
+    cache = DictionaryCache(max_bytes=10)
+    cache.set(1, dictionaries())
+    assert cache.get(1) is None
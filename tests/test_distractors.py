@@ -0,0 +1,61 @@
+from utils.distractors import DistractorCache, DistractorSampler
+
+ANSWERS = ["кот", "кошка", "пёс", "собака", "корова", "лиса", "сова", "свинья", "коза", "конь", "утка", "гусь"]
+
+
+def test_sample_returns_unique_wrong_answers():
+    sampler = DistractorSampler(ANSWERS)
+    for right in ANSWERS:
+        options = sampler.sample(right, k=4)
+        assert len(options) == 4
+        assert len(set(options)) == 4
+        assert right not in options
+        assert set(options) <= set(ANSWERS)
+
+
+def test_small_dictionary_gives_all_other_answers():
+    sampler = DistractorSampler(["a", "b", "c", "a"])
+    assert len(sampler) == 3
+    assert sampler.size == 3
+    assert sorted(sampler.sample("a", k=4)) == ["b", "c"]
+
+
+def test_confusions_are_offered_first():
+    sampler = DistractorSampler(ANSWERS)
+    sampler.confuse("кот", "утка")
+    sampler.confuse("кот", "кот")
+    assert "кот" not in sampler.confusions["кот"]
+    for _ in range(20):
+        assert "утка" in sampler.sample("кот", k=4)
+
+
+def test_similar_answers_are_preferred():
+    answers = ["ab1", "ab2"] + [f"other answer {i}" for i in range(200)]
+    sampler = DistractorSampler(answers)
+    hits = sum("ab2" in sampler.sample("ab1", k=4) for _ in range(50))
+    # A random pick would take it in about 2% of draws
+    assert hits > 40
+
+
+def test_size_and_version_are_kept():
+    sampler = DistractorSampler(ANSWERS, size=20, version=3)
+    assert sampler.size == 20
+    assert sampler.version == 3
+
+
+def test_cache_lru():
+    cache = DistractorCache(max_entries=2)
+    samplers = [DistractorSampler(ANSWERS) for _ in range(3)]
+    cache.set(1, "a", False, samplers[0])
+    cache.set(1, "a", True, samplers[1])
+    assert cache.get(1, "a", False) is samplers[0]
+    cache.set(1, "b", False, samplers[2])
+    assert cache.get(1, "a", True) is None
+    assert cache.get(1, "a", False) is samplers[0]
+    assert cache.get(1, "b", False) is samplers[2]
+
+
+def test_disabled_cache_keeps_nothing():
+    cache = DistractorCache(max_entries=0)
+    cache.set(1, "a", False, DistractorSampler(ANSWERS))
+    assert cache.get(1, "a", False) is None
@@ -0,0 +1,116 @@
+import asyncio
+import datetime
+
+import pytest
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import EditMessageReplyMarkup, EditMessageText, SendMessage
+from aiogram.types import Chat, InlineKeyboardButton, InlineKeyboardMarkup, Message
+
+from middlewares.edits import SkipUnchangedEdits
+
+
+class FakeSession(BaseSession):
+    """Answers requests locally, so the real session middleware chain runs without network"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+        self.not_modified = False
+
+    async def make_request(self, bot, method, timeout=None):
+        self.sent.append(method)
+        if isinstance(method, SendMessage):
+            return Message(message_id=len(self.sent), date=datetime.datetime.now(),
+                           chat=Chat(id=method.chat_id, type="private"), text=method.text)
+        if isinstance(method, EditMessageText) and self.not_modified:
+            raise TelegramBadRequest(method, "Bad Request: message is not modified")
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def markup(text: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text=text, callback_data="x")]])
+
+
+def run(*methods, not_modified: bool = False):
+    session = FakeSession()
+    session.not_modified = not_modified
+    edits = SkipUnchangedEdits()
+    session.middleware(edits)
+    bot = Bot("42:TEST", session=session)
+
+    async def send():
+        return [await bot(method) for method in methods]
+
+    return asyncio.run(send()), session, edits
+
+
+def test_send_message_returns_message():
+    (message,), session, edits = run(SendMessage(chat_id=1, text="hi"))
+    assert isinstance(message, Message)
+    assert message.text == "hi"
+    assert len(session.sent) == 1
+
+
+def test_edit_to_same_content_is_skipped():
+    results, session, edits = run(
+        SendMessage(chat_id=1, text="page", reply_markup=markup("next")),
+        EditMessageText(chat_id=1, message_id=1, text="page", reply_markup=markup("next")),
+    )
+    assert results[1] is True
+    assert len(session.sent) == 1
+    assert edits.skipped == 1
+
+
+def test_changed_edit_is_sent_and_remembered():
+    results, session, edits = run(
+        SendMessage(chat_id=1, text="page 1"),
+        EditMessageText(chat_id=1, message_id=1, text="page 2"),
+        EditMessageText(chat_id=1, message_id=1, text="page 2"),
+        EditMessageText(chat_id=1, message_id=1, text="page 1"),
+    )
+    assert results[1:] == [True, True, True]
+    assert [type(method) for method in session.sent] == [SendMessage, EditMessageText, EditMessageText]
+    assert edits.skipped == 1
+
+
+def test_markup_change_is_not_skipped():
+    _, session, _ = run(
+        SendMessage(chat_id=1, text="page", reply_markup=markup("next")),
+        EditMessageText(chat_id=1, message_id=1, text="page", reply_markup=markup("back")),
+    )
+    assert len(session.sent) == 2
+
+
+def test_reply_markup_edit_forgets_message():
+    _, session, _ = run(
+        SendMessage(chat_id=1, text="page"),
+        EditMessageReplyMarkup(chat_id=1, message_id=1, reply_markup=markup("next")),
+        EditMessageText(chat_id=1, message_id=1, text="page"),
+    )
+    assert len(session.sent) == 3
+
+
+def test_not_modified_error_is_swallowed():
+    results, _, edits = run(EditMessageText(chat_id=1, message_id=5, text="same"), not_modified=True)
+    assert results == [True]
+    assert edits.skipped == 1
+
+
+def test_other_bad_request_is_raised():
+    class Failing(FakeSession):
+        async def make_request(self, bot, method, timeout=None):
+            raise TelegramBadRequest(method, "Bad Request: message to edit not found")
+
+    session = Failing()
+    session.middleware(SkipUnchangedEdits())
+    bot = Bot("42:TEST", session=session)
+    with pytest.raises(TelegramBadRequest):
+        asyncio.run(bot(EditMessageText(chat_id=1, message_id=1, text="x")))
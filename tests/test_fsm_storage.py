@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.fsm_storage import SQLiteStorage, TimedStorage, create_storage
+
+KEY = StorageKey(bot_id=42, chat_id=1, user_id=1)
+OTHER = StorageKey(bot_id=42, chat_id=2, user_id=2)
+
+
+class Form(StatesGroup):
+    on_test = State()
+
+
+def test_state_and_data_round_trip(tmp_path):
+    async def scenario():
+        storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"))
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        await storage.set_state(KEY, Form.on_test)
+        await storage.set_data(KEY, {"queue": [[0.0, 7]], "cards": {"7": ["cat", "кот", 2.5, 0.0, 0]}})
+        # Setting one column keeps the other
+        await storage.set_state(KEY, "other:state")
+        result = await storage.get_state(KEY), await storage.get_data(KEY), await storage.get_state(OTHER)
+        await storage.close()
+        return result
+
+    state, data, other = asyncio.run(scenario())
+    assert state == "other:state"
+    assert data == {"queue": [[0.0, 7]], "cards": {"7": ["cat", "кот", 2.5, 0.0, 0]}}
+    assert other is None
+
+
+def test_clearing_state_and_data(tmp_path):
+    async def scenario():
+        storage = SQLiteStorage(str(tmp_path / "fsm.sqlite3"))
+        await storage.set_state(KEY, Form.on_test)
+        await storage.set_data(KEY, {"a": 1})
+        await storage.set_state(KEY, None)
+        await storage.set_data(KEY, {})
+        result = await storage.get_state(KEY), await storage.get_data(KEY)
+        await storage.close()
+        return result
+
+    assert asyncio.run(scenario()) == (None, {})
+
+
+def test_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+
+    async def write():
+        storage = SQLiteStorage(path)
+        await storage.set_state(KEY, Form.on_test)
+        await storage.set_data(KEY, {"selected_dict": "animals"})
+        await storage.close()
+
+    async def read():
+        storage = SQLiteStorage(path)
+        result = await storage.get_state(KEY), await storage.get_data(KEY)
+        await storage.close()
+        return result
+
+    asyncio.run(write())
+    assert asyncio.run(read()) == (Form.on_test.state, {"selected_dict": "animals"})
+
+
+def test_timed_storage_delegates():
+    async def scenario():
+        storage = TimedStorage(MemoryStorage())
+        await storage.set_state(KEY, Form.on_test)
+        await storage.set_data(KEY, {"a": 1})
+        result = await storage.get_state(KEY), await storage.get_data(KEY)
+        await storage.close()
+        return result
+
+    assert asyncio.run(scenario()) == (Form.on_test.state, {"a": 1})
+
+
+def test_create_storage_backends(monkeypatch, tmp_path):
+    monkeypatch.delenv("FSM_STORAGE", raising=False)
+    assert isinstance(create_storage(), MemoryStorage)
+
+    monkeypatch.setenv("FSM_STORAGE", "sqlite")
+    monkeypatch.setenv("FSM_SQLITE_PATH", str(tmp_path / "env.sqlite3"))
+    storage = create_storage()
+    assert isinstance(storage, SQLiteStorage)
+    asyncio.run(storage.close())
+    assert (tmp_path / "env.sqlite3").exists()
+
+    monkeypatch.setenv("FSM_STORAGE", "nope")
+    with pytest.raises(ValueError):
+        create_storage()
@@ -0,0 +1,58 @@
+import asyncio
+
+from benchmarks.memory_db import MemoryDatabase
+from db.cache import KnownUsers
+
+
+class CountingDatabase(MemoryDatabase):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.upserts = 0
+
+    async def fetchval(self, query: str, *args):
+        if query == "ensure_user":
+            self.upserts += 1
+        return await super().fetchval(query, *args)
+
+
+def test_known_users_lru():
+    users = KnownUsers(max_entries=2)
+    users.add(1)
+    users.add(2)
+    assert 1 in users
+    users.add(3)
+    assert 2 not in users
+    assert 1 in users and 3 in users
+    assert users.stats() == {"entries": 2, "hits": 3, "misses": 1}
+
+
+def test_known_user_skips_the_upsert():
+    database = CountingDatabase(known_users=KnownUsers(max_entries=10))
+
+    async def scenario():
+        return [await database.ensure_user(1) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [True, False, False]
+    assert database.upserts == 1
+
+
+def test_evicted_user_is_upserted_again_but_not_created():
+    database = CountingDatabase(known_users=KnownUsers(max_entries=1))
+
+    async def scenario():
+        return [await database.ensure_user(user) for user in (1, 2, 1)]
+
+    assert asyncio.run(scenario()) == [True, True, False]
+    assert database.upserts == 3
+    assert 1 in database.known_users
+    assert 2 not in database.known_users
+
+
+def test_disabled_cache_always_upserts():
+    database = CountingDatabase(known_users=KnownUsers(max_entries=0))
+
+    async def scenario():
+        return [await database.ensure_user(1) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [True, False]
+    assert database.upserts == 2
@@ -0,0 +1,22 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_loadtest_smoke(tmp_path):
+    """A short run of the harness against the in-memory database drives every flow without errors"""
+    report_path = tmp_path / "report.json"
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.loadtest", "--users", "5", "--duration", "2",
+         "--think-ms", "50", "--words", "20", "--json", str(report_path)],
+        cwd=ROOT, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+
+    report = json.loads(report_path.read_text(encoding="utf-8"))
+    assert report["updates"] > 0
+    assert report["errors"] == 0
+    assert report["handlers"]
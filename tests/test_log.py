@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import types
+
+import utils.log as log
+from utils.log import ContextFilter, JsonFormatter, RateLimitFilter, TextFormatter, log_context
+
+
+def make_record(msg="Saved %s words", args=(3,), level=logging.INFO, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("bot.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_rate_limit_window_and_suppressed_count(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    limiter = RateLimitFilter(burst=2, period=10)
+
+    passed = [limiter.filter(make_record()) for _ in range(5)]
+    # Another template or level has its own window
+    other = limiter.filter(make_record("Other %s"))
+    warning = limiter.filter(make_record(level=logging.WARNING))
+    now[0] += 9.9
+    still_quiet = limiter.filter(make_record())
+    now[0] += 0.1
+    first_after = make_record()
+    reopened = limiter.filter(first_after)
+
+    assert passed == [True, True, False, False, False]
+    assert other and warning
+    assert not still_quiet
+    assert reopened
+    assert first_after.suppressed == 4
+    assert not hasattr(make_record(), "suppressed")
+
+
+def test_rate_limit_forgets_windows_above_max_keys():
+    limiter = RateLimitFilter(burst=1, period=60, max_keys=2)
+    for i in range(3):
+        assert limiter.filter(make_record(f"message {i}"))
+    assert len(limiter._windows) <= 2
+
+
+def test_context_filter_copies_fields_without_overriding_extra():
+    token = log_context.set({"user_id": 7, "update_id": 42, "handler": "start"})
+    try:
+        record = make_record(handler="explicit")
+        assert ContextFilter().filter(record)
+    finally:
+        log_context.reset(token)
+
+    assert (record.user_id, record.update_id, record.handler) == (7, 42, "explicit")
+
+
+def test_json_formatter_keeps_fields_and_exceptions():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record("Ошибка %s", ("импорта",), level=logging.ERROR, user_id=7, path=object())
+        record.exc_info = sys.exc_info()
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["msg"] == "Ошибка импорта"
+    assert entry["level"] == "ERROR"
+    assert entry["logger"] == "bot.test"
+    assert entry["user_id"] == 7
+    assert entry["path"].startswith("<object")
+    assert "ValueError: boom" in entry["exc"]
+    assert "args" not in entry and "exc_info" not in entry
+
+
+def test_text_formatter_appends_key_values():
+    formatter = TextFormatter("%(levelname)s %(name)s: %(message)s")
+    assert formatter.format(make_record(user_id=7, handler="start")) == "INFO bot.test: Saved 3 words user_id=7 handler=start"
+    assert formatter.format(make_record()) == "INFO bot.test: Saved 3 words"
+
+
+def test_setup_logging_writes_json_lines_through_the_queue():
+    script = (
+        "import logging\n"
+        "from utils.log import log_context, setup_logging\n"
+        "setup_logging(); setup_logging()\n"
+        "log_context.set({'user_id': 7})\n"
+        "for _ in range(5): logging.getLogger('bot').warning('Slow update %s', 1)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, timeout=30,
+        env={**os.environ, "LOG_FORMAT": "json", "LOG_RATE_LIMIT": "3"},
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(log.__file__))),
+    )
+    entries = [json.loads(line) for line in result.stdout.splitlines()]
+    assert len(entries) == 3
+    assert entries[0]["msg"] == "Slow update 1"
+    assert entries[0]["user_id"] == 7
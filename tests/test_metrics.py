@@ -0,0 +1,113 @@
+import asyncio
+import pstats
+
+import middlewares.metrics as metrics_middlewares
+from middlewares.metrics import UpdateMetrics
+from utils.metrics import COUNT_BUCKETS, Histogram, Metrics, SamplingProfiler, UpdateStats, current_update
+
+
+class Event:
+    event_type = "message"
+
+
+def lines_of(histogram: Histogram) -> dict[str, str]:
+    return dict(line.rsplit(" ", 1) for line in histogram.render() if not line.startswith("#"))
+
+
+def test_histogram_buckets_are_cumulative_and_total_the_count():
+    histogram = Histogram("t_seconds", "Test", ("handler",), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 0.7, 3):
+        histogram.observe(value, "start")
+
+    lines = lines_of(histogram)
+    assert lines['t_seconds_bucket{handler="start",le="0.1"}'] == "1"
+    assert lines['t_seconds_bucket{handler="start",le="1"}'] == "3"
+    assert lines['t_seconds_bucket{handler="start",le="+Inf"}'] == "4"
+    assert lines['t_seconds_count{handler="start"}'] == "4"
+    assert float(lines['t_seconds_sum{handler="start"}']) == 4.25
+
+
+def test_label_values_are_escaped():
+    histogram = Histogram("t_seconds", "Test", ("query",), buckets=(1,))
+    histogram.observe(0.5, 'say "hi"\\\nbye')
+
+    assert 't_seconds_count{query="say \\"hi\\"\\\\\\nbye"} 1' in list(histogram.render())
+
+
+def test_collectors_are_rendered_as_numeric_gauges():
+    metrics = Metrics()
+    metrics.collector("bot_cache", lambda: {"hits": 3, "ratio": 0.5, "enabled": True, "name": "x"})
+
+    text = metrics.render()
+    assert text.endswith("\n")
+    assert "# TYPE bot_cache_hits gauge\nbot_cache_hits 3\n" in text
+    assert "bot_cache_ratio 0.5\n" in text
+    assert "bot_cache_enabled" not in text
+    assert "bot_cache_name" not in text
+
+
+def test_update_stats_count_only_their_own_update(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(metrics_middlewares, "metrics", metrics)
+    middleware = UpdateMetrics()
+    seen = []
+
+    def handler(queries: int):
+        async def handle(event, data):
+            for _ in range(queries):
+                metrics.observe_db("get_user", 0.01)
+                await asyncio.sleep(0)
+            metrics.observe_api("sendMessage", 0.02)
+            metrics.observe_fsm("get_data", 0.03)
+            seen.append(current_update.get())
+        return handle
+
+    async def scenario():
+        await asyncio.gather(middleware(handler(1), Event(), {}), middleware(handler(3), Event(), {}))
+
+    asyncio.run(scenario())
+    # Outside of an update nothing is accounted to anyone
+    metrics.observe_db("get_user", 0.01)
+
+    assert sorted(stats.db_queries for stats in seen) == [1, 3]
+    assert all(stats.api_calls == 1 and abs(stats.fsm_time - 0.03) < 1e-9 for stats in seen)
+    assert current_update.get() is None
+    series = metrics.update_db_queries._series[()]
+    assert series[COUNT_BUCKETS.index(1)] == 1
+    assert series[COUNT_BUCKETS.index(3)] == 1
+    assert metrics.db_query_seconds._series[("get_user",)][-1] > 0.049
+    assert lines_of(metrics.update_seconds)['bot_update_seconds_count{event="message"}'] == "2"
+
+
+def test_update_stats_start_empty():
+    stats = UpdateStats()
+    assert (stats.db_queries, stats.db_time, stats.api_calls, stats.api_time, stats.fsm_time) == (0, 0.0, 0, 0.0, 0.0)
+
+
+def test_profiler_samples_one_update_at_a_time_and_dumps(tmp_path):
+    path = tmp_path / "profile.pstats"
+    profiler = SamplingProfiler(1.0, str(path))
+
+    with profiler.sample():
+        sum(range(1000))
+        # A second update arriving meanwhile is not profiled
+        with profiler.sample():
+            pass
+    with profiler.sample():
+        pass
+    profiler.dump()
+
+    assert profiler.samples == 2
+    assert pstats.Stats(str(path)).total_calls > 0
+
+
+def test_profiler_with_zero_rate_samples_nothing(tmp_path):
+    path = tmp_path / "profile.pstats"
+    profiler = SamplingProfiler(0.0, str(path))
+
+    with profiler.sample():
+        pass
+    profiler.dump()
+
+    assert profiler.samples == 0
+    assert not path.exists()
@@ -0,0 +1,61 @@
+import time
+
+from utils.page_cache import PageCache
+
+
+def test_get_returns_the_page_of_the_current_version():
+    cache = PageCache()
+    cache.set(1, "d", 1, cache.version(1, "d"), "page 1")
+    assert cache.get(1, "d", 1) == "page 1"
+    assert cache.get(1, "d", 2) is None
+    assert cache.get(2, "d", 1) is None
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2}
+
+
+def test_bump_hides_old_pages():
+    cache = PageCache()
+    cache.set(1, "d", 1, cache.version(1, "d"), "old")
+    cache.bump(1, "d")
+    assert cache.get(1, "d", 1) is None
+    cache.set(1, "d", 1, cache.version(1, "d"), "new")
+    assert cache.get(1, "d", 1) == "new"
+
+
+def test_page_rendered_before_a_mutation_is_dropped():
+    cache = PageCache()
+    version = cache.version(1, "d")
+    cache.bump(1, "d")
+    cache.set(1, "d", 1, version, "stale")
+    assert cache.get(1, "d", 1) is None
+
+
+def test_evicted_version_counter_does_not_revive_old_pages():
+    cache = PageCache(max_versions=1)
+    cache.bump(1, "a")
+    cache.set(1, "a", 1, cache.version(1, "a"), "a")
+    version = cache.version(1, "a")
+    cache.bump(1, "b")
+    assert cache.version(1, "a") != version
+    assert cache.get(1, "a", 1) is None
+
+
+def test_lru_eviction():
+    cache = PageCache(max_entries=2)
+    for page in (1, 2, 3):
+        cache.set(1, "d", page, 0, page)
+    assert cache.get(1, "d", 1) is None
+    assert cache.get(1, "d", 3) == 3
+
+
+def test_pages_expire():
+    cache = PageCache(ttl=0.01)
+    cache.set(1, "d", 1, 0, "page")
+    time.sleep(0.02)
+    assert cache.get(1, "d", 1) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_zero_ttl_disables_the_cache():
+    cache = PageCache(ttl=0)
+    cache.set(1, "d", 1, 0, "page")
+    assert cache.get(1, "d", 1) is None
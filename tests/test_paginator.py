@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from utils.paginator import AsyncPaginator, PageSource, Paginator, SequenceSource
+
+ITEMS = [f"item {i}" for i in range(10)]
+
+
+class CountingSource(PageSource):
+    """Records which methods the paginator called"""
+
+    def __init__(self, array):
+        self.inner = SequenceSource(array)
+        self.calls = []
+
+    async def count(self):
+        self.calls.append("count")
+        return await self.inner.count()
+
+    async def slice(self, offset, limit):
+        self.calls.append("slice")
+        return await self.inner.slice(offset, limit)
+
+    async def after(self, key, limit):
+        self.calls.append("after")
+        return await self.inner.after(key, limit)
+
+    async def before(self, key, limit):
+        self.calls.append("before")
+        return await self.inner.before(key, limit)
+
+
+def test_page_source_is_abstract():
+    class Incomplete(PageSource):
+        async def count(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_sequence_source():
+    source = SequenceSource(ITEMS)
+
+    async def scenario():
+        return (await source.count(), await source.slice(2, 3), await source.after(7, 5), await source.before(2, 5))
+
+    count, middle, tail, head = asyncio.run(scenario())
+    assert count == 10
+    assert middle == [(2, "item 2"), (3, "item 3"), (4, "item 4")]
+    assert tail == [(8, "item 8"), (9, "item 9")]
+    assert head == [(0, "item 0"), (1, "item 1")]
+
+
+def test_pages_match_the_list_paginator():
+    async def scenario():
+        pg = AsyncPaginator(SequenceSource(ITEMS), page=1, per_page=3)
+        pages = [await pg.get_page()]
+        while await pg.has_next():
+            pages.append(await pg.get_next())
+        backwards = []
+        while await pg.has_previous():
+            backwards.append(await pg.get_previous())
+        return pages, backwards
+
+    pages, backwards = asyncio.run(scenario())
+    expected = []
+    pg = Paginator(ITEMS, page=1, per_page=3)
+    expected.append(pg.get_page())
+    while pg.has_next():
+        expected.append(pg.get_next())
+    assert [[item for _, item in page] for page in pages] == [list(page) for page in expected]
+    assert [number for number, _ in pages[-1]] == [9]
+    assert backwards == pages[-2::-1]
+
+
+def test_neighbour_pages_are_loaded_by_key():
+    source = CountingSource(ITEMS)
+
+    async def scenario():
+        pg = AsyncPaginator(source, page=2, per_page=3)
+        await pg.get_page()
+        await pg.get_next()
+        await pg.get_previous()
+        return pg
+
+    pg = asyncio.run(scenario())
+    assert source.calls == ["slice", "count", "after", "before"]
+    assert pg.page == 2
+
+
+def test_state_restores_the_paginator():
+    async def scenario():
+        pg = AsyncPaginator(SequenceSource(ITEMS), page=1, per_page=4)
+        await pg.get_page()
+        restored = AsyncPaginator(SequenceSource(ITEMS), per_page=4, **pg.state())
+        return await restored.get_next()
+
+    assert [number for number, _ in asyncio.run(scenario())] == [4, 5, 6, 7]
+
+
+def test_moving_past_the_ends_raises():
+    async def scenario():
+        pg = AsyncPaginator(SequenceSource(ITEMS), page=1, per_page=10)
+        with pytest.raises(IndexError):
+            await pg.get_previous()
+        with pytest.raises(IndexError):
+            await pg.get_next()
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.memory_db import MemoryDatabase
+from db.models import Database
+from db.pool import PoolStats
+from db.queries import QUERIES
+
+ROOT = Path(__file__).resolve().parent.parent
+USED_QUERY = re.compile(r'(?:fetch|fetchrow|fetchval)\("(\w+)"|statements\["(\w+)"\]')
+
+
+def used_queries(path: Path) -> set[str]:
+    return {a or b for a, b in USED_QUERY.findall(path.read_text(encoding="utf-8"))}
+
+
+def test_every_query_used_by_database_is_registered():
+    used = used_queries(ROOT / "db" / "models.py")
+    assert used
+    assert used <= set(QUERIES), used - set(QUERIES)
+
+
+def test_memory_database_implements_the_used_queries():
+    used = used_queries(ROOT / "db" / "models.py")
+    assert used <= set(MemoryDatabase()._queries)
+
+
+def test_queries_are_non_empty_sql():
+    for name, query in QUERIES.items():
+        assert query.strip(), name
+
+
+def test_pool_settings_come_from_the_environment():
+    env = dict(os.environ, DB_POOL_MIN_SIZE="3", DB_POOL_MAX_SIZE="25",
+               DB_POOL_MAX_INACTIVE_LIFETIME="60", DB_COMMAND_TIMEOUT="2.5", DB_POOL_SLOW_ACQUIRE_MS="50")
+    script = "import json; from db.init_db import db; print(json.dumps([db.pool_config, db.pool_stats.slow_acquire]))"
+    result = subprocess.run([sys.executable, "-c", script], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True)
+    pool_config, slow_acquire = json.loads(result.stdout.strip().splitlines()[-1])
+    assert pool_config == {
+        "min_size": 3, "max_size": 25, "max_inactive_connection_lifetime": 60.0, "command_timeout": 2.5,
+    }
+    assert slow_acquire == 0.05
+
+
+def test_pool_stats():
+    stats = PoolStats(slow_acquire=0.01)
+    fast = stats.start_wait()
+    slow = stats.start_wait()
+    assert stats.waiting == 2
+    stats.end_wait(fast)
+    stats.end_wait(slow - 0.02)
+    snapshot = stats.snapshot()
+    assert snapshot["waiting"] == 0
+    assert snapshot["max_waiting"] == 2
+    assert snapshot["acquires"] == 2
+    assert snapshot["slow_acquires"] == 1
+    assert snapshot["max_acquire_ms"] >= 20
+    assert 0 < snapshot["avg_acquire_ms"] <= snapshot["max_acquire_ms"]
+
+
+class FakePool:
+    def __init__(self):
+        self.released = []
+
+    async def acquire(self):
+        await asyncio.sleep(0.01)
+        return "conn"
+
+    async def release(self, conn):
+        self.released.append(conn)
+
+    def get_size(self):
+        return 2
+
+    def get_idle_size(self):
+        return 1
+
+    def get_min_size(self):
+        return 1
+
+    def get_max_size(self):
+        return 10
+
+
+def test_acquire_records_the_wait_and_releases():
+    database = Database({}, pool_stats=PoolStats(slow_acquire=0.005))
+    database.pool = FakePool()
+
+    async def scenario():
+        async with database.acquire() as conn:
+            assert conn == "conn"
+            assert database.pool_stats.waiting == 0
+
+    asyncio.run(scenario())
+    assert database.pool.released == ["conn"]
+    snapshot = database.get_pool_stats()
+    assert snapshot["acquires"] == 1
+    assert snapshot["slow_acquires"] == 1
+    assert (snapshot["size"], snapshot["idle"], snapshot["min_size"], snapshot["max_size"]) == (2, 1, 1, 10)
@@ -0,0 +1,122 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from middlewares.rate_limit import OutgoingRateLimiter, bulk_sends
+
+
+class StubApi:
+    """Stands in for the next request middleware: records the order and time of requests"""
+
+    def __init__(self, retry_after: list[int] = ()):
+        self.retry_after = list(retry_after)
+        self.sent = []
+
+    async def __call__(self, bot, method):
+        self.sent.append((method.text, time.monotonic()))
+        if self.retry_after:
+            raise TelegramRetryAfter(method, "Too Many Requests", self.retry_after.pop(0))
+        return True
+
+
+def send(limiter: OutgoingRateLimiter, api: StubApi, chat_id, text: str = ""):
+    return limiter(api, None, SendMessage(chat_id=chat_id, text=text))
+
+
+def run(limiter: OutgoingRateLimiter, scenario):
+    async def main():
+        try:
+            return await scenario()
+        finally:
+            await limiter.close()
+
+    return asyncio.run(main())
+
+
+def test_chat_buckets_limit_each_chat_separately():
+    limiter = OutgoingRateLimiter(global_rate=1000, private_rate=10, group_rate=5, burst=1)
+    api = StubApi()
+
+    async def scenario():
+        started = time.monotonic()
+        await asyncio.gather(*(send(limiter, api, 1) for _ in range(3)))
+        private = time.monotonic() - started
+        started = time.monotonic()
+        await asyncio.gather(*(send(limiter, api, chat_id) for chat_id in range(100, 110)))
+        return private, time.monotonic() - started
+
+    private, many_chats = run(limiter, scenario)
+    assert private >= 0.18
+    assert many_chats < 0.1
+    assert limiter._chat_bucket(-100).rate == 5
+    assert limiter._chat_bucket("@channel").rate == 5
+    assert limiter._chat_bucket(42).rate == 10
+
+
+def test_global_rate_is_split_between_workers(monkeypatch):
+    monkeypatch.setenv("OUTGOING_GLOBAL_RATE", "40")
+    monkeypatch.setenv("BOT_WORKERS", "4")
+    monkeypatch.setenv("OUTGOING_GROUP_RATE_PER_MIN", "30")
+    limiter = OutgoingRateLimiter.from_env()
+    assert limiter.global_bucket.rate == 10
+    assert limiter.group_rate == 0.5
+
+
+def test_interactive_requests_go_before_bulk_ones():
+    limiter = OutgoingRateLimiter(global_rate=50, burst=10)
+    api = StubApi()
+
+    async def scenario():
+        # The global bucket is empty, so every request waits in the queue
+        limiter.global_bucket.tokens = 0
+        with bulk_sends():
+            bulk = [asyncio.create_task(send(limiter, api, chat_id, "bulk")) for chat_id in range(1, 6)]
+        await asyncio.sleep(0)
+        await send(limiter, api, 100, "interactive")
+        await asyncio.gather(*bulk)
+
+    run(limiter, scenario)
+    assert [text for text, _ in api.sent][0] == "interactive"
+    assert len(api.sent) == 6
+
+
+def test_retry_after_pauses_and_retries():
+    limiter = OutgoingRateLimiter()
+    api = StubApi(retry_after=[1])
+
+    async def scenario():
+        return await send(limiter, api, 1)
+
+    assert run(limiter, scenario) is True
+    assert len(api.sent) == 2
+    assert api.sent[1][1] - api.sent[0][1] >= 0.95
+    assert limiter.retries == 1
+
+
+def test_retries_are_capped():
+    limiter = OutgoingRateLimiter(max_retries=2)
+    api = StubApi(retry_after=[0] * 10)
+
+    async def scenario():
+        with pytest.raises(TelegramRetryAfter):
+            await send(limiter, api, 1)
+
+    run(limiter, scenario)
+    assert len(api.sent) == 3
+
+
+def test_close_stops_the_queue_task():
+    limiter = OutgoingRateLimiter()
+    api = StubApi()
+
+    async def scenario():
+        await send(limiter, api, 1)
+        task = limiter._task
+        assert not task.done()
+        await limiter.close()
+        return task
+
+    assert asyncio.run(scenario()).done()
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import uuid
+
+from db.recorder import AnswerRecorder
+from utils.srs import ReviewState
+
+
+class SlowDatabase:
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.saved = []
+
+    async def record_answers(self, answers):
+        await asyncio.sleep(self.delay)
+        self.saved.extend(answers)
+
+
+def record(recorder: AnswerRecorder, word_id: int):
+    recorder.record(str(uuid.uuid4()), 1, word_id, False, True, ReviewState(), time.time())
+
+
+def test_close_keeps_the_batch_being_flushed():
+    database = SlowDatabase()
+
+    async def scenario():
+        recorder = AnswerRecorder(database, batch_size=2, flush_interval=10)
+        recorder.start()
+        record(recorder, 1)
+        record(recorder, 2)
+        # The background flush has taken the batch and is waiting on the database
+        await asyncio.sleep(0.01)
+        assert len(recorder) == 0
+        record(recorder, 3)
+        await recorder.close()
+        return recorder
+
+    recorder = asyncio.run(scenario())
+    assert sorted(answer[2] for answer in database.saved) == [1, 2, 3]
+    assert len(recorder) == 0
+
+
+def test_cancelled_flush_puts_the_batch_back():
+    database = SlowDatabase(delay=1)
+
+    async def scenario():
+        recorder = AnswerRecorder(database)
+        record(recorder, 1)
+        flush = asyncio.create_task(recorder.flush())
+        await asyncio.sleep(0.01)
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        return recorder
+
+    assert len(asyncio.run(scenario())) == 1
+
+
+def test_pending_covers_the_buffer_and_the_batch_being_written():
+    database = SlowDatabase()
+
+    async def scenario():
+        recorder = AnswerRecorder(database)
+        record(recorder, 1)
+        recorder.record(str(uuid.uuid4()), 2, 5, False, True, ReviewState(), time.time())
+        recorder.record(str(uuid.uuid4()), 1, 6, True, True, ReviewState(), time.time())
+        flush = asyncio.create_task(recorder.flush())
+        await asyncio.sleep(0.01)
+        record(recorder, 2)
+        during = recorder.pending(1, False)
+        await flush
+        return during, recorder.pending(1, False), recorder.pending(1, True)
+
+    during, after, reversed_ = asyncio.run(scenario())
+    assert during == {1, 2}
+    assert after == {2}
+    assert reversed_ == set()
@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from benchmarks.memory_db import MemoryDatabase
+from db.cache import DictionaryCache
+from utils.page_cache import PageCache
+from utils.search_index import DictionarySearchIndex, SearchIndexCache
+
+
+def test_search_index_finds_exact_prefix_and_fuzzy():
+    index = DictionarySearchIndex([("apple", "яблоко"), ("apricot", "абрикос"), ("banana", "банан")])
+    assert index.forward["apple"] == "яблоко"
+    assert [word for word, _ in index.search("apr")][:1] == ["apricot"]
+    assert "banana" in [word for word, _ in index.search("banan")]
+
+
+def test_cache_drops_an_index_that_raced_with_a_mutation():
+    cache = SearchIndexCache()
+    cache.set(1, "d", DictionarySearchIndex(), version=3, current_version=4)
+    assert cache.get(1, "d") is None
+    index = DictionarySearchIndex()
+    cache.set(1, "d", index, version=4, current_version=4)
+    assert cache.get(1, "d") is index
+
+
+def test_cache_expires_entries():
+    cache = SearchIndexCache(ttl=0.01)
+    cache.set(1, "d", DictionarySearchIndex())
+    time.sleep(0.02)
+    assert cache.get(1, "d") is None
+
+
+def test_lru_eviction():
+    cache = SearchIndexCache(max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.set(1, name, DictionarySearchIndex())
+    assert cache.get(1, "a") is None
+    assert cache.get(1, "c") is not None
+
+
+def test_get_search_index_does_not_store_a_stale_build():
+    database = MemoryDatabase(cache=DictionaryCache(), search_indexes=SearchIndexCache(), pages=PageCache())
+    database.seed(1, "d", [("cat", "кот")])
+
+    async def scenario():
+        # The mutation lands while the index is being built
+        load = database.get_user_dictionaries
+
+        async def racing_load(telegram_id):
+            # A snapshot read from the database before the mutation
+            dictionaries = {name: dict(words) for name, words in (await load(telegram_id)).items()}
+            await database.add_word_to_dict(1, "d", "dog:пёс")
+            return dictionaries
+
+        database.get_user_dictionaries = racing_load
+        await database.get_search_index(1, "d")
+        database.get_user_dictionaries = load
+        return await database.get_search_index(1, "d")
+
+    assert "dog" in asyncio.run(scenario()).forward
+
+
+def test_edit_renames_a_word_only():
+    index = DictionarySearchIndex([("cat", "кот"), ("tomcat", "кот")])
+    assert index.edit("cat", "kitty")
+    assert index.forward == {"kitty": "кот", "tomcat": "кот"}
+    assert index.prefix("ca") == []
+    assert not index.edit("кот", "котик")
+    assert index.forward == {"kitty": "кот", "tomcat": "кот"}
+
+
+def test_translation_edit_keeps_the_index_in_line_with_the_database():
+    database = MemoryDatabase(cache=DictionaryCache(), search_indexes=SearchIndexCache(), pages=PageCache())
+    database.seed(1, "d", [("tomcat", "кот"), ("cat", "кот"), ("dog", "пёс")])
+
+    async def scenario():
+        await database.get_search_index(1, "d")
+        # Rename first, so the index's order of words with this translation differs from id order
+        await database.edit_word_in_dict(1, "d", "tomcat", "tom")
+        await database.edit_word_in_dict(1, "d", "кот", "котик")
+        return await database.get_search_index(1, "d")
+
+    index = asyncio.run(scenario())
+    stored = {row["word"]: row["translation"] for row in database._user_dictionaries(1, "d")}
+    assert index.forward == stored
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import queue
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+
+from utils.sharding import ShardedRunner, _process_updates, update_user_id
+
+handled: list[int] = []
+running = 0
+peak = 0
+
+
+def create_app():
+    router = Router()
+
+    @router.message()
+    async def slow(message: Message):
+        global running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        handled.append(message.message_id)
+
+    dp = Dispatcher()
+    dp.include_router(router)
+    return Bot("42:TEST"), dp
+
+
+def message_update(update_id: int, user_id: int) -> str:
+    return json.dumps({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "user"},
+            "text": "hi",
+        },
+    })
+
+
+def test_update_user_id():
+    assert update_user_id(json.loads(message_update(1, 7))) == 7
+    assert update_user_id({"update_id": 5, "poll": {"id": "p"}}) == 5
+
+
+def test_worker_handles_updates_in_user_order_with_bounded_concurrency():
+    updates = queue.Queue()
+    for update_id in range(1, 21):
+        updates.put(message_update(update_id, user_id=update_id % 4))
+    updates.put(None)
+    handled.clear()
+
+    asyncio.run(_process_updates(updates, create_app, max_concurrency=3))
+
+    assert sorted(handled) == list(range(1, 21))
+    assert peak <= 3
+    for user_id in range(4):
+        own = [update_id for update_id in handled if update_id % 4 == user_id]
+        assert own == sorted(own)
+
+
+def test_restarted_worker_gets_a_fresh_queue_with_the_waiting_updates():
+    runner = ShardedRunner(1, create_app, queue_size=10)
+    old = runner.queues[0]
+    for update_id in range(1, 4):
+        old.put(message_update(update_id, user_id=1))
+
+    assert runner._replace_queue(0) == 3
+    assert runner.queues[0] is not old
+    assert [json.loads(runner.queues[0].get(timeout=1))["update_id"] for _ in range(3)] == [1, 2, 3]
+    assert runner._replace_queue(0, timeout=0.01) == 0
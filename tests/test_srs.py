@@ -0,0 +1,62 @@
+import pytest
+
+from utils.srs import DAY, RELEARN_DELAY, ReviewQueue, ReviewState, next_due, review
+
+
+def test_intervals_grow_as_in_sm2():
+    state = ReviewState()
+    intervals = []
+    for _ in range(4):
+        state = review(state, 4)
+        intervals.append(state.interval)
+    assert intervals[:2] == [1.0, 6.0]
+    assert intervals[2] == pytest.approx(6.0 * 2.5)
+    assert intervals[3] > intervals[2]
+    assert state.repetitions == 4
+
+
+def test_forgotten_word_starts_over_and_gets_harder():
+    state = review(review(ReviewState(), 5), 5)
+    forgotten = review(state, 1)
+    assert forgotten.interval == 0.0
+    assert forgotten.repetitions == 0
+    assert forgotten.easiness < state.easiness
+
+
+def test_easiness_has_a_floor():
+    state = ReviewState()
+    for _ in range(20):
+        state = review(state, 0)
+    assert state.easiness == 1.3
+
+
+def test_next_due():
+    assert next_due(ReviewState(2.5, 6.0, 2), now=100) == 100 + 6 * DAY
+    assert next_due(ReviewState(), now=100) == 100 + RELEARN_DELAY
+
+
+def test_review_state_is_a_plain_tuple():
+    state = review(ReviewState(), 4)
+    assert ReviewState(*list(state)) == state
+
+
+def test_queue_pops_in_due_order():
+    queue = ReviewQueue()
+    queue.push(3, due_at=30)
+    queue.push(1, due_at=10)
+    queue.push(2, due_at=20)
+    assert len(queue) == 3
+    assert queue.pop(now=5) is None
+    assert queue.pop(now=25) == 1
+    assert queue.pop(now=25) == 2
+    # Without now the earliest word is taken ahead of time
+    assert queue.pop() == 3
+    assert queue.pop() is None
+
+
+def test_queue_works_on_the_stored_list():
+    heap = []
+    ReviewQueue(heap).push(7, due_at=1)
+    assert heap == [[1, 7]]
+    assert ReviewQueue(heap).pop() == 7
+    assert heap == []
@@ -0,0 +1,150 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import handlers.tests_router as tests_router
+from benchmarks.memory_db import MemoryDatabase
+from db.cache import DictionaryCache
+from db.recorder import AnswerRecorder
+from utils.distractors import DistractorCache
+from utils.page_cache import PageCache
+from utils.search_index import SearchIndexCache
+from utils.srs import ReviewQueue, ReviewState, next_due
+
+USER = 1
+NAME = "animals"
+WORDS = [("cat", "кот"), ("dog", "пёс"), ("cow", "корова"), ("fox", "лиса"), ("owl", "сова"), ("pig", "свинья")]
+
+
+def setup(monkeypatch) -> MemoryDatabase:
+    database = MemoryDatabase(cache=DictionaryCache(), search_indexes=SearchIndexCache(), pages=PageCache())
+    database.seed(USER, NAME, WORDS)
+    monkeypatch.setattr(tests_router, "db", database)
+    monkeypatch.setattr(tests_router, "distractor_samplers", DistractorCache())
+    monkeypatch.setattr(tests_router, "answer_recorder", AnswerRecorder(database))
+    return database
+
+
+def test_sampler_is_reused_while_the_dictionary_is_unchanged(monkeypatch):
+    setup(monkeypatch)
+
+    async def scenario():
+        first = await tests_router.get_distractor_sampler(USER, NAME, False)
+        second = await tests_router.get_distractor_sampler(USER, NAME, False)
+        reversed_ = await tests_router.get_distractor_sampler(USER, NAME, True)
+        return first, second, reversed_
+
+    first, second, reversed_ = asyncio.run(scenario())
+    assert first is second
+    assert sorted(first.answers) == sorted(translation for _, translation in WORDS)
+    assert sorted(reversed_.answers) == sorted(word for word, _ in WORDS)
+
+
+def test_sampler_is_a_bounded_sample_sized_by_the_word_count(monkeypatch):
+    database = setup(monkeypatch)
+    database.seed(USER, "big", [(f"word{i}", f"слово{i}") for i in range(100)])
+    monkeypatch.setattr(tests_router, "DISTRACTOR_POOL_SIZE", 10)
+
+    async def whole_dictionaries(telegram_id):
+        raise AssertionError("the sampler must not load the whole dictionary set")
+
+    monkeypatch.setattr(database, "get_user_dictionaries", whole_dictionaries)
+
+    async def scenario():
+        first = await tests_router.get_distractor_sampler(USER, "big", False)
+        second = await tests_router.get_distractor_sampler(USER, "big", False)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is second
+    assert first.size == 100
+    assert len(first.answers) == 10
+    assert set(first.answers) <= {f"слово{i}" for i in range(100)}
+
+
+def test_sampler_is_rebuilt_after_an_edit_of_the_same_size(monkeypatch):
+    database = setup(monkeypatch)
+
+    async def scenario():
+        await tests_router.get_distractor_sampler(USER, NAME, False)
+        await database.edit_word_in_dict(USER, NAME, "кот", "кошка")
+        return await tests_router.get_distractor_sampler(USER, NAME, False)
+
+    sampler = asyncio.run(scenario())
+    assert "кошка" in sampler.answers
+    assert "кот" not in sampler.answers
+
+
+def test_sampler_is_rebuilt_after_a_delete_and_an_add(monkeypatch):
+    database = setup(monkeypatch)
+
+    async def scenario():
+        await tests_router.get_distractor_sampler(USER, NAME, False)
+        await database.delete_word_from_dict(USER, NAME, "cat")
+        await database.add_word_to_dict(USER, NAME, "bee:пчела")
+        return await tests_router.get_distractor_sampler(USER, NAME, False)
+
+    sampler = asyncio.run(scenario())
+    assert "кот" not in sampler.answers
+
+
+def test_session_cards_stay_bounded_when_answers_are_wrong(monkeypatch):
+    database = setup(monkeypatch)
+    database.seed(USER, "big", [(f"word{i}", f"слово{i}") for i in range(100)])
+    data = {"queue": [], "cards": {}, "selected_dict": "big", "is_reversed": False}
+
+    async def scenario():
+        sizes = []
+        for _ in range(3 * tests_router.DUE_WORDS_PER_SESSION):
+            card_id = await tests_router.next_card(USER, data)
+            # Answered wrong and recorded: the card comes back after the relearn delay
+            due_at = next_due(ReviewState())
+            ReviewQueue(data["queue"]).push(int(card_id), due_at)
+            database.reviews[(int(card_id), False)] = (2.5, 0.0, 0, datetime.fromtimestamp(due_at, timezone.utc))
+            sizes.append(len(data["cards"]))
+        return sizes
+
+    sizes = asyncio.run(scenario())
+    assert max(sizes) == tests_router.DUE_WORDS_PER_SESSION
+    assert len(data["queue"]) == tests_router.DUE_WORDS_PER_SESSION
+
+
+def test_learned_cards_make_room_for_new_ones(monkeypatch):
+    database = setup(monkeypatch)
+    database.seed(USER, "big", [(f"word{i}", f"слово{i}") for i in range(30)])
+    data = {"queue": [], "cards": {}, "selected_dict": "big", "is_reversed": False}
+
+    async def scenario():
+        seen = set()
+        for _ in range(30):
+            card_id = await tests_router.next_card(USER, data)
+            seen.add(card_id)
+            # Answered right and recorded: the card leaves the session
+            del data["cards"][card_id]
+            database.reviews[(int(card_id), False)] = (2.5, 1.0, 1, datetime.now(timezone.utc) + timedelta(days=1))
+        return seen
+
+    assert len(asyncio.run(scenario())) == 30
+
+
+def test_buffered_answers_are_not_loaded_again_and_not_flushed(monkeypatch):
+    database = setup(monkeypatch)
+    database.seed(USER, "big", [(f"word{i}", f"слово{i}") for i in range(30)])
+    recorder = tests_router.answer_recorder
+    data = {"queue": [], "cards": {}, "selected_dict": "big", "is_reversed": False}
+
+    async def scenario():
+        seen = set()
+        for _ in range(30):
+            card_id = await tests_router.next_card(USER, data)
+            seen.add(card_id)
+            # Answered right: the card leaves the session, its review waits in the buffer
+            del data["cards"][card_id]
+            state = ReviewState(2.5, 1.0, 1)
+            recorder.record(str(uuid.uuid4()), USER, int(card_id), False, True, state, time.time() + 86400)
+        return seen
+
+    assert len(asyncio.run(scenario())) == 30
+    assert len(recorder) == 30
+    assert not database.reviews
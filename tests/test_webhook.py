@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from utils.webhook import BoundedRequestHandler
+
+
+class NullSession(BaseSession):
+    async def make_request(self, bot, method, timeout=None):
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+def message_update(update_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": update_id, "type": "private"},
+            "from": {"id": update_id, "is_bot": False, "first_name": "user"},
+            "text": "hi",
+        },
+    }
+
+
+class App:
+    """Webhook app whose message handler blocks until released"""
+
+    def __init__(self, max_concurrency: int, drain_timeout: float = 30):
+        self.release = asyncio.Event()
+        self.started = 0
+        self.finished = 0
+        self.running = 0
+        self.peak = 0
+        router = Router()
+
+        @router.message()
+        async def handle(message: Message):
+            self.started += 1
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+            await self.release.wait()
+            self.running -= 1
+            self.finished += 1
+
+        dp = Dispatcher()
+        dp.include_router(router)
+        self.handler = BoundedRequestHandler(
+            dispatcher=dp, bot=Bot("42:TEST", session=NullSession()),
+            max_concurrency=max_concurrency, drain_timeout=drain_timeout,
+        )
+        self.app = web.Application()
+        self.handler.register(self.app, path="/webhook")
+
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+def test_concurrency_bound_and_back_pressure():
+    async def scenario():
+        app = App(max_concurrency=2)
+        async with TestClient(TestServer(app.app)) as client:
+            posts = [asyncio.create_task(client.post("/webhook", json=message_update(i))) for i in range(1, 4)]
+            await asyncio.sleep(0.2)
+            # Two updates are in flight and answered; the third request waits for a free slot
+            answered = [post.done() for post in posts]
+            in_flight = app.running
+            app.release.set()
+            responses = await asyncio.gather(*posts)
+            await app.handler.drain()
+            return answered, in_flight, [response.status for response in responses], app
+
+    answered, in_flight, statuses, app = asyncio.run(scenario())
+    assert sorted(answered) == [False, True, True]
+    assert in_flight == 2
+    assert statuses == [200, 200, 200]
+    assert app.finished == 3
+    assert app.peak == 2
+
+
+def test_close_drains_in_flight_updates():
+    async def scenario():
+        app = App(max_concurrency=10)
+        async with TestClient(TestServer(app.app)) as client:
+            for i in range(1, 4):
+                await client.post("/webhook", json=message_update(i))
+            await settle()
+            asyncio.get_running_loop().call_later(0.05, app.release.set)
+            await app.handler.close()
+            return app.finished
+
+    assert asyncio.run(scenario()) == 3
+
+
+def test_drain_gives_up_after_the_timeout():
+    async def scenario():
+        app = App(max_concurrency=10, drain_timeout=0.1)
+        async with TestClient(TestServer(app.app)) as client:
+            await client.post("/webhook", json=message_update(1))
+            await settle()
+            started = time.monotonic()
+            await app.handler.close()
+            elapsed = time.monotonic() - started
+            finished = app.finished
+            app.release.set()
+            await settle()
+            return elapsed, finished
+
+    elapsed, finished = asyncio.run(scenario())
+    assert 0.1 <= elapsed < 1
+    assert finished == 0
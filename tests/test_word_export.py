@@ -0,0 +1,94 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+
+from utils.word_export import ExportFile
+
+ROWS = [
+    ("animals", "cat", "кот"),
+    ("animals", "say \"hi\", bye", "привет,\nпока"),
+    ("empty", None, None),
+    ("plants", "oak", "дуб"),
+]
+
+
+class Cursor:
+    """Rows factory that counts the cursors it opened and the ones closed"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.opened = 0
+        self.closed = 0
+
+    def __call__(self):
+        return self.iterate()
+
+    async def iterate(self):
+        self.opened += 1
+        try:
+            for row in self.rows:
+                await asyncio.sleep(0)
+                yield row
+        finally:
+            self.closed += 1
+
+
+def read(file: ExportFile, limit: int = None) -> bytes:
+    async def scenario():
+        chunks = []
+        async for chunk in file.read(None):
+            chunks.append(chunk)
+            if limit is not None and len(chunks) >= limit:
+                break
+        return b"".join(chunks)
+
+    return asyncio.run(scenario())
+
+
+def test_csv_skips_empty_dictionaries_and_quotes_values():
+    file = ExportFile(Cursor(ROWS), "dictionaries", chunk_size=16)
+    rows = list(csv.reader(io.StringIO(read(file).decode("utf-8"))))
+
+    assert file.filename == "dictionaries.csv"
+    assert rows == [["dictionary", "word", "translation"]] + [list(row) for row in ROWS if row[1] is not None]
+
+
+def test_json_keeps_empty_dictionaries():
+    file = ExportFile(Cursor(ROWS), "dictionaries", format="json", chunk_size=16)
+
+    assert json.loads(read(file)) == {
+        "animals": {"cat": "кот", "say \"hi\", bye": "привет,\nпока"},
+        "empty": {},
+        "plants": {"oak": "дуб"},
+    }
+
+
+def test_no_dictionaries_give_valid_files():
+    assert json.loads(read(ExportFile(Cursor([]), "none", format="json"))) == {}
+    assert read(ExportFile(Cursor([]), "none")).decode() == "dictionary,word,translation\r\n"
+
+
+def test_gzip_decompresses_to_the_same_file():
+    rows = [("big", f"word{i}", f"слово{i}") for i in range(5000)]
+    plain = read(ExportFile(Cursor(rows), "big", format="json", chunk_size=1024))
+    file = ExportFile(Cursor(rows), "big", format="json", compress=True, chunk_size=1024)
+    compressed = read(file)
+
+    assert file.filename == "big.json.gz"
+    assert gzip.decompress(compressed) == plain
+    assert len(compressed) < len(plain)
+
+
+def test_retry_reads_a_fresh_cursor_and_an_aborted_read_closes_it():
+    cursor = Cursor([("big", f"word{i}", f"слово{i}") for i in range(1000)])
+    file = ExportFile(cursor, "big", chunk_size=256)
+
+    # The first upload attempt breaks off after two chunks
+    read(file, limit=2)
+    retried = read(file)
+
+    assert cursor.opened == 2
+    assert cursor.closed == 2
+    assert len(list(csv.reader(io.StringIO(retried.decode("utf-8"))))) == 1001
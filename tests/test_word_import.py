@@ -0,0 +1,87 @@
+import asyncio
+
+from utils.word_import import MAX_RECORD_LENGTH, PairParser, iter_pair_chunks
+
+
+def parse(text: str, chunk: int = 0, **kwargs) -> tuple[list[tuple[str, str]], PairParser]:
+    parser = PairParser(**kwargs)
+    pairs = []
+    if chunk:
+        for start in range(0, len(text), chunk):
+            pairs.extend(parser.feed(text[start:start + chunk]))
+    else:
+        pairs.extend(parser.feed(text))
+    pairs.extend(parser.close())
+    return pairs, parser
+
+
+def test_csv_with_header():
+    pairs, parser = parse("word,translation\ncat,кот\nDog , Собака\n")
+    assert pairs == [("cat", "кот"), ("dog", "собака")]
+    assert parser.rows == 2
+    assert parser.imported == 2
+
+
+def test_tsv_and_semicolon_are_detected():
+    assert parse("cat\tкот\ndog\tпёс")[0] == [("cat", "кот"), ("dog", "пёс")]
+    assert parse("cat;кот\ndog;пёс\n")[0] == [("cat", "кот"), ("dog", "пёс")]
+
+
+def test_chunk_boundaries_do_not_matter():
+    text = 'word,translation\ncat,кот\n"big, red",большой\n"two\nlines",строки\ndog,пёс\n'
+    expected, _ = parse(text)
+    assert expected == [("cat", "кот"), ("big, red", "большой"), ("two lines", "строки"), ("dog", "пёс")]
+    for chunk in (1, 2, 5, 7):
+        assert parse(text, chunk=chunk)[0] == expected
+
+
+def test_malformed_row_does_not_swallow_the_next_lines():
+    pairs, parser = parse('"quoted" word,x\ncat,кот\n')
+    assert pairs == [("cat", "кот")]
+    assert parser.invalid == 1
+    assert parser.rows == 2
+
+
+def test_unclosed_quote_at_end_is_invalid():
+    pairs, parser = parse('cat,кот\ndog,"пёс\n')
+    assert pairs == [("cat", "кот")]
+    assert parser.invalid == 1
+
+
+def test_overlong_unclosed_record_stops_carrying_over():
+    pairs, parser = parse('a,"' + "x" * MAX_RECORD_LENGTH + "\ncat,кот\n")
+    assert pairs == [("cat", "кот")]
+    assert parser.invalid == 1
+
+
+def test_invalid_and_duplicate_rows_are_counted():
+    pairs, parser = parse("cat,кот\nlonely\n,empty\ncat,кошка\n" + "x" * 11 + ",y\n", max_length=10)
+    assert pairs == [("cat", "кот")]
+    assert parser.invalid == 3
+    assert parser.duplicates == 1
+    assert parser.imported == 1
+
+
+def test_anki_export():
+    text = (
+        "#separator:tab\n#html:true\n#guid column:1\n#deck column:2\n"
+        "abc\tDeck\t<b>cat</b>\tкот&nbsp;(animal)\n"
+        "def\tDeck\tdog\tпёс\n"
+    )
+    pairs, parser = parse(text)
+    assert pairs == [("cat", "кот (animal)"), ("dog", "пёс")]
+    assert parser.imported == 2
+
+
+def test_iter_pair_chunks_decodes_utf8_split_across_chunks():
+    data = "\ufeffcat,кот\ndog,пёс\n".encode("utf-8")
+
+    async def chunks():
+        for start in range(0, len(data), 3):
+            yield data[start:start + 3]
+
+    async def collect():
+        return [batch async for batch in iter_pair_chunks(chunks(), PairParser(), batch_size=1)]
+
+    batches = asyncio.run(collect())
+    assert [pair for batch in batches for pair in batch] == [("cat", "кот"), ("dog", "пёс")]
@@ -0,0 +1,64 @@
+import os
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import PRODUCTION, TelegramAPIServer
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+
+
+class TunedSession(AiohttpSession):
+    """
+    AiohttpSession with a tunable connection pool: per-host limit, keep-alive,
+    DNS cache and per-method request timeouts.
+    One instance is shared by all requests of the bot, so connections to the Bot API are reused.
+    """
+
+    def __init__(self, *, limit: int = 100, limit_per_host: int = 0, keepalive_timeout: float = 60,
+                 ttl_dns_cache: int = 3600, method_timeouts: Optional[dict[str, float]] = None, **kwargs: Any):
+        super().__init__(limit=limit, **kwargs)
+        self._connector_init.update(
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout,
+            use_dns_cache=ttl_dns_cache > 0,
+            ttl_dns_cache=ttl_dns_cache or None,
+        )
+        self.method_timeouts = method_timeouts or {}
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[TelegramType],
+                           timeout: Optional[int] = None) -> TelegramType:
+        # An explicit timeout (e.g. long polling in getUpdates) wins over the configured one
+        if timeout is None:
+            timeout = self.method_timeouts.get(method.__api_method__)
+        return await super().make_request(bot, method, timeout)
+
+
+def parse_method_timeouts(value: str) -> dict[str, float]:
+    """"sendMessage=5,editMessageText=5" -> {"sendMessage": 5.0, "editMessageText": 5.0}"""
+    timeouts = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        method, timeout = item.split("=")
+        timeouts[method.strip()] = float(timeout)
+    return timeouts
+
+
+def create_session() -> TunedSession:
+    """
+    Builds the Bot session from environment variables.
+    BOT_API_URL points it to a self-hosted Bot API server (or a fake one in load tests).
+    """
+    api = PRODUCTION
+    if os.getenv("BOT_API_URL"):
+        api = TelegramAPIServer.from_base(
+            os.environ["BOT_API_URL"], is_local=os.getenv("BOT_API_LOCAL", "false").lower() in ("1", "true", "yes")
+        )
+    return TunedSession(
+        api=api,
+        limit=int(os.getenv("HTTP_POOL_SIZE", 100)),
+        limit_per_host=int(os.getenv("HTTP_POOL_PER_HOST", 0)),
+        keepalive_timeout=float(os.getenv("HTTP_KEEPALIVE", 60)),
+        ttl_dns_cache=int(os.getenv("HTTP_DNS_TTL", 3600)),
+        timeout=float(os.getenv("HTTP_TIMEOUT", 60)),
+        method_timeouts=parse_method_timeouts(os.getenv("HTTP_METHOD_TIMEOUTS", "")),
+    )
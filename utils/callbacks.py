@@ -0,0 +1,57 @@
+import hashlib
+import logging
+from typing import Iterable, Optional
+
+from aiogram.filters.callback_data import CallbackData
+
+logger = logging.getLogger(__name__)
+
+
+def dict_id(dict_name: str) -> int:
+    """
+    Short stable id of a dictionary name, so the name itself never goes into callback data.
+    64 bits: crc32 of two different names could be equal, e.g. "plumless" and "buckeroo".
+    """
+    return int.from_bytes(hashlib.blake2b(dict_name.encode(), digest_size=8).digest(), "big")
+
+
+def find_dict_name(names: Iterable[str], id: int) -> Optional[str]:
+    """
+    A user has at most 10 dictionaries, so the lookup is a scan over their names.
+    None if no name or more than one name has this id: a button must never open the wrong dictionary.
+    """
+    found = [name for name in names if dict_id(name) == id]
+    if len(found) > 1:
+        logger.error("Dictionary id %s matches %s names", id, len(found))
+        return None
+    return found[0] if found else None
+
+
+class DictCallback(CallbackData, prefix="dict"):
+    """action: view, confirm_delete, delete or test"""
+
+    action: str
+    id: int
+
+    @classmethod
+    def of(cls, action: str, dict_name: str) -> str:
+        return cls(action=action, id=dict_id(dict_name)).pack()
+
+
+class TestCallback(CallbackData, prefix="test"):
+    id: int
+    reversed: bool
+
+
+class AnswerCallback(CallbackData, prefix="ans"):
+    """
+    Index of the chosen option in FSM data; the right answer stays on the server.
+    question rejects taps on buttons of an earlier question.
+    """
+
+    question: int
+    option: int
+
+
+class LanguageCallback(CallbackData, prefix="lang"):
+    index: int
@@ -0,0 +1,82 @@
+import random
+from collections import Counter, OrderedDict
+from typing import Iterable, Optional
+
+PREFIX_LENGTH = 2
+
+
+class DistractorSampler:
+    """
+    Wrong answer options for one dictionary and test direction.
+    Built once per session; every draw takes constant expected time
+    (rejection sampling over a list, so nothing is copied per question).
+    "Hard" options are taken first: answers the user already confused
+    with the right one, then answers with the same prefix or the same length.
+    """
+
+    def __init__(self, answers: Iterable[str], size: int = 0, version: int = 0):
+        self.answers = list(dict.fromkeys(answers))
+        # Number of word pairs and page cache version of the dictionary the sampler was built from,
+        # used to notice changed dictionaries
+        self.size = size or len(self.answers)
+        self.version = version
+        self.confusions: dict[str, Counter] = {}
+        self._by_prefix: dict[str, list[str]] = {}
+        self._by_length: dict[int, list[str]] = {}
+        for answer in self.answers:
+            self._by_prefix.setdefault(answer[:PREFIX_LENGTH], []).append(answer)
+            self._by_length.setdefault(len(answer), []).append(answer)
+
+    def __len__(self):
+        return len(self.answers)
+
+    def confuse(self, right: str, chosen: str):
+        """Remembers a wrong choice, so it is offered again for the same word"""
+        if chosen != right:
+            self.confusions.setdefault(right, Counter())[chosen] += 1
+
+    def sample(self, right: str, k: int = 4, hard: int = 2) -> list[str]:
+        """k unique answers different from right, up to hard of them similar to it"""
+        if len(self.answers) - 1 <= k:
+            return [answer for answer in self.answers if answer != right]
+
+        chosen = {}
+        for answer, _ in self.confusions.get(right, Counter()).most_common(hard):
+            chosen[answer] = None
+
+        for bucket in (self._by_prefix.get(right[:PREFIX_LENGTH], ()), self._by_length.get(len(right), ())):
+            # A few tries per bucket: small buckets may hold only the right answer
+            for _ in range(2 * hard):
+                if len(chosen) >= hard or len(bucket) < 2:
+                    break
+                answer = random.choice(bucket)
+                if answer != right:
+                    chosen[answer] = None
+
+        while len(chosen) < k:
+            answer = random.choice(self.answers)
+            if answer != right:
+                chosen[answer] = None
+        return list(chosen)
+
+
+class DistractorCache:
+    """LRU of samplers keyed by (telegram_id, dict_name, is_reversed)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, str, bool], DistractorSampler] = OrderedDict()
+
+    def get(self, telegram_id: int, dict_name: str, is_reversed: bool) -> Optional[DistractorSampler]:
+        sampler = self._entries.get((telegram_id, dict_name, is_reversed))
+        if sampler is not None:
+            self._entries.move_to_end((telegram_id, dict_name, is_reversed))
+        return sampler
+
+    def set(self, telegram_id: int, dict_name: str, is_reversed: bool, sampler: DistractorSampler):
+        if self.max_entries <= 0:
+            return
+        self._entries[(telegram_id, dict_name, is_reversed)] = sampler
+        self._entries.move_to_end((telegram_id, dict_name, is_reversed))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from utils.metrics import metrics, timed
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    Persistent FSM storage in a local SQLite file.
+    Redis-compatible stand-in for tests and single-host deployments.
+    """
+
+    def __init__(self, path: str = "fsm.sqlite3", key_builder: Optional[KeyBuilder] = None):
+        self.key_builder = key_builder or DefaultKeyBuilder()
+        self._lock = asyncio.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm (key TEXT PRIMARY KEY, state TEXT, data TEXT)"
+        )
+
+    async def _run(self, query: str, *params: Any) -> Optional[tuple]:
+        async with self._lock:
+            return await asyncio.to_thread(lambda: self._conn.execute(query, params).fetchone())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        if isinstance(state, State):
+            state = state.state
+        await self._run(
+            "INSERT INTO fsm (key, state) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET state = excluded.state",
+            self.key_builder.build(key), state,
+        )
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._run("SELECT state FROM fsm WHERE key = ?", self.key_builder.build(key))
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        await self._run(
+            "INSERT INTO fsm (key, data) VALUES (?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET data = excluded.data",
+            self.key_builder.build(key), json.dumps(dict(data)) if data else None,
+        )
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._run("SELECT data FROM fsm WHERE key = ?", self.key_builder.build(key))
+        return json.loads(row[0]) if row and row[0] else {}
+
+    async def close(self) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._conn.close)
+
+
+class TimedStorage(BaseStorage):
+    """Wraps another storage and records the time of every call in metrics"""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        with timed(metrics.observe_fsm, "set_state"):
+            await self.storage.set_state(key, state)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        with timed(metrics.observe_fsm, "get_state"):
+            return await self.storage.get_state(key)
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        with timed(metrics.observe_fsm, "set_data"):
+            await self.storage.set_data(key, data)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        with timed(metrics.observe_fsm, "get_data"):
+            return await self.storage.get_data(key)
+
+    async def close(self) -> None:
+        await self.storage.close()
+
+
+def create_storage() -> BaseStorage:
+    """
+    Builds the FSM storage selected by FSM_STORAGE: memory (default), redis or sqlite.
+    """
+    backend = os.getenv("FSM_STORAGE", "memory").lower()
+
+    if backend == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError as e:
+            raise RuntimeError("FSM_STORAGE=redis requires the 'redis' package") from e
+        return RedisStorage.from_url(
+            os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0"),
+            state_ttl=int(os.getenv("FSM_TTL", 0)) or None,
+            data_ttl=int(os.getenv("FSM_TTL", 0)) or None,
+        )
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("FSM_SQLITE_PATH", "fsm.sqlite3"))
+    if backend == "memory":
+        return MemoryStorage()
+
+    raise ValueError(f"Unknown FSM_STORAGE backend: {backend}")
@@ -0,0 +1,215 @@
+import cProfile
+import logging
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket..., +Inf count, sum]
+        self._series: dict[tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+class UpdateStats:
+    """Time spent by one update outside of the handler code itself"""
+
+    __slots__ = ("db_queries", "db_time", "api_calls", "api_time", "fsm_time")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.api_calls = 0
+        self.api_time = 0.0
+        self.fsm_time = 0.0
+
+
+current_update: ContextVar[Optional[UpdateStats]] = ContextVar("current_update", default=None)
+
+
+class Metrics:
+    """
+    Process-wide metrics with a Prometheus text exporter.
+    Collectors are callables returning {name: value}; they are rendered as gauges
+    (pool, cache and rate limiter stats).
+    """
+
+    def __init__(self):
+        self.update_seconds = Histogram("bot_update_seconds", "Update processing time", ("event",))
+        self.handler_seconds = Histogram("bot_handler_seconds", "Handler latency", ("handler",))
+        self.db_query_seconds = Histogram("bot_db_query_seconds", "Database query time", ("query",))
+        self.api_seconds = Histogram("bot_api_call_seconds", "Bot API call time", ("method",))
+        self.fsm_seconds = Histogram("bot_fsm_storage_seconds", "FSM storage call time", ("operation",))
+        self.update_db_queries = Histogram(
+            "bot_update_db_queries", "Database queries per update", buckets=COUNT_BUCKETS
+        )
+        self.update_db_seconds = Histogram("bot_update_db_seconds", "Database time per update")
+        self.update_api_seconds = Histogram("bot_update_api_seconds", "Bot API time per update")
+        self.update_fsm_seconds = Histogram("bot_update_fsm_seconds", "FSM storage time per update")
+        self.histograms = [
+            self.update_seconds, self.handler_seconds, self.db_query_seconds, self.api_seconds,
+            self.fsm_seconds, self.update_db_queries, self.update_db_seconds, self.update_api_seconds,
+            self.update_fsm_seconds,
+        ]
+        self.collectors: dict[str, Callable[[], dict]] = {}
+
+    def observe_db(self, query: str, elapsed: float):
+        self.db_query_seconds.observe(elapsed, query)
+        stats = current_update.get()
+        if stats is not None:
+            stats.db_queries += 1
+            stats.db_time += elapsed
+
+    def observe_api(self, method: str, elapsed: float):
+        self.api_seconds.observe(elapsed, method)
+        stats = current_update.get()
+        if stats is not None:
+            stats.api_calls += 1
+            stats.api_time += elapsed
+
+    def observe_fsm(self, operation: str, elapsed: float):
+        self.fsm_seconds.observe(elapsed, operation)
+        stats = current_update.get()
+        if stats is not None:
+            stats.fsm_time += elapsed
+
+    def observe_update(self, event: str, elapsed: float, stats: UpdateStats):
+        self.update_seconds.observe(elapsed, event)
+        self.update_db_queries.observe(stats.db_queries)
+        self.update_db_seconds.observe(stats.db_time)
+        self.update_api_seconds.observe(stats.api_time)
+        self.update_fsm_seconds.observe(stats.fsm_time)
+
+    def collector(self, prefix: str, collect: Callable[[], dict]):
+        self.collectors[prefix] = collect
+
+    def render(self) -> str:
+        lines = []
+        for histogram in self.histograms:
+            lines.extend(histogram.render())
+        for prefix, collect in self.collectors.items():
+            for name, value in collect().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{name} gauge")
+                    lines.append(f"{prefix}_{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def timed(observe: Callable[[str, float], None], name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - started)
+
+
+class SamplingProfiler:
+    """
+    Opt-in profiler: runs cProfile for a random `rate` share of updates,
+    one update at a time, and accumulates the results in a pstats file.
+    Awaits inside a sampled update also profile whatever other tasks run meanwhile,
+    so the numbers are a statistical picture rather than an exact per-handler cost.
+    """
+
+    def __init__(self, rate: float, path: str = "profile.pstats"):
+        self.rate = rate
+        self.path = path
+        self.samples = 0
+        self._stats: Optional[pstats.Stats] = None
+        self._busy = threading.Lock()
+
+    @contextmanager
+    def sample(self):
+        if random.random() >= self.rate or not self._busy.acquire(blocking=False):
+            yield
+            return
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._busy.release()
+            self.samples += 1
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def dump(self):
+        if self._stats is not None:
+            self._stats.dump_stats(self.path)
+            logger.info("Profile of %s updates saved to %s.", self.samples, self.path)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Serves /metrics on its own port, independent of polling or webhook mode"""
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Metrics exported on %s:%s/metrics.", host, port)
+    return runner
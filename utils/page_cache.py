@@ -0,0 +1,63 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class PageCache:
+    """
+    LRU of rendered pages keyed by (telegram_id, dict_name, page, version).
+    Every mutation of a dictionary bumps its version, so pages rendered
+    before it are never served again and simply age out of the LRU.
+    Versions are local to the process, so pages also expire after `ttl` seconds:
+    that bounds how long changes made by other replicas or the maintenance CLI stay unseen.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_versions: int = 4096, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.max_versions = max_versions
+        self.ttl = ttl
+        # (telegram_id, dict_name, page, version) -> (expires_at, rendered)
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._versions: OrderedDict[tuple[int, str], int] = OrderedDict()
+        self._counter = 0
+        # Version of dictionaries without their own counter; raised when a counter is evicted,
+        # so a forgotten dictionary can't fall back to a version its old pages were stored with
+        self._floor = 0
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, telegram_id: int, dict_name: str) -> int:
+        return self._versions.get((telegram_id, dict_name), self._floor)
+
+    def bump(self, telegram_id: int, dict_name: str):
+        self._counter += 1
+        self._versions[(telegram_id, dict_name)] = self._counter
+        self._versions.move_to_end((telegram_id, dict_name))
+        while len(self._versions) > self.max_versions:
+            self._versions.popitem(last=False)
+            self._floor = self._counter
+
+    def get(self, telegram_id: int, dict_name: str, page: Hashable) -> Optional[Any]:
+        key = (telegram_id, dict_name, page, self.version(telegram_id, dict_name))
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, telegram_id: int, dict_name: str, page: Hashable, version: int, rendered: Any):
+        """version is the one read before rendering; a page that raced with a mutation is dropped"""
+        if self.max_entries <= 0 or self.ttl <= 0 or version != self.version(telegram_id, dict_name):
+            return
+        key = (telegram_id, dict_name, page, version)
+        self._entries[key] = (time.monotonic() + self.ttl, rendered)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
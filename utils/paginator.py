@@ -1,4 +1,5 @@
 import math
+from abc import ABC, abstractmethod
 
 class Paginator:
     def __init__(self, array: list | tuple, page: int=1, per_page: int=1):
@@ -37,4 +38,120 @@ class Paginator:
         if self.page > 1:
             self.page -= 1
             return self.__get_slice()
-        raise IndexError(f'Previous page does not exist. Use has_previous() to check before.')
\ No newline at end of file
+        raise IndexError(f'Previous page does not exist. Use has_previous() to check before.')
+
+class PageSource(ABC):
+    """
+    Lazy data source for AsyncPaginator.
+    Rows are returned as (key, item) pairs ordered by a unique, increasing key.
+    """
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def slice(self, offset: int, limit: int) -> list:
+        ...
+
+    @abstractmethod
+    async def after(self, key, limit: int) -> list:
+        """First `limit` rows with a key greater than `key`"""
+
+    @abstractmethod
+    async def before(self, key, limit: int) -> list:
+        """Last `limit` rows with a key less than `key`, in ascending order"""
+
+
+class SequenceSource(PageSource):
+    def __init__(self, array: list | tuple):
+        self.array = array
+
+    async def count(self):
+        return len(self.array)
+
+    async def slice(self, offset, limit):
+        return list(enumerate(self.array[offset:offset + limit], start=offset))
+
+    async def after(self, key, limit):
+        return await self.slice(key + 1, limit)
+
+    async def before(self, key, limit):
+        start = max(0, key - limit)
+        return await self.slice(start, key - start)
+
+
+class AsyncPaginator:
+    """
+    Paginator over a PageSource that fetches only the visible page.
+    Neighbour pages are loaded by key (keyset pagination) when the keys of the
+    current page are known, so page N costs the same as page 1.
+    Pages are lists of (number, item), numbered from 0 across the whole source.
+    """
+
+    def __init__(self, source: PageSource, page: int = 1, per_page: int = 1,
+                 first_key=None, last_key=None, total: int | None = None):
+        self.source = source
+        self.page = page
+        self.per_page = per_page
+        self.first_key = first_key
+        self.last_key = last_key
+        self.total = total
+
+    async def get_len(self) -> int:
+        if self.total is None:
+            self.total = await self.source.count()
+        return self.total
+
+    async def get_pages(self) -> int:
+        return math.ceil(await self.get_len() / self.per_page)
+
+    def __number(self, rows):
+        if rows:
+            self.first_key, self.last_key = rows[0][0], rows[-1][0]
+        start = (self.page - 1) * self.per_page
+        return [(start + i, item) for i, (_, item) in enumerate(rows)]
+
+    async def get_page(self):
+        rows = await self.source.slice((self.page - 1) * self.per_page, self.per_page)
+        return self.__number(rows)
+
+    async def has_next(self):
+        if self.page < await self.get_pages():
+            return self.page + 1
+        return False
+
+    async def has_previous(self):
+        if self.page > 1:
+            return self.page - 1
+        return False
+
+    async def get_next(self):
+        if self.page >= await self.get_pages():
+            raise IndexError(f'Next page does not exist. Use has_next() to check before.')
+        if self.last_key is None:
+            self.page += 1
+            return await self.get_page()
+        rows = await self.source.after(self.last_key, self.per_page)
+        if not rows:
+            raise IndexError(f'Next page does not exist. Use has_next() to check before.')
+        self.page += 1
+        return self.__number(rows)
+
+    async def get_previous(self):
+        if self.page <= 1:
+            raise IndexError(f'Previous page does not exist. Use has_previous() to check before.')
+        self.page -= 1
+        if self.first_key is None:
+            return await self.get_page()
+        rows = await self.source.before(self.first_key, self.per_page)
+        return self.__number(rows)
+
+    def state(self) -> dict:
+        """Everything needed to restore the paginator on the next request (e.g. in FSM data)"""
+        return {
+            "page": self.page,
+            "first_key": self.first_key,
+            "last_key": self.last_key,
+            "total": self.total,
+        }
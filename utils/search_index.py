@@ -0,0 +1,179 @@
+import time
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from typing import Iterable, Optional
+
+
+def trigrams(term: str) -> set[str]:
+    """Trigrams of a term padded the same way as pg_trgm does"""
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DictionarySearchIndex:
+    """
+    Search index over the pairs of one dictionary:
+    exact lookup in both directions, prefix search and typo-tolerant (trigram) search.
+    Updated incrementally, so it mirrors the dictionary without being rebuilt.
+    """
+
+    def __init__(self, pairs: Iterable[tuple[str, str]] = ()):
+        self.forward: dict[str, str] = {}
+        self.reverse: dict[str, list[str]] = {}
+        self._terms: list[str] = []
+        self._refs: Counter = Counter()
+        self._trigrams: dict[str, set[str]] = {}
+        for word, translation in pairs:
+            self.add(word, translation)
+
+    def __len__(self):
+        return len(self.forward)
+
+    # ---------------------- UPDATES ----------------------
+
+    def add(self, word: str, translation: str):
+        if word in self.forward:
+            self.remove(word)
+        self.forward[word] = translation
+        self.reverse.setdefault(translation, []).append(word)
+        self._add_term(word)
+        self._add_term(translation)
+
+    def remove(self, word: str) -> Optional[str]:
+        translation = self.forward.pop(word, None)
+        if translation is None:
+            return None
+        words = self.reverse[translation]
+        words.remove(word)
+        if not words:
+            del self.reverse[translation]
+        self._drop_term(word)
+        self._drop_term(translation)
+        return translation
+
+    def edit(self, word: str, new_value: str) -> bool:
+        """
+        Renames a word, as Database.edit_word_in_dict does when the word is a key.
+        A changed translation is not applied: the database changes the oldest pair with it,
+        and the index doesn't know pair ids, so False tells the caller to rebuild the index.
+        """
+        if word not in self.forward:
+            return False
+        self.add(new_value, self.remove(word))
+        return True
+
+    def _add_term(self, term: str):
+        self._refs[term] += 1
+        if self._refs[term] > 1:
+            return
+        insort(self._terms, term)
+        for trigram in trigrams(term):
+            self._trigrams.setdefault(trigram, set()).add(term)
+
+    def _drop_term(self, term: str):
+        self._refs[term] -= 1
+        if self._refs[term] > 0:
+            return
+        del self._refs[term]
+        del self._terms[bisect_left(self._terms, term)]
+        for trigram in trigrams(term):
+            terms = self._trigrams[trigram]
+            terms.discard(term)
+            if not terms:
+                del self._trigrams[trigram]
+
+    # ---------------------- SEARCH ----------------------
+
+    def pairs(self, term: str) -> list[tuple[str, str]]:
+        """All pairs where the term is the word or the translation"""
+        found = []
+        if term in self.forward:
+            found.append((term, self.forward[term]))
+        found.extend((word, term) for word in self.reverse.get(term, ()) if word != term)
+        return found
+
+    def lookup(self, term: str) -> Optional[tuple[str, str]]:
+        """Exact match; a word wins over a translation"""
+        if term in self.forward:
+            return term, self.forward[term]
+        if term in self.reverse:
+            word = self.reverse[term][0]
+            return word, term
+        return None
+
+    def prefix(self, prefix: str, limit: int = 50) -> list[tuple[str, str]]:
+        found = []
+        i = bisect_left(self._terms, prefix)
+        while i < len(self._terms) and self._terms[i].startswith(prefix) and len(found) < limit:
+            found.extend(self.pairs(self._terms[i]))
+            i += 1
+        return found[:limit]
+
+    def fuzzy(self, term: str, limit: int = 50, threshold: float = 0.3) -> list[tuple[str, str]]:
+        query = trigrams(term)
+        common = Counter()
+        for trigram in query:
+            common.update(self._trigrams.get(trigram, ()))
+
+        scored = []
+        for candidate, shared in common.items():
+            similarity = shared / (len(query) + len(trigrams(candidate)) - shared)
+            if similarity >= threshold:
+                scored.append((similarity, candidate))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        found = []
+        for _, candidate in scored:
+            found.extend(self.pairs(candidate))
+            if len(found) >= limit:
+                break
+        return found[:limit]
+
+    def search(self, term: str, limit: int = 100) -> list[tuple[str, str]]:
+        """Exact matches first, then words starting with the term, then similar words"""
+        results = {}
+        for word, translation in self.pairs(term) + self.prefix(term, limit) + self.fuzzy(term, limit):
+            results.setdefault(word, translation)
+            if len(results) >= limit:
+                break
+        return list(results.items())
+
+
+class SearchIndexCache:
+    """
+    LRU of search indexes keyed by (telegram_id, dict_name).
+    Mutations of this process update the indexes in place; the TTL bounds how long
+    changes made by other processes (replicas, the maintenance CLI) stay invisible.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (telegram_id, dict_name) -> (expires_at, index)
+        self._entries: OrderedDict[tuple[int, str], tuple[float, DictionarySearchIndex]] = OrderedDict()
+
+    def get(self, telegram_id: int, dict_name: str) -> Optional[DictionarySearchIndex]:
+        entry = self._entries.get((telegram_id, dict_name))
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[(telegram_id, dict_name)]
+            return None
+        self._entries.move_to_end((telegram_id, dict_name))
+        return entry[1]
+
+    def set(self, telegram_id: int, dict_name: str, index: DictionarySearchIndex,
+            version: Optional[int] = None, current_version: Optional[int] = None):
+        """
+        version is the dictionary version read before building the index, current_version
+        the one after; an index that raced with a mutation missed it and is dropped
+        """
+        if version != current_version or self.max_entries <= 0 or self.ttl <= 0:
+            return
+        self._entries[(telegram_id, dict_name)] = (time.monotonic() + self.ttl, index)
+        self._entries.move_to_end((telegram_id, dict_name))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int, dict_name: str):
+        self._entries.pop((telegram_id, dict_name), None)
@@ -0,0 +1,245 @@
+import asyncio
+import json
+import logging
+import multiprocessing as mp
+import os
+import queue
+import secrets
+import signal
+import time
+from typing import Callable, Optional
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+from utils.webhook import health
+
+logger = logging.getLogger(__name__)
+
+# Builds a worker's bot and dispatcher; must be a module-level function so that it pickles
+AppFactory = Callable[[], tuple[Bot, Dispatcher]]
+
+
+def update_user_id(update: dict) -> int:
+    """
+    Returns the id of the user who sent the update.
+    Updates without a sender (e.g. polls) are spread by update_id.
+    """
+    for value in update.values():
+        if isinstance(value, dict):
+            sender = value.get("from") or value.get("user")
+            if isinstance(sender, dict) and "id" in sender:
+                return sender["id"]
+    return update["update_id"]
+
+
+async def _process_updates(updates: "mp.Queue", app_factory: AppFactory, max_concurrency: int):
+    # Every worker builds its own bot, dispatcher and asyncpg pool
+    bot, dp = app_factory()
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+    loop = asyncio.get_running_loop()
+    # user_id -> last task of this user; a new update waits for it to keep FSM order
+    user_tails: dict[int, asyncio.Task] = {}
+    # Updates are taken off the queue only while there is room, so a busy worker
+    # leaves them in the bounded queue and the supervisor feels the backpressure
+    in_flight = asyncio.Semaphore(max_concurrency)
+
+    async def feed(update: dict, previous: Optional[asyncio.Task]):
+        if previous is not None:
+            await asyncio.wait([previous])
+        await dp.feed_raw_update(bot, update)
+
+    def done(user_id: int, task: asyncio.Task):
+        in_flight.release()
+        if user_tails.get(user_id) is task:
+            del user_tails[user_id]
+
+    try:
+        while True:
+            await in_flight.acquire()
+            raw = await loop.run_in_executor(None, updates.get)
+            if raw is None:
+                break
+            update = json.loads(raw)
+            user_id = update_user_id(update)
+            task = asyncio.create_task(feed(update, user_tails.get(user_id)))
+            user_tails[user_id] = task
+            task.add_done_callback(lambda t, uid=user_id: done(uid, t))
+
+        if user_tails:
+            await asyncio.wait(list(user_tails.values()))
+    finally:
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+
+
+def _worker_main(index: int, updates: "mp.Queue", app_factory: AppFactory, max_concurrency: int):
+    # The supervisor handles Ctrl+C and stops workers with a sentinel
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Lets per-process resources (e.g. the metrics port) differ between workers
+    os.environ["WORKER_INDEX"] = str(index)
+    logger.info("Worker %s started.", index)
+    asyncio.run(_process_updates(updates, app_factory, max_concurrency))
+
+
+class ShardedRunner:
+    """
+    Supervisor that partitions updates by sender across worker processes.
+    All updates of one user go to the same worker and are handled there in order,
+    so FSM state stays consistent. Each worker handles at most `max_concurrency` updates at a time.
+    Crashed workers are restarted on a fresh queue, since a worker killed while reading
+    may leave the old one locked; updates still waiting in the old queue are moved over.
+    Updates the crashed worker had already taken are lost.
+    """
+
+    def __init__(self, workers: int, app_factory: AppFactory, queue_size: int = 1000,
+                 max_concurrency: int = 100, restart_delay: float = 1.0):
+        self.ctx = mp.get_context("spawn")
+        self.app_factory = app_factory
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queues = [self.ctx.Queue(queue_size) for _ in range(workers)]
+        self.processes: list[Optional[mp.Process]] = [None] * workers
+        self.restart_delay = restart_delay
+        self.restarts = 0
+        self._stopping = False
+
+    def _start_worker(self, index: int):
+        process = self.ctx.Process(
+            target=_worker_main,
+            args=(index, self.queues[index], self.app_factory, self.max_concurrency),
+            name=f"bot-worker-{index}", daemon=False
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        for index in range(len(self.processes)):
+            self._start_worker(index)
+
+    async def supervise(self):
+        while not self._stopping:
+            for index, process in enumerate(self.processes):
+                if process is not None and not process.is_alive() and not self._stopping:
+                    logger.error("Worker %s exited with code %s, restarting.", index, process.exitcode)
+                    self.restarts += 1
+                    await asyncio.sleep(self.restart_delay)
+                    moved = await asyncio.get_running_loop().run_in_executor(None, self._replace_queue, index)
+                    if moved:
+                        logger.info("Moved %s queued updates to the new queue of worker %s.", moved, index)
+                    self._start_worker(index)
+            await asyncio.sleep(1)
+
+    def _replace_queue(self, index: int, timeout: float = 0.1) -> int:
+        """
+        Gives a worker a new queue and moves over what can still be read from the old one.
+        Reads time out instead of blocking, in case the dead worker left the old queue locked.
+        """
+        old = self.queues[index]
+        self.queues[index] = self.ctx.Queue(self.queue_size)
+        moved = 0
+        while True:
+            try:
+                raw = old.get(timeout=timeout)
+            except (queue.Empty, OSError, EOFError):
+                break
+            try:
+                self.queues[index].put_nowait(raw)
+            except queue.Full:
+                logger.warning("Queue of worker %s is full, dropping a moved update.", index)
+                continue
+            moved += 1
+        old.close()
+        old.cancel_join_thread()
+        return moved
+
+    async def dispatch(self, update: dict):
+        """Routes a raw update to its worker; waits if the worker queue is full"""
+        shard = self.queues[update_user_id(update) % len(self.queues)]
+        raw = json.dumps(update)
+        try:
+            shard.put_nowait(raw)
+        except queue.Full:
+            await asyncio.get_running_loop().run_in_executor(None, shard.put, raw)
+
+    def stop(self, timeout: float = 30):
+        """Lets workers finish queued updates, then terminates the stragglers"""
+        self._stopping = True
+        for shard in self.queues:
+            shard.put(None)
+        deadline = time.monotonic() + timeout
+        for process in self.processes:
+            if process is not None:
+                process.join(max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.terminate()
+
+    async def run_polling(self, bot: Bot, allowed_updates: list[str], drop_pending_updates: bool = False,
+                          polling_timeout: int = 10):
+        await bot.delete_webhook(drop_pending_updates=drop_pending_updates)
+        self.start()
+        supervisor = asyncio.create_task(self.supervise())
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+
+        offset = None
+        stopped = asyncio.create_task(stop.wait())
+        try:
+            while not stop.is_set():
+                poll = asyncio.create_task(
+                    bot.get_updates(offset=offset, timeout=polling_timeout, allowed_updates=allowed_updates)
+                )
+                await asyncio.wait([poll, stopped], return_when=asyncio.FIRST_COMPLETED)
+                if not poll.done():
+                    poll.cancel()
+                    break
+                try:
+                    updates = poll.result()
+                except Exception as e:
+                    logger.error("Polling error: %s", e)
+                    await asyncio.sleep(1)
+                    continue
+                for update in updates:
+                    await self.dispatch(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+                    offset = update.update_id + 1
+        finally:
+            stopped.cancel()
+            supervisor.cancel()
+            await loop.run_in_executor(None, self.stop)
+            await bot.session.close()
+
+    def run_webhook(self, bot: Bot, *, base_url: str, path: str = "/webhook", host: str = "0.0.0.0",
+                    port: int = 8080, secret: Optional[str] = None, allowed_updates: Optional[list[str]] = None,
+                    drop_pending_updates: bool = False, max_connections: int = 40):
+        async def handle(request: web.Request) -> web.Response:
+            token = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+            if secret and not secrets.compare_digest(token, secret):
+                return web.Response(status=401, text="Unauthorized")
+            await self.dispatch(await request.json())
+            return web.json_response({})
+
+        async def on_startup(app: web.Application):
+            self.start()
+            app["supervisor"] = asyncio.create_task(self.supervise())
+            await bot.set_webhook(
+                f"{base_url.rstrip('/')}{path}",
+                secret_token=secret,
+                drop_pending_updates=drop_pending_updates,
+                allowed_updates=allowed_updates,
+                max_connections=max_connections,
+            )
+
+        async def on_shutdown(app: web.Application):
+            app["supervisor"].cancel()
+            await asyncio.get_running_loop().run_in_executor(None, self.stop)
+            await bot.session.close()
+
+        app = web.Application()
+        app.router.add_post(path, handle)
+        app.router.add_get("/health", health)
+        app.on_startup.append(on_startup)
+        app.on_shutdown.append(on_shutdown)
+        web.run_app(app, host=host, port=port)
@@ -0,0 +1,60 @@
+import heapq
+import time
+from typing import NamedTuple, Optional
+
+DAY = 24 * 60 * 60
+# A forgotten word comes back in the same session after this delay
+RELEARN_DELAY = 60
+
+
+class ReviewState(NamedTuple):
+    """SM-2 state of one word in one test direction; a plain tuple, so it fits into FSM data"""
+
+    easiness: float = 2.5
+    interval: float = 0.0
+    repetitions: int = 0
+
+
+def review(state: ReviewState, quality: int) -> ReviewState:
+    """
+    SM-2 step. quality is 0..5, anything below 3 counts as forgotten:
+    the word starts over, while its easiness still goes down.
+    """
+    easiness = max(1.3, state.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    if quality < 3:
+        return ReviewState(easiness, 0.0, 0)
+    if state.repetitions == 0:
+        interval = 1.0
+    elif state.repetitions == 1:
+        interval = 6.0
+    else:
+        interval = round(state.interval * state.easiness, 2)
+    return ReviewState(easiness, interval, state.repetitions + 1)
+
+
+def next_due(state: ReviewState, now: Optional[float] = None) -> float:
+    """Timestamp of the next review"""
+    now = time.time() if now is None else now
+    return now + (state.interval * DAY if state.interval else RELEARN_DELAY)
+
+
+class ReviewQueue:
+    """
+    Min-heap of [due_at, word_id] for one test session.
+    The heap is a plain list, so it is stored in FSM data as is.
+    """
+
+    def __init__(self, heap: Optional[list] = None):
+        self.heap = heap if heap is not None else []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, word_id: int, due_at: float = 0.0):
+        heapq.heappush(self.heap, [due_at, word_id])
+
+    def pop(self, now: Optional[float] = None) -> Optional[int]:
+        """Earliest word; with now given, only if it is already due"""
+        if not self.heap or (now is not None and self.heap[0][0] > now):
+            return None
+        return heapq.heappop(self.heap)[1]
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook handler that answers Telegram right away and processes updates in background,
+    with at most max_concurrency updates in flight. When the limit is reached the request
+    waits, so Telegram slows down instead of the process piling up tasks.
+    On shutdown it waits for in-flight updates before closing the bot session.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, max_concurrency: int = 100,
+                 drain_timeout: float = 30, **kwargs: Any):
+        super().__init__(dispatcher=dispatcher, bot=bot, handle_in_background=True, **kwargs)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.drain_timeout = drain_timeout
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self._semaphore.acquire()
+        try:
+            update = await request.json(loads=bot.session.json_loads)
+        except Exception:
+            self._semaphore.release()
+            raise
+
+        task = asyncio.create_task(self._background_feed_update(bot=bot, update=update))
+        self._background_feed_update_tasks.add(task)
+        task.add_done_callback(self._background_feed_update_tasks.discard)
+        task.add_done_callback(lambda _: self._semaphore.release())
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    async def drain(self):
+        tasks = set(self._background_feed_update_tasks)
+        if tasks:
+            logger.info("Waiting for %s updates to finish...", len(tasks))
+            await asyncio.wait(tasks, timeout=self.drain_timeout)
+
+    async def close(self) -> None:
+        await self.drain()
+        await super().close()
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def run_webhook(dp: Dispatcher, bot: Bot, *, base_url: str, path: str = "/webhook",
+                host: str = "0.0.0.0", port: int = 8080, secret: Optional[str] = None,
+                drop_pending_updates: bool = False, max_concurrency: int = 100,
+                max_connections: int = 40, drain_timeout: float = 30):
+    """
+    Serves updates through an aiohttp app. Several replicas can run behind a load
+    balancer: every replica sets the same webhook URL and none of them removes it.
+    """
+
+    async def set_webhook():
+        await bot.set_webhook(
+            f"{base_url.rstrip('/')}{path}",
+            secret_token=secret,
+            drop_pending_updates=drop_pending_updates,
+            allowed_updates=dp.resolve_used_update_types(),
+            max_connections=max_connections,
+        )
+
+    dp.startup.register(set_webhook)
+
+    app = web.Application()
+    app.router.add_get("/health", health)
+    # The handler must be registered first: its shutdown drains updates before dp shutdown
+    BoundedRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        max_concurrency=max_concurrency,
+        drain_timeout=drain_timeout,
+        secret_token=secret,
+    ).register(app, path=path)
+    setup_application(app, dp, bot=bot)
+
+    web.run_app(app, host=host, port=port, shutdown_timeout=drain_timeout)
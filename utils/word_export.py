@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+import zlib
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Optional
+
+from aiogram import Bot
+from aiogram.types.input_file import DEFAULT_CHUNK_SIZE, InputFile
+
+# (dict_name, word, translation); word is None for an empty dictionary
+Rows = AsyncIterator[tuple[str, Optional[str], Optional[str]]]
+
+FORMATS = ("csv", "json")
+
+
+async def csv_chunks(rows: Rows, chunk_size: int) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(("dictionary", "word", "translation"))
+    async for dict_name, word, translation in rows:
+        if word is None:
+            continue
+        writer.writerow((dict_name, word, translation))
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def json_chunks(rows: Rows, chunk_size: int) -> AsyncIterator[str]:
+    """{"dictionary": {"word": "translation", ...}, ...}; rows come grouped by dictionary"""
+    parts = ["{"]
+    size = 1
+    current = None
+    async for dict_name, word, translation in rows:
+        if dict_name != current:
+            part = ("}, " if current is not None else "") + json.dumps(dict_name, ensure_ascii=False) + ": {"
+            current = dict_name
+            first = True
+        else:
+            part = ""
+        if word is not None:
+            part += ("" if first else ", ") + json.dumps(word, ensure_ascii=False) + ": " \
+                + json.dumps(translation, ensure_ascii=False)
+            first = False
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(parts)
+            parts, size = [], 0
+    parts.append("}}" if current is not None else "}")
+    yield "".join(parts)
+
+
+class ExportFile(InputFile):
+    """
+    Upload that is rendered while it is being sent: aiohttp pulls chunks from read(),
+    read() pulls rows from the database cursor, so only one chunk and one cursor prefetch
+    are held in memory and a slow upload slows the cursor down instead of buffering.
+    Optionally gzip-compressed. `rows` is a factory, so a retried request re-reads from the start.
+    """
+
+    def __init__(self, rows: Callable[[], Rows], filename: str, format: str = "csv", compress: bool = False,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE):
+        super().__init__(filename=f"{filename}.{format}" + (".gz" if compress else ""), chunk_size=chunk_size)
+        self.rows = rows
+        self.format = format
+        self.compress = compress
+
+    async def read(self, bot: Bot) -> AsyncIterator[bytes]:
+        encode = json_chunks if self.format == "json" else csv_chunks
+        # wbits=31 writes a gzip header, so the file opens with any archiver
+        compressor = zlib.compressobj(wbits=31) if self.compress else None
+        async with aclosing(self.rows()) as rows:
+            async for text in encode(rows, self.chunk_size):
+                data = text.encode("utf-8")
+                if compressor:
+                    data = compressor.compress(data)
+                if data:
+                    yield data
+        if compressor:
+            yield compressor.flush()
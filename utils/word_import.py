@@ -0,0 +1,163 @@
+import codecs
+import csv
+import html
+import re
+from typing import AsyncIterator, Optional
+
+import aiofiles
+from aiogram import Bot
+
+MAX_WORD_LENGTH = 200
+# A quoted field that never closes must not swallow the rest of the file
+MAX_RECORD_LENGTH = 64 * 1024
+
+_ANKI_SEPARATORS = {"tab": "\t", "comma": ",", "semicolon": ";", "pipe": "|", "space": " "}
+_HEADERS = {("word", "translation"), ("front", "back")}
+_TAG = re.compile(r"<[^>]+>")
+
+
+class PairParser:
+    """
+    Incremental parser of word pairs from CSV, TSV and Anki "Notes in Plain Text" exports.
+    Text is fed in arbitrary chunks; complete records are parsed as soon as they arrive,
+    so the file is never held in memory. The delimiter is taken from the Anki
+    "#separator:" header or detected on the first record. Rows without two non-empty
+    fields, overlong words and repeated words are counted and skipped.
+    """
+
+    def __init__(self, max_length: int = MAX_WORD_LENGTH):
+        self.max_length = max_length
+        self.delimiter: Optional[str] = None
+        self.html = False
+        # Anki metadata columns (guid, notetype, deck, tags), 0-based
+        self.meta_columns: set[int] = set()
+        self.rows = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self._buffer = ""
+        self._pending = ""
+        self._seen: set[str] = set()
+
+    def feed(self, text: str) -> list[tuple[str, str]]:
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._parse(lines)
+
+    def close(self) -> list[tuple[str, str]]:
+        lines, self._buffer = [self._buffer], ""
+        pairs = self._parse(lines)
+        if self._pending:
+            self.rows += 1
+            self.invalid += 1
+            self._pending = ""
+        return pairs
+
+    def _parse(self, lines: list[str]) -> list[tuple[str, str]]:
+        pairs = []
+        for line in lines:
+            line = line.rstrip("\r")
+            if self._pending:
+                line = f"{self._pending}\n{line}"
+                self._pending = ""
+            elif not line.strip():
+                continue
+            elif line.startswith("#") and self.rows == 0 and self._header(line):
+                continue
+
+            if self.delimiter is None:
+                self.delimiter = _detect_delimiter(line)
+            try:
+                fields = next(csv.reader([line], delimiter=self.delimiter, strict=True))
+            except csv.Error as e:
+                # Only a quote left open continues the record on the next line;
+                # any other error (e.g. text after a closing quote) spoils just this row
+                if "unexpected end of data" in str(e) and len(line) < MAX_RECORD_LENGTH:
+                    self._pending = line
+                else:
+                    self.rows += 1
+                    self.invalid += 1
+                continue
+
+            self.rows += 1
+            pair = self._pair(fields)
+            if pair is not None:
+                pairs.append(pair)
+        return pairs
+
+    def _header(self, line: str) -> bool:
+        """Anki export headers: #separator:tab, #html:true, #deck column:3, ..."""
+        key, _, value = line[1:].partition(":")
+        key, value = key.strip().lower(), value.strip()
+        if not value:
+            return False
+        if key == "separator":
+            self.delimiter = _ANKI_SEPARATORS.get(value.lower(), value[:1])
+        elif key == "html":
+            self.html = value.lower() == "true"
+        elif key.endswith(" column") and value.isdigit():
+            self.meta_columns.add(int(value) - 1)
+        return True
+
+    def _pair(self, fields: list[str]) -> Optional[tuple[str, str]]:
+        fields = [field for i, field in enumerate(fields) if i not in self.meta_columns]
+        if len(fields) < 2:
+            self.invalid += 1
+            return None
+        word, translation = (self._clean(field) for field in fields[:2])
+        if self.rows == 1 and (word, translation) in _HEADERS:
+            self.rows -= 1
+            return None
+        if not word or not translation or len(word) > self.max_length or len(translation) > self.max_length:
+            self.invalid += 1
+            return None
+        if word in self._seen:
+            self.duplicates += 1
+            return None
+        self._seen.add(word)
+        return word, translation
+
+    def _clean(self, field: str) -> str:
+        if self.html:
+            field = html.unescape(_TAG.sub(" ", field))
+        return " ".join(field.split()).lower()
+
+    @property
+    def imported(self) -> int:
+        return self.rows - self.invalid - self.duplicates
+
+
+def _detect_delimiter(line: str) -> str:
+    if "\t" in line:
+        return "\t"
+    try:
+        return csv.Sniffer().sniff(line, delimiters=",;|").delimiter
+    except csv.Error:
+        return ","
+
+
+async def stream_file(bot: Bot, file_path: str, chunk_size: int = 65536) -> AsyncIterator[bytes]:
+    """Chunks of a Telegram file without buffering it whole (unlike Bot.download)"""
+    if bot.session.api.is_local:
+        async with aiofiles.open(bot.session.api.wrap_local_file.to_local(file_path), "rb") as file:
+            while chunk := await file.read(chunk_size):
+                yield chunk
+        return
+    url = bot.session.api.file_url(bot.token, file_path)
+    async for chunk in bot.session.stream_content(url, chunk_size=chunk_size):
+        yield chunk
+
+
+async def iter_pair_chunks(chunks: AsyncIterator[bytes], parser: PairParser,
+                           batch_size: int = 1000) -> AsyncIterator[list[tuple[str, str]]]:
+    """Decodes a byte stream (UTF-8, BOM allowed) and yields parsed pairs in batches"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    batch = []
+    async for chunk in chunks:
+        batch.extend(parser.feed(decoder.decode(chunk)))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    batch.extend(parser.feed(decoder.decode(b"", final=True)))
+    batch.extend(parser.close())
+    if batch:
+        yield batch